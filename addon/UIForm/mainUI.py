@@ -61,11 +61,12 @@ class Ui_Dialog(object):
         self.label = QtWidgets.QLabel(parent=self.mainTab)
         self.label.setObjectName("label")
         self.verticalLayout.addWidget(self.label)
-        self.newWordListWidget = QtWidgets.QListWidget(parent=self.mainTab)
-        self.newWordListWidget.setAlternatingRowColors(True)
-        self.newWordListWidget.setSelectionMode(QtWidgets.QAbstractItemView.SelectionMode.MultiSelection)
-        self.newWordListWidget.setObjectName("newWordListWidget")
-        self.verticalLayout.addWidget(self.newWordListWidget)
+        self.newWordListView = QtWidgets.QListView(parent=self.mainTab)
+        self.newWordListView.setAlternatingRowColors(True)
+        self.newWordListView.setSelectionMode(QtWidgets.QAbstractItemView.SelectionMode.MultiSelection)
+        self.newWordListView.setUniformItemSizes(True)
+        self.newWordListView.setObjectName("newWordListView")
+        self.verticalLayout.addWidget(self.newWordListView)
         self.horizontalLayout.addLayout(self.verticalLayout)
         self.verticalLayout_2 = QtWidgets.QVBoxLayout()
         self.verticalLayout_2.setSizeConstraint(QtWidgets.QLayout.SizeConstraint.SetDefaultConstraint)
@@ -74,10 +75,11 @@ class Ui_Dialog(object):
         self.needDeleteCheckBox = QtWidgets.QCheckBox(parent=self.mainTab)
         self.needDeleteCheckBox.setObjectName("needDeleteCheckBox")
         self.verticalLayout_2.addWidget(self.needDeleteCheckBox)
-        self.needDeleteWordListWidget = QtWidgets.QListWidget(parent=self.mainTab)
-        self.needDeleteWordListWidget.setAlternatingRowColors(True)
-        self.needDeleteWordListWidget.setObjectName("needDeleteWordListWidget")
-        self.verticalLayout_2.addWidget(self.needDeleteWordListWidget)
+        self.needDeleteWordListView = QtWidgets.QListView(parent=self.mainTab)
+        self.needDeleteWordListView.setAlternatingRowColors(True)
+        self.needDeleteWordListView.setUniformItemSizes(True)
+        self.needDeleteWordListView.setObjectName("needDeleteWordListView")
+        self.verticalLayout_2.addWidget(self.needDeleteWordListView)
         self.horizontalLayout.addLayout(self.verticalLayout_2)
         self.gridLayout_4.addLayout(self.horizontalLayout, 3, 0, 1, 5)
         self.apiLayout = QtWidgets.QHBoxLayout()
@@ -127,6 +129,16 @@ class Ui_Dialog(object):
         self.pullRemoteWordsBtn.setMinimumSize(QtCore.QSize(100, 0))
         self.pullRemoteWordsBtn.setObjectName("pullRemoteWordsBtn")
         self.gridLayout_4.addWidget(self.pullRemoteWordsBtn, 4, 0, 1, 1)
+        self.pullAndQueryCheckBox = QtWidgets.QCheckBox(parent=self.mainTab)
+        self.pullAndQueryCheckBox.setObjectName("pullAndQueryCheckBox")
+        self.gridLayout_4.addWidget(self.pullAndQueryCheckBox, 4, 2, 1, 1)
+        self.resumeQueryBtn = QtWidgets.QPushButton(parent=self.mainTab)
+        self.resumeQueryBtn.setObjectName("resumeQueryBtn")
+        self.gridLayout_4.addWidget(self.resumeQueryBtn, 4, 3, 1, 1)
+        self.pipelineProgressLabel = QtWidgets.QLabel(parent=self.mainTab)
+        self.pipelineProgressLabel.setText("")
+        self.pipelineProgressLabel.setObjectName("pipelineProgressLabel")
+        self.gridLayout_4.addWidget(self.pipelineProgressLabel, 5, 0, 1, 5)
         self.queryBtn = QtWidgets.QPushButton(parent=self.mainTab)
         self.queryBtn.setEnabled(False)
         sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Policy.Fixed, QtWidgets.QSizePolicy.Policy.Minimum)
@@ -234,6 +246,10 @@ class Ui_Dialog(object):
         self.phraseCheckBox.setChecked(True)
         self.phraseCheckBox.setObjectName("phraseCheckBox")
         self.gridLayout.addWidget(self.phraseCheckBox, 1, 2, 1, 1)
+        self.incrementalSyncCheckBox = QtWidgets.QCheckBox(parent=self.defaultConfigGroupBox)
+        self.incrementalSyncCheckBox.setChecked(False)
+        self.incrementalSyncCheckBox.setObjectName("incrementalSyncCheckBox")
+        self.gridLayout.addWidget(self.incrementalSyncCheckBox, 5, 0, 1, 1)
         self.BrEPronRadioButton = QtWidgets.QRadioButton(parent=self.defaultConfigGroupBox)
         self.BrEPronRadioButton.setChecked(False)
         self.BrEPronRadioButton.setObjectName("BrEPronRadioButton")
@@ -249,6 +265,7 @@ class Ui_Dialog(object):
         self.BrEPronRadioButton.raise_()
         self.BrEPhoneticCheckBox.raise_()
         self.dummyBtn.raise_()
+        self.incrementalSyncCheckBox.raise_()
         self.gridLayout_2.addWidget(self.defaultConfigGroupBox, 2, 0, 1, 2)
         self.tabWidget.addTab(self.settingTab, "")
         self.repairTab = QtWidgets.QWidget()
@@ -280,6 +297,9 @@ class Ui_Dialog(object):
         self.repairPronCB = QtWidgets.QCheckBox(parent=self.repairCBGroupBox)
         self.repairPronCB.setObjectName("repairPronCB")
         self.gridLayout_5.addWidget(self.repairPronCB, 1, 2, 1, 1)
+        self.repairIncompleteCB = QtWidgets.QCheckBox(parent=self.repairCBGroupBox)
+        self.repairIncompleteCB.setObjectName("repairIncompleteCB")
+        self.gridLayout_5.addWidget(self.repairIncompleteCB, 1, 3, 1, 1)
         self.gridLayout_6.addWidget(self.repairCBGroupBox, 4, 0, 2, 2)
         self.repairBtn = QtWidgets.QPushButton(parent=self.repairTab)
         self.repairBtn.setObjectName("repairBtn")
@@ -328,6 +348,10 @@ class Ui_Dialog(object):
         self.apiLabel.setText(_translate("Dialog", "查询"))
         self.dictionaryLabel.setText(_translate("Dialog", "词典"))
         self.pullRemoteWordsBtn.setText(_translate("Dialog", "获取单词"))
+        self.pullAndQueryCheckBox.setToolTip(_translate("Dialog", "获取单词的同时查询新单词，不必等获取完毕再点击查询"))
+        self.pullAndQueryCheckBox.setText(_translate("Dialog", "获取后立即查询"))
+        self.resumeQueryBtn.setToolTip(_translate("Dialog", "上次获取的单词还未同步，恢复单词列表和已查询的结果"))
+        self.resumeQueryBtn.setText(_translate("Dialog", "恢复上次查询"))
         self.queryBtn.setText(_translate("Dialog", "查询"))
         self.tabWidget.setTabText(self.tabWidget.indexOf(self.mainTab), _translate("Dialog", "同步"))
         self.credentialGroupBox.setTitle(_translate("Dialog", "账号设置"))
@@ -346,6 +370,8 @@ class Ui_Dialog(object):
         self.sentenceCheckBox.setText(_translate("Dialog", "例句"))
         self.imageCheckBox.setText(_translate("Dialog", "图片"))
         self.phraseCheckBox.setText(_translate("Dialog", "短语"))
+        self.incrementalSyncCheckBox.setToolTip(_translate("Dialog", "只获取单词本中变化的页，其余沿用上次获取的结果"))
+        self.incrementalSyncCheckBox.setText(_translate("Dialog", "增量获取"))
         self.BrEPronRadioButton.setText(_translate("Dialog", "英式发音"))
         self.tabWidget.setTabText(self.tabWidget.indexOf(self.settingTab), _translate("Dialog", "设置"))
         self.repairCBGroupBox.setTitle(_translate("Dialog", "修复字段"))
@@ -356,11 +382,14 @@ class Ui_Dialog(object):
         self.repairBrEPhoneticCB.setText(_translate("Dialog", "英式音标"))
         self.repairAmEPhoneticCB.setText(_translate("Dialog", "美式音标"))
         self.repairPronCB.setText(_translate("Dialog", "发音"))
+        self.repairIncompleteCB.setToolTip(_translate("Dialog", "只查询勾选字段为空或发音文件缺失的笔记，数量较多时可节省大量查询"))
+        self.repairIncompleteCB.setText(_translate("Dialog", "仅修复不完整的笔记"))
         self.repairBtn.setText(_translate("Dialog", "开始修复"))
         self.repairIntroLabel.setText(_translate("Dialog", "### 修复笔记中的字段\n"
 "\n"
 "- 若字段在【设置-默认设置】未勾选，并在【修复字段】勾选，则字段内容会被**清空**，请谨慎使用\n"
 "- 字段会被忽略的情况：①没有在【修复字段】勾选；②没有应用最新模板；③查询结果为空\n"
+"- 勾选【仅修复不完整的笔记】时，只查询勾选字段为空或发音文件缺失的笔记\n"
 "- 数量较多时可能触发API限流，导致查询失败或返回错误结果"))
         self.repairProgressGroupBox.setTitle(_translate("Dialog", "进度信息"))
         self.repairProgressNoteLabel.setText(_translate("Dialog", "本地笔记更新进度"))
@@ -1,5 +1,15 @@
+import logging
 from abc import ABC, abstractmethod
-from typing import Any, Callable, Optional, TypedDict
+from collections import deque
+from concurrent.futures import Future
+from math import ceil
+from threading import BoundedSemaphore
+from typing import TYPE_CHECKING, AbstractSet, Any, Callable, Iterator, Optional, TypedDict
+
+if TYPE_CHECKING:
+    from .misc import Executor
+
+_dictLogger = logging.getLogger('dict2Anki.dictionary')
 
 
 class Mask:
@@ -36,6 +46,8 @@ class ConfigMap(TypedDict):
     noPron: bool
     congest: int
     user_agent: str
+    incrementalSync: bool
+    pullAndQuery: bool
 
 
 class AbstractDictionary(ABC):
@@ -44,6 +56,10 @@ class AbstractDictionary(ABC):
     timeout: int
     headers: dict[str, str]
     groups: list[tuple[str, str]] = []
+    pageSize: int
+    """默认每页单词数，各分组实际的每页单词数由 `getFirstPage` 探测，不修改此值"""
+    pageSizes: tuple[int, ...] = ()
+    """`getFirstPage` 从大到小依次尝试的每页单词数，为空则不探测"""
 
     @staticmethod
     @abstractmethod
@@ -67,9 +83,162 @@ class AbstractDictionary(ABC):
 
     @classmethod
     @abstractmethod
-    def getWordsByPage(cls, pageNo: int, groupName: str, groupId: str) -> list[str]:
+    def getWordsByPage(cls, pageNo: int, groupName: str, groupId: str, pageSize: Optional[int] = None) -> list[str]:
+        """
+        按单词本中的顺序返回，增量获取依赖该顺序
+        :param pageSize: 每页单词数，即 `getFirstPage` 探测的结果，None 为 `pageSize`
+        """
         pass
 
+    @classmethod
+    @abstractmethod
+    def requestPage(cls, groupId: str, offset: int, limit: int) -> tuple[int, list[str]]:
+        """
+        一次请求获取分组下从 `offset` 起最多 `limit` 个单词，`getFirstPage` 按 `pageSizes` 探测时使用
+        :return: (单词总数, 单词)
+        :raise: 请求失败
+        """
+        pass
+
+    @classmethod
+    def getFirstPage(cls, groupName: str, groupId: str) -> tuple[int, list[str], int]:
+        """
+        获取分组下总页数和第一页单词
+
+        按 `pageSizes` 探测服务器接受的最大每页单词数，总数取自第一页，不再单独请求。
+        服务器返回的单词少于请求的数量（且还有剩余）时以返回的数量为准，请求失败则尝试下一个。
+        `pageSizes` 为空时为 `getTotalPage` + `getWordsByPage`。每页单词数只属于该分组，
+        同时获取的分组可能不同，之后的页需传给 `getWordsByPage`
+        :return: (总页数, 第一页单词, 每页单词数)
+        """
+        if not cls.pageSizes:
+            totalPage = cls.getTotalPage(groupName, groupId)
+            return totalPage, cls.getWordsByPage(0, groupName, groupId) if totalPage else [], cls.pageSize
+
+        for limit in cls.pageSizes:
+            try:
+                total, wordList = cls.requestPage(groupId, 0, limit)
+            except Exception as error:
+                _dictLogger.warning(f'每页{limit}个获取失败: {error}')
+                continue
+            pageSize = limit if len(wordList) >= min(limit, total) else len(wordList)
+            if pageSize <= 0:
+                continue
+            totalPage = ceil(total / pageSize)
+            _dictLogger.info(
+                f'该分组({groupName}-{groupId})下共有{total}个单词，每页{pageSize}个，共{totalPage}页'
+            )
+            return totalPage, wordList, pageSize
+        return 0, [], cls.pageSize
+
+    @classmethod
+    def iterWords(
+        cls,
+        groupName: str,
+        groupId: str,
+        executor: Optional['Executor'] = None,
+        prefetch: int = 2,
+        start: int = 0,
+        limit: Optional[BoundedSemaphore] = None,
+    ) -> 'WordPages':
+        """
+        逐页获取分组下的单词，不必等全部获取完
+        :param executor: 用于预取后面的页，None 则逐页同步获取
+        :param prefetch: 同时在获取的页数
+        :param start: 从第几个单词开始，即上次的 `WordPages.cursor`
+        :param limit: 与其他请求共用的并发上限（见 `Executor.slots`），每页请求前获取
+        """
+        return WordPages(cls, groupName, groupId, executor, prefetch, start, limit)
+
+
+class WordPages:
+    """
+    Words of a group, page by page, see `AbstractDictionary.iterWords`.
+
+    `open()` (called by the first iteration) fetches the first page to learn the total
+    and the page size of this group. Iterating yields the words of each page in order,
+    while up to `prefetch` following pages are being fetched by the executor, each taking
+    a slot of `limit` until done. Pending pages are cancelled if iteration stops early.
+
+    `cursor` is the offset of the word after the last yielded page. Offsets don't depend
+    on the page size, so it can resume even if the page size probed next time differs.
+    """
+
+    def __init__(
+        self,
+        dictionary: type[AbstractDictionary],
+        groupName: str,
+        groupId: str,
+        executor: Optional['Executor'] = None,
+        prefetch: int = 2,
+        start: int = 0,
+        limit: Optional[BoundedSemaphore] = None,
+    ):
+        self.dictionary = dictionary
+        self.groupName = groupName
+        self.groupId = groupId
+        self.executor = executor
+        self.prefetch = max(prefetch, 1)
+        self.cursor = start
+        self.limit = limit
+        self.totalPage: Optional[int] = None
+        """known after `open()`"""
+        self.pageSize = dictionary.pageSize
+        """page size of this group, probed by `open()`"""
+        self.firstPage: list[str] = []
+
+    def open(self) -> int:
+        """fetch the first page if not yet, returns total page count"""
+        if self.totalPage is None:
+            self.totalPage, self.firstPage, self.pageSize = self.dictionary.getFirstPage(
+                self.groupName, self.groupId
+            )
+        return self.totalPage
+
+    def getPage(self, pageNo: int) -> list[str]:
+        """words of page `pageNo` at the page size of this group"""
+        return self.dictionary.getWordsByPage(pageNo, self.groupName, self.groupId, self.pageSize)
+
+    def _fetch(self, pageNo: int) -> Future:
+        if pageNo == 0:
+            future: Future = Future()
+            future.set_result(self.firstPage)
+            return future
+        if self.executor:
+            limit = self.limit
+            if limit:
+                limit.acquire()
+            future = self.executor.submit(self.getPage, pageNo)
+            if limit:
+                future.add_done_callback(lambda _: limit.release())
+            return future
+        future = Future()
+        future.set_result(self.getPage(pageNo))
+        return future
+
+    def __iter__(self) -> Iterator[list[str]]:
+        totalPage = self.open()
+        startPage, skip = divmod(self.cursor, self.pageSize)
+        pageNos = iter(range(startPage, totalPage))
+        pending: deque[tuple[int, Future]] = deque()
+        try:
+            while True:
+                while len(pending) < (self.prefetch if self.executor else 1):
+                    pageNo = next(pageNos, None)
+                    if pageNo is None:
+                        break
+                    pending.append((pageNo, self._fetch(pageNo)))
+                if not pending:
+                    return
+                pageNo, future = pending.popleft()
+                words = future.result()
+                self.cursor = pageNo * self.pageSize + len(words)
+                yield words[skip:]
+                skip = 0
+        finally:
+            for _, future in pending:
+                future.cancel()
+
 
 class QueryWordData(TypedDict):
     term: str
@@ -85,13 +254,16 @@ class QueryWordData(TypedDict):
 
 class AbstractQueryAPI(ABC):
     name: str
+    url: str
+    """用于限流，同一 host 的请求共享限流额度"""
 
     @classmethod
     @abstractmethod
-    def query(cls, word: str) -> Optional[QueryWordData]:
+    def query(cls, word: str, fields: Optional[AbstractSet[str]] = None) -> Optional[QueryWordData]:
         """
         查询
         :param word: 单词
+        :param fields: 需要的字段，`constants.QUERY_FIELDS` 的子集，None 为全部。不需要的字段可以不请求、不解析，返回空值
         :return: 查询结果 dict(term, definition, phrase, image, sentence, BrEPhonetic, AmEPhonetic, BrEPron, AmEPron)
         """
         pass
@@ -8,18 +8,30 @@ from typing import Iterable, Optional
 import aqt
 import aqt.utils
 from aqt import QDialog, QIcon, QListWidgetItem, QPlainTextEdit, QPushButton, Qt, QVBoxLayout, pyqtSlot
+from aqt.operations import CollectionOp
 
-from . import conf_model, misc, noteManager
+from . import audioCache, conf_model, misc, noteManager, queryCache
 from . import constants as C
 from ._typing import AbstractDictionary, AbstractQueryAPI, QueryWordData
 from .dictionary import dictionaries
+from .jobJournal import JobJournal
 from .logger import Handler
 from .loginDialog import LoginDialog
 from .queryApi import apis
 from .repair import Repair
 from .UIForm import mainUI, wordGroup
 from .UIForm import icons_rc  # noqa: F401
-from .workers import LoginStateCheckWorker, QueryAllWorker, RemoteWordFetchingWorker, VersionCheckWorker, WorkerManager
+from .wordbookSnapshot import SnapshotStore
+from .wordListModel import WordListModel, WordState, selected_rows
+from .workers import (
+    AudioDownloadWorker,
+    LoginStateCheckWorker,
+    QueryAllWorker,
+    RemoteWordFetchingWorker,
+    VersionCheckWorker,
+    WordFeed,
+    WorkerManager,
+)
 
 logger = logging.getLogger('dict2Anki')
 
@@ -39,10 +51,20 @@ class Windows(QDialog, mainUI.Ui_Dialog):
         super(Windows, self).__init__(parent)
         self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
         self.localWords = []
+        self.localWordIndex: dict[str, list[int]] = {}
+        """term -> note ids，获取单词时建立，供比对和删除使用"""
         self.remoteWords = []
+        self.pipeline: Optional[PipelineProgress] = None
+        """获取后立即查询时两个阶段的进度，不是该模式时为 None"""
+        self.feed: Optional[WordFeed] = None
+        """获取后立即查询时获取线程填入、查询线程取出的单词"""
 
         self.workerman = WorkerManager()
         self.conf = conf_model.Conf.getinstance(ConfCtl.read())
+        queryCache.open_cache(os.path.join(misc.user_files_dir(), 'query_cache.db'))
+        audioCache.open_cache(os.path.join(misc.user_files_dir(), 'audio_cache'))
+        self.queryJournal = JobJournal(os.path.join(misc.user_files_dir(), 'query_journal.jsonl'))
+        """获取的单词和查询结果，同步前关闭窗口可恢复"""
 
         self.init_ui()
         self.setupLogger()
@@ -65,7 +87,18 @@ class Windows(QDialog, mainUI.Ui_Dialog):
         self.dictionaryComboBox.addItems([d.name for d in dictionaries])
         self.apiComboBox.addItems([d.name for d in apis])
         self.deckComboBox.addItems(noteManager.getDeckNames())
-        self.needDeleteWordsView = NeedDeleteWordsView(self.needDeleteCheckBox, self.needDeleteWordListWidget)
+        self.newWordModel = WordListModel(
+            {
+                WordState.WAIT: ':/icons/wait.png',
+                WordState.DONE: ':/icons/done.png',
+                WordState.FAILED: ':/icons/failed.png',
+            },
+            parent=self,
+        )
+        self.newWordListView.setModel(self.newWordModel)
+        self.needDeleteWordsView = NeedDeleteWordsView(self.needDeleteCheckBox, self.needDeleteWordListView)
+        self.pipelineProgressLabel.hide()
+        self.resumeQueryBtn.setVisible(self.queryJournal.exists())
         ConfCtl.init_ui(self, self.conf)
 
     def closeEvent(self, event):
@@ -77,6 +110,14 @@ class Windows(QDialog, mainUI.Ui_Dialog):
         logger.removeHandler(self.QtHandler)
         # 插件关闭时退出所有线程
         self.workerman.destroy()
+        # 获取单词的 worker 可能还未运行就被取消，关闭 feed 让查询线程退出
+        if self.feed:
+            self.feed.close()
+        self.repair.close()
+        self.queryJournal.close()
+        queryCache.close_cache()
+        audioCache.close_cache()
+        # 已下载的发音在发音缓存中另有一份，下次打开不必重新下载
         shutil.rmtree(misc.tmp_audio_dir(), ignore_errors=True)
 
         # need super to emit finished event
@@ -179,8 +220,8 @@ class Windows(QDialog, mainUI.Ui_Dialog):
 
         def onAccepted():
             """选择单词本弹窗确定事件"""
-            # 清空 listWidget
-            self.newWordListWidget.clear()
+            # 清空单词列表
+            self.newWordModel.clear()
             self.needDeleteWordsView.clear()
             self.mainTab.setEnabled(False)
 
@@ -205,17 +246,71 @@ class Windows(QDialog, mainUI.Ui_Dialog):
         """根据选中到分组获取分组下到全部单词，并保存到self.remoteWords"""
         groupMap = dict(self.get_current_dict().groups)
 
+        snapshots = None
+        if self.conf.incremental_sync:
+            snapshots = SnapshotStore(os.path.join(misc.user_files_dir(), 'wordbook_snapshot.json'))
+
+        # 先获取本地单词，获取后立即查询时每页都要和它比对
+        self.localWordIndex = noteManager.getWordIndexByDeck(self.conf.deck)
+        self.localWords = list(self.localWordIndex)
+
+        feed = self.feed = None
+        self.pipeline = None
+        self.pipelineProgressLabel.hide()
+        self.resumeQueryBtn.hide()
+        if self.conf.pull_and_query:
+            feed = self.feed = WordFeed()
+            self.pipeline = PipelineProgress()
+            self.pipelineProgressLabel.show()
+            self.queryJournal.start('query', self._queryJobParams())
+
         # 启动单词获取线程
         worker = RemoteWordFetchingWorker(self.get_current_dict(),
-                                          [(groupName, groupMap[groupName],) for groupName in groupNames])
-        worker.tick.connect(lambda: self.progressBar.setValue(self.progressBar.value() + 1))
-        worker.setProgress.connect(self.progressBar.setMaximum)
+                                          [(groupName, groupMap[groupName],) for groupName in groupNames],
+                                          snapshots,
+                                          frozenset(self.localWordIndex) if feed else None,
+                                          feed)
+        if self.pipeline:
+            worker.tick.connect(self.on_pipelinePagePulled)
+            worker.setProgress.connect(self.on_pipelineTotalPage)
+            worker.newWordsFound.connect(self.on_newWordsFound)
+        else:
+            worker.tick.connect(lambda: self.progressBar.setValue(self.progressBar.value() + 1))
+            worker.setProgress.connect(self.progressBar.setMaximum)
         worker.doneThisGroup.connect(self.on_getRemoteWords_groupDone)
         worker.done.connect(self.on_allPullWork_done)
         self.workerman.start(worker)
 
-        # 同时获取本地单词
-        self.localWords = noteManager.getWordsByDeck(self.conf.deck)
+        if feed:
+            logger.info('获取后立即查询')
+            self.startQuery(feed)
+
+    def updatePipelineProgress(self):
+        assert self.pipeline
+        self.progressBar.setMaximum(self.pipeline.maximum())
+        self.progressBar.setValue(self.pipeline.value())
+        self.pipelineProgressLabel.setText(self.pipeline.text())
+
+    @pyqtSlot()
+    def on_pipelinePagePulled(self):
+        if self.pipeline:
+            self.pipeline.pulled += 1
+            self.updatePipelineProgress()
+
+    @pyqtSlot(int)
+    def on_pipelineTotalPage(self, pages: int):
+        if self.pipeline:
+            self.pipeline.pages = pages
+            self.updatePipelineProgress()
+
+    @pyqtSlot(list)
+    def on_newWordsFound(self, words: list[str]):
+        """获取后立即查询时，一页中的新单词，已交给查询线程"""
+        self.newWordModel.append_words(words)
+        self.queryJournal.add_items(words)
+        if self.pipeline:
+            self.pipeline.found += len(words)
+            self.updatePipelineProgress()
 
     @pyqtSlot(list)
     def on_getRemoteWords_groupDone(self, words: list[str]):
@@ -230,23 +325,33 @@ class Windows(QDialog, mainUI.Ui_Dialog):
         self.localWords.clear()
         self.remoteWords.clear()
 
+        if self.pipeline:
+            # 新单词已边获取边查询，只需找出待删除的
+            needToDeleteWords = localWordSet - remoteWordSet
+            logger.info(f'待删: {needToDeleteWords}')
+            self.needDeleteWordsView.set_words(needToDeleteWords)
+            self.needDeleteWordsView.check_if_not_empty()
+            self.queryJournal.set_extra(delete=sorted(needToDeleteWords))
+            self.pipeline.pulling = False
+            self.updatePipelineProgress()
+            self._finishPipeline()
+            return
+
         newWords = remoteWordSet - localWordSet  # 新单词
         needToDeleteWords = localWordSet - remoteWordSet  # 需要删除的单词
         logger.info(f'本地: {localWordSet}')
         logger.info(f'远程: {remoteWordSet}')
         logger.info(f'待查: {newWords}')
         logger.info(f'待删: {needToDeleteWords}')
-        waitIcon = QIcon(':/icons/wait.png')
-        self.newWordListWidget.clear()
-        self.needDeleteWordsView.clear()
-
-        self.needDeleteWordsView.add_items(needToDeleteWords)
-
-        for word in newWords:
-            item = QListWidgetItem(word)
-            item.setIcon(waitIcon)
-            self.newWordListWidget.addItem(item)
-        self.newWordListWidget.clearSelection()
+        self.newWordModel.set_words(newWords)
+        self.newWordListView.clearSelection()
+        self.needDeleteWordsView.set_words(needToDeleteWords)
+        if newWords or needToDeleteWords:
+            self.queryJournal.start('query', self._queryJobParams())
+            self.queryJournal.add_items(self.newWordModel.words())
+            self.queryJournal.set_extra(delete=sorted(needToDeleteWords))
+        else:
+            self.queryJournal.finish()
 
         self.needDeleteWordsView.check_if_not_empty()
 
@@ -254,15 +359,96 @@ class Windows(QDialog, mainUI.Ui_Dialog):
         self.apiComboBox.setEnabled(True)
         self.deckComboBox.setEnabled(True)
         self.pullRemoteWordsBtn.setEnabled(True)
-        self.queryBtn.setEnabled(self.newWordListWidget.count() > 0)
-        self.syncBtn.setEnabled(self.newWordListWidget.count() == 0 and not self.needDeleteWordsView.empty())
-        if self.needDeleteWordsView.empty() and self.newWordListWidget.count() == 0:
+        self.queryBtn.setEnabled(not self.newWordModel.empty())
+        self.syncBtn.setEnabled(self.newWordModel.empty() and not self.needDeleteWordsView.empty())
+        if self.needDeleteWordsView.empty() and self.newWordModel.empty():
             logger.info('无需同步')
             aqt.utils.tooltip('无需同步')
         else:
             aqt.utils.tooltip("查询完成")
         self.mainTab.setEnabled(True)
 
+    def _finishPipeline(self):
+        """获取后立即查询的两个阶段都完成后恢复界面"""
+        if not self.pipeline or self.pipeline.pulling or self.pipeline.querying:
+            return
+        logger.info(self.pipeline.text())
+        self.pipeline = None
+
+        self.dictionaryComboBox.setEnabled(True)
+        self.apiComboBox.setEnabled(True)
+        self.deckComboBox.setEnabled(True)
+        self.pullRemoteWordsBtn.setEnabled(True)
+        self.queryBtn.setEnabled(not self.newWordModel.empty())
+        self.syncBtn.setEnabled(not self.newWordModel.empty() or not self.needDeleteWordsView.empty())
+        self.mainTab.setEnabled(True)
+        if self.needDeleteWordsView.empty() and self.newWordModel.empty():
+            # 获取开始时已记录，无需同步则没有可恢复的内容
+            self.queryJournal.finish()
+            logger.info('无需同步')
+            aqt.utils.tooltip('无需同步')
+        else:
+            aqt.utils.tooltip("查询完成")
+
+    def _queryJobParams(self) -> dict:
+        return {'dict': self.get_current_dict().name, 'api': self.get_current_api().name, 'deck': self.conf.deck}
+
+    @pyqtSlot()
+    def on_resumeQueryBtn_clicked(self):
+        """恢复上次未同步的单词列表和查询结果，未查询的单词可继续查询"""
+        job = self.queryJournal.load()
+        if job is None:
+            self.resumeQueryBtn.hide()
+            aqt.utils.tooltip('没有可恢复的查询')
+            return
+        deck = job.params.get('deck')
+        if deck and deck not in noteManager.getDeckNames():
+            # 保留记录，牌组恢复后仍可继续
+            logger.warning(f'上次查询的牌组({deck})不存在，无法恢复')
+            aqt.utils.showCritical(f'上次查询的牌组“{deck}”不存在，无法恢复')
+            return
+        self.resumeQueryBtn.hide()
+        job = self.queryJournal.resume()
+        if job is None:
+            aqt.utils.tooltip('没有可恢复的查询')
+            return
+        logger.info(f'恢复上次查询: {job.params}')
+        if deck and deck != self.conf.deck:
+            self.deckComboBox.setCurrentText(deck)
+        self.localWordIndex = noteManager.getWordIndexByDeck(self.conf.deck)
+
+        self.newWordModel.set_words(job.items)
+        self.newWordModel.set_results((row, job.done[word]) for row, word in enumerate(job.items) if word in job.done)
+        self.needDeleteWordsView.set_words(job.extra.get('delete', []))
+        self.needDeleteWordsView.check_if_not_empty()
+
+        pending = len(job.pending())
+        self.queryBtn.setEnabled(pending > 0)
+        self.syncBtn.setEnabled(True)
+        self._restoreAudios(list(job.done.values()))
+        aqt.utils.tooltip(f'已恢复上次查询\n已查询{len(job.done)}个，未查询{pending}个')
+
+    def _restoreAudios(self, results: list[QueryWordData]):
+        """临时发音文件在窗口关闭时已删除，从发音缓存取回（未缓存的重新下载）"""
+        if self.conf.no_pron:
+            return
+        whichPron = C.F_AMEPRON if self.conf.ame_pron else C.F_BREPRON
+        audioDir = misc.tmp_audio_dir()
+        os.makedirs(audioDir, exist_ok=True)
+        audios = [
+            (fileName, result[whichPron])
+            for result in results
+            if result.get(whichPron)
+            and not os.path.isfile(fileName := os.path.join(audioDir, misc.audio_fname(whichPron, result[C.F_TERM])))
+        ]
+        if not audios:
+            return
+        # 发音取回后才能同步
+        self.syncBtn.setEnabled(False)
+        worker = AudioDownloadWorker(audios, self.conf.congest)
+        worker.done.connect(lambda _: self.syncBtn.setEnabled(True))
+        self.workerman.start(worker)
+
     @pyqtSlot()
     def on_queryBtn_clicked(self):
         logger.info('点击查询按钮')
@@ -271,19 +457,19 @@ class Windows(QDialog, mainUI.Ui_Dialog):
         self.pullRemoteWordsBtn.setEnabled(False)
         self.syncBtn.setEnabled(False)
 
-        wordItems = self.newWordListWidget.selectedItems()
-        if not wordItems: # 如果没有选中单词，则查询所有单词
-            wordItems = [self.newWordListWidget.item(row) for row in range(self.newWordListWidget.count())]
+        rows = selected_rows(self.newWordListView.selectionModel()) # type: ignore
+        if not rows: # 如果没有选中单词，则查询所有未查询成功的单词，都已成功则全部重新查询
+            rows = [row for row in range(self.newWordModel.count()) if self.newWordModel.state(row) != WordState.DONE]
+            rows = rows or range(self.newWordModel.count())
 
-        row_words = []
-        for wordItem in wordItems:
-            row = self.newWordListWidget.row(wordItem)
-            row_words.append((row, wordItem.text())) # type: ignore
+        row_words = [(row, self.newWordModel.word(row)) for row in rows]
 
         logger.info(f'待查询单词{row_words}')
         self.resetProgressBar(len(row_words))
+        self.startQuery(row_words)
 
-        # 查询线程
+    def startQuery(self, row_words: Iterable[tuple[int, str]]):
+        """查询线程，`row_words` 可以是获取单词时边比对边填入的 `WordFeed`"""
         # 判断是否需要下载发音
         if self.conf.no_pron:
             logger.info('不下载发音')
@@ -291,26 +477,27 @@ class Windows(QDialog, mainUI.Ui_Dialog):
         else:
             whichPron = C.F_AMEPRON if self.conf.ame_pron else C.F_BREPRON
             logger.info(f'下载发音{whichPron}')
-        worker = QueryAllWorker(row_words, whichPron, self.get_current_api(), self.conf.congest)
-        worker.rowSuccess.connect(self.on_queryRowSuccess)
-        worker.rowFail.connect(self.on_queryRowFail)
-        worker.query_word_tick.connect(lambda: self.progressBar.setValue(self.progressBar.value() + 1))
+        fields = noteManager.queryFields(self.conf)
+        logger.info(f'查询字段{sorted(fields)}')
+        worker = QueryAllWorker(row_words, whichPron, self.get_current_api(), self.conf.congest, fields)
+        worker.rowsDone.connect(self.on_queryRowsDone)
         worker.doneWithResult.connect(self.on_queryDone)
         self.workerman.start(worker)
 
-    @pyqtSlot(int, str, dict)
-    def on_queryRowSuccess(self, row, word, result):
-        """该行单词查询完毕"""
-        doneIcon = QIcon(':/icons/done.png')
-        wordItem = self.newWordListWidget.item(row)
-        wordItem.setIcon(doneIcon) # type: ignore
-        wordItem.setData(Qt.ItemDataRole.UserRole, result) # type: ignore
-
-    @pyqtSlot(int, str)
-    def on_queryRowFail(self, row, word):
-        failedIcon = QIcon(':/icons/failed.png')
-        failedWordItem = self.newWordListWidget.item(row)
-        failedWordItem.setIcon(failedIcon) # type: ignore
+    @pyqtSlot(list)
+    def on_queryRowsDone(self, rows: list[tuple[int, str, Optional[QueryWordData]]]):
+        """一批单词查询完毕，失败的结果为 None"""
+        row_results = []
+        for row, word, result in rows:
+            if (row := self.newWordModel.locate(row, word)) is not None:
+                row_results.append((row, result))
+        self.newWordModel.set_results(row_results)
+        self.queryJournal.mark_done((word, result) for _row, word, result in rows if result)
+        if self.pipeline:
+            self.pipeline.queried += len(rows)
+            self.updatePipelineProgress()
+        else:
+            self.progressBar.setValue(self.progressBar.value() + len(rows))
 
     @pyqtSlot(list)
     def on_queryDone(self, results):
@@ -320,6 +507,13 @@ class Windows(QDialog, mainUI.Ui_Dialog):
                 failed_words.append(word)
         if failed_words:
             logger.warning(f'查询失败:{failed_words}')
+        logger.info(queryCache.stats())
+        logger.info(audioCache.stats())
+
+        if self.pipeline:
+            self.pipeline.querying = False
+            self._finishPipeline()
+            return
 
         self.pullRemoteWordsBtn.setEnabled(True)
         self.queryBtn.setEnabled(True)
@@ -328,12 +522,11 @@ class Windows(QDialog, mainUI.Ui_Dialog):
     @pyqtSlot()
     def on_syncBtn_clicked(self):
 
-        for i in range(self.newWordListWidget.count()):
-            if not self.newWordListWidget.item(i).data(Qt.ItemDataRole.UserRole): # type: ignore
-                if not aqt.utils.askUser(
-                    '存在未查询或失败的单词，确定要加入单词本吗？\n 你可以选择失败的单词点击 "查询按钮" 来重试。'):
-                    return
-                break
+        wordResults = self.newWordModel.results()
+        if not all(wordResults):
+            if not aqt.utils.askUser(
+                '存在未查询或失败的单词，确定要加入单词本吗？\n 你可以选择失败的单词点击 "查询按钮" 来重试。'):
+                return
 
         self.syncBtn.setEnabled(False)
         logger.info('同步点击')
@@ -347,13 +540,10 @@ class Windows(QDialog, mainUI.Ui_Dialog):
         else:
             whichPron = C.F_AMEPRON if self.conf.ame_pron else C.F_BREPRON
 
-        added = 0
-        for i in range(self.newWordListWidget.count()):
-            wordItem = self.newWordListWidget.item(i)
-            wordItemData: Optional[QueryWordData] = wordItem.data(Qt.ItemDataRole.UserRole) # type: ignore
+        queryResults: list[QueryWordData] = []
+        for wordItemData in wordResults:
             if wordItemData:
-                noteManager.addNoteToDeck(deck, model, self.conf, wordItemData)
-                added += 1
+                queryResults.append(wordItemData)
                 # 移动发音文件，从 {tmp}/Dict2Anki/audios 到 anki 媒体库文件夹
                 if whichPron and wordItemData.get(whichPron):
                     fname = misc.audio_fname(whichPron, wordItemData[C.F_TERM])
@@ -364,22 +554,41 @@ class Windows(QDialog, mainUI.Ui_Dialog):
                             os.remove(audio_to)
                         shutil.move(audio_from, audio_to)
 
-        self.newWordListWidget.clear()
+        if not queryResults:
+            self._syncDeleteWords(0)
+            return
+
+        # 批量添加笔记，后台执行，避免阻塞界面
+        CollectionOp(
+            self, lambda col: noteManager.addNotesToDeck(deck, model, self.conf, queryResults)
+        ).success(lambda _: self._syncDeleteWords(len(queryResults))).failure(self._on_addNotesFailed).run_in_background()
+
+    def _on_addNotesFailed(self, e: Exception):
+        logger.error('添加笔记失败', exc_info=e)
+        aqt.utils.showCritical(f'添加笔记失败：{e}')
+        self.syncBtn.setEnabled(True)
 
-        needDeleteItems = self.needDeleteWordsView.checked_items()
-        needToDeleteWords = self.needDeleteWordsView.item_texts(needDeleteItems)
+    def _syncDeleteWords(self, added: int):
+        """添加笔记完成后，删除待删除单词"""
+        self.newWordModel.clear()
+
+        needDeleteRows = self.needDeleteWordsView.checked_rows()
+        needToDeleteWords = self.needDeleteWordsView.words(needDeleteRows)
 
         deleted = 0
 
         if needToDeleteWords and aqt.utils.askUser(
             f'确定要删除这些单词吗:{needToDeleteWords[:3]}...({len(needToDeleteWords)}个)', title=C.ADDON_FULL_NAME, parent=self):
-            noteIds = noteManager.getNoteIds(needToDeleteWords, self.conf.deck)
+            noteIds = noteManager.getNoteIds(needToDeleteWords, self.conf.deck, self.localWordIndex)
             noteManager.removeNotes(noteIds)
+            for word in needToDeleteWords:
+                self.localWordIndex.pop(word, None)
             deleted = len(needToDeleteWords)
-            self.needDeleteWordsView.remove_items(needDeleteItems)
+            self.needDeleteWordsView.remove_rows(needDeleteRows)
             logger.info('删除完成')
 
         aqt.mw.reset()
+        self.queryJournal.finish()
 
         logger.info('完成')
         self.syncBtn.setEnabled(True)
@@ -411,17 +620,16 @@ class Windows(QDialog, mainUI.Ui_Dialog):
 
 
 class NeedDeleteWordsView:
-    def __init__(self, title_checkbox: aqt.QCheckBox, list_widget: aqt.QListWidget):
+    def __init__(self, title_checkbox: aqt.QCheckBox, list_view: aqt.QListView):
         self._checkbox = title_checkbox
-        self._list_widget = list_widget
-        self._delIcon = QIcon(":/icons/delete.png")
+        self._list_view = list_view
+        self._model = WordListModel({WordState.WAIT: ':/icons/delete.png'}, checkable=True, parent=list_view)
+        self._list_view.setModel(self._model)
         self._listen_checkbox_change()
 
     def _listen_checkbox_change(self):
         def on_cb_change(state):
-            check_state = Qt.CheckState(state)
-            for item in self._items_iter():
-                item.setCheckState(check_state)
+            self._model.set_all_checked(Qt.CheckState(state) == Qt.CheckState.Checked)
 
         self._checkbox.stateChanged.connect(on_cb_change)
 
@@ -431,42 +639,27 @@ class NeedDeleteWordsView:
             self._checkbox.setChecked(True)
             self._checkbox.blockSignals(False)
 
-    def _items_iter(self) -> Iterable[aqt.QListWidgetItem]:
-        return (self._list_widget.item(i) for i in range(self._list_widget.count()))  # type: ignore
-
-    def items(self) -> list[aqt.QListWidgetItem]:
-        return list(self._items_iter())
-
-    def checked_items(self) -> list[aqt.QListWidgetItem]:
-        return list(
-            filter(
-                lambda item: item.checkState() == Qt.CheckState.Checked,
-                self._items_iter(),
-            )
-        )
+    def words(self, rows: Optional[Iterable[int]] = None) -> list[str]:
+        """words of `rows`, all words if None"""
+        return self._model.words(rows)
 
-    def item_texts(self, items: Iterable[aqt.QListWidgetItem]) -> list[str]:
-        return [item.text() for item in items]
+    def checked_rows(self) -> list[int]:
+        return self._model.checked_rows()
 
-    def add_items(self, texts: Iterable[str]):
-        for text in texts:
-            self.add_item(text)
+    def set_words(self, words: Iterable[str]):
+        self._model.set_words(words)
 
-    def add_item(self, text: str):
-        item = QListWidgetItem(text)
-        item.setCheckState(Qt.CheckState.Checked)
-        item.setIcon(self._delIcon)
-        self._list_widget.addItem(item)
+    def add_words(self, words: Iterable[str]):
+        self._model.append_words(words)
 
-    def remove_items(self, items: Iterable[aqt.QListWidgetItem]):
-        for item in items:
-            self._list_widget.takeItem(self._list_widget.row(item))
+    def remove_rows(self, rows: Iterable[int]):
+        self._model.remove_rows(rows)
 
     def empty(self):
-        return self._list_widget.count() == 0
+        return self._model.empty()
 
     def clear(self):
-        self._list_widget.clear()
+        self._model.clear()
 
 
 class ConfCtl:
@@ -503,6 +696,8 @@ class ConfCtl:
         w.noPronRadioButton.setChecked(conf.no_pron)
         w.congestSpinBox.setValue(conf.congest)
         w.uaLineEdit.setText(conf.user_agent)
+        w.incrementalSyncCheckBox.setChecked(conf.incremental_sync)
+        w.pullAndQueryCheckBox.setChecked(conf.pull_and_query)
         undoicon = QIcon.fromTheme('edit-undo')
         uaAction = w.uaLineEdit.addAction(undoicon, aqt.QLineEdit.ActionPosition.TrailingPosition)
         uaAction.setToolTip('回到默认')
@@ -559,6 +754,12 @@ class ConfCtl:
         def _on_ua_line_edit_changed(text):
             conf.user_agent = text
 
+        def _on_incremental_sync_cb_change(state):
+            conf.incremental_sync = state == Qt.CheckState.Checked.value
+
+        def _on_pull_and_query_cb_change(state):
+            conf.pull_and_query = state == Qt.CheckState.Checked.value
+
         # register events
         w.deckComboBox.currentTextChanged.connect(_on_deck_combobox_change)
         w.dictionaryComboBox.currentIndexChanged.connect(_on_dict_combobox_change)
@@ -575,6 +776,8 @@ class ConfCtl:
         w.noPronRadioButton.toggled.connect(_on_no_pron_radio_toggled)
         w.congestSpinBox.valueChanged.connect(_on_congest_spinbox_change)
         w.uaLineEdit.textChanged.connect(_on_ua_line_edit_changed)
+        w.incrementalSyncCheckBox.stateChanged.connect(_on_incremental_sync_cb_change)
+        w.pullAndQueryCheckBox.stateChanged.connect(_on_pull_and_query_cb_change)
         uaAction.triggered.connect(lambda: w.uaLineEdit.setText(conf.default_user_agent))
 
         def update_cookies_line_edit(val: str):
@@ -584,3 +787,26 @@ class ConfCtl:
 
         # register model events. For now only `current_cookies` is actively modified by code (not by user)
         conf.listen('current_cookies', update_cookies_line_edit)
+
+
+class PipelineProgress:
+    """获取后立即查询时两个阶段的进度"""
+
+    def __init__(self):
+        self.pages = 0
+        """待获取的总页数，随各分组的总数获取到而增加"""
+        self.pulled = 0
+        self.found = 0
+        """新单词数，即待查询数"""
+        self.queried = 0
+        self.pulling = True
+        self.querying = True
+
+    def maximum(self) -> int:
+        return self.pages + self.found
+
+    def value(self) -> int:
+        return self.pulled + self.queried
+
+    def text(self) -> str:
+        return f'获取单词：{self.pulled} / {self.pages} 页，新单词：{self.found}，查询：{self.queried} / {self.found}'
@@ -0,0 +1,211 @@
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from . import misc
+
+logger = logging.getLogger('dict2Anki.audioCache')
+
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024
+"""发音缓存大小上限，超出后按最近访问时间淘汰"""
+_EVICT_EVERY = 20
+"""每写入 N 次检查一次是否需要淘汰"""
+
+
+def file_hash(fileName: str) -> str:
+    h = hashlib.sha1()
+    with open(fileName, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class AudioCache(misc.HitStats):
+    """
+    Persistent audio file cache, keyed by source url, shared by all runs and decks.
+
+    Files are stored once by content hash under `cacheDir/blobs`, an SQLite index maps urls to
+    hashes, so different urls serving the same audio take the space of one file. Least
+    recently used urls are evicted when the files exceed `max_bytes`, a file is deleted
+    once no url refers to it.
+
+    Only the index is accessed under the lock. Files are copied outside it, through
+    temporary files under `cacheDir/tmp`, and moved into the media folder atomically, so
+    a crash leaves no partial file there.
+    """
+
+    stats_name = '发音缓存'
+
+    def __init__(self, cacheDir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        super().__init__()
+        self._dir = cacheDir
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._puts = 0
+
+        os.makedirs(os.path.join(cacheDir, 'blobs'), exist_ok=True)
+        # 清理上次崩溃留下的临时文件
+        shutil.rmtree(os.path.join(cacheDir, 'tmp'), ignore_errors=True)
+        os.makedirs(os.path.join(cacheDir, 'tmp'), exist_ok=True)
+        self._conn: Optional[sqlite3.Connection] = sqlite3.connect(
+            os.path.join(cacheDir, 'index.db'), check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS audio_cache ('
+            'url TEXT PRIMARY KEY, hash TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS audio_cache_accessed ON audio_cache (accessed)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS audio_cache_hash ON audio_cache (hash)')
+        with self._lock:
+            self._evict()
+
+    def _blob(self, digest: str) -> str:
+        return os.path.join(self._dir, 'blobs', digest[:2], f'{digest}.mp3')
+
+    def _tmp(self) -> str:
+        """temporary file of the current thread"""
+        return os.path.join(self._dir, 'tmp', f'{threading.get_ident()}.tmp')
+
+    def fetch(self, url: str, fileName: str) -> bool:
+        """copy the cached audio of `url` to `fileName`, False if not cached or failed to copy"""
+        with self._lock:
+            if self._conn is None:
+                return False
+            row = self._conn.execute('SELECT hash FROM audio_cache WHERE url=?', (url,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return False
+        digest = row[0]
+        blob = self._blob(digest)
+        # 复制不占用锁，其他线程可同时读写缓存
+        tmp = self._tmp()
+        try:
+            shutil.copyfile(blob, tmp)
+            # 媒体文件夹在其他磁盘上时经由它旁边的临时文件替换
+            misc.replace_file(tmp, fileName)
+        except OSError as e:
+            with self._lock:
+                self.misses += 1
+                if self._conn is not None and not os.path.exists(blob):
+                    # 文件被删除，索引作废
+                    self._conn.execute('DELETE FROM audio_cache WHERE url=? AND hash=?', (url, digest))
+                else:
+                    logger.warning(f'读取发音缓存失败: {e}')
+            return False
+        finally:
+            _remove(tmp)
+        with self._lock:
+            if self._conn is not None:
+                self._conn.execute('UPDATE audio_cache SET accessed=? WHERE url=?', (time.time(), url))
+            self.hits += 1
+        return True
+
+    def put(self, url: str, fileName: str):
+        """store the downloaded `fileName` as the audio of `url`"""
+        digest = file_hash(fileName)
+        size = os.path.getsize(fileName)
+        blob = self._blob(digest)
+        tmp = None
+        try:
+            if not os.path.isfile(blob):
+                # 复制不占用锁，放入缓存时再检查，其他线程可能已放入同样的文件
+                tmp = self._tmp()
+                shutil.copyfile(fileName, tmp)
+            with self._lock:
+                if self._conn is None:
+                    return
+                if tmp and not os.path.isfile(blob):
+                    os.makedirs(os.path.dirname(blob), exist_ok=True)
+                    os.replace(tmp, blob)
+                self._index(url, digest, size)
+        finally:
+            if tmp:
+                _remove(tmp)
+
+    def count(self) -> int:
+        with self._lock:
+            if self._conn is None:
+                return 0
+            return self._conn.execute('SELECT COUNT(*) FROM audio_cache').fetchone()[0]
+
+    def size(self) -> int:
+        """bytes taken by cached files"""
+        with self._lock:
+            if self._conn is None:
+                return 0
+            return self._size()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _size(self) -> int:
+        assert self._conn
+        return self._conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM (SELECT MAX(size) AS size FROM audio_cache GROUP BY hash)'
+        ).fetchone()[0]
+
+    def _index(self, url: str, digest: str, size: int):
+        """point `url` to the stored file of `digest`"""
+        assert self._conn
+        old = self._conn.execute('SELECT hash FROM audio_cache WHERE url=?', (url,)).fetchone()
+        self._conn.execute(
+            'INSERT OR REPLACE INTO audio_cache (url, hash, size, accessed) VALUES (?, ?, ?, ?)',
+            (url, digest, size, time.time()),
+        )
+        if old and old[0] != digest:
+            self._remove_unused(old[0])
+        self._puts += 1
+        if self._puts % _EVICT_EVERY == 0:
+            self._evict()
+
+    def _remove_unused(self, digest: str) -> bool:
+        """delete the file of `digest` if no url refers to it"""
+        assert self._conn
+        if self._conn.execute('SELECT 1 FROM audio_cache WHERE hash=? LIMIT 1', (digest,)).fetchone():
+            return False
+        try:
+            os.remove(self._blob(digest))
+        except FileNotFoundError:
+            pass
+        return True
+
+    def _evict(self):
+        assert self._conn
+        size = self._size()
+        if size <= self._max_bytes:
+            return
+        evicted = 0
+        rows = self._conn.execute('SELECT url, hash, size FROM audio_cache ORDER BY accessed ASC').fetchall()
+        for url, digest, blobSize in rows:
+            if size <= self._max_bytes:
+                break
+            self._conn.execute('DELETE FROM audio_cache WHERE url=?', (url,))
+            evicted += 1
+            if self._remove_unused(digest):
+                size -= blobSize
+        logger.debug(f'淘汰发音缓存{evicted}条')
+
+
+def _remove(fileName: str):
+    """remove a temporary file if left"""
+    try:
+        os.remove(fileName)
+    except OSError:
+        pass
+
+
+_holder = misc.CacheHolder(AudioCache, '发音缓存', (sqlite3.Error, OSError))
+open_cache = _holder.open
+"""Open the global cache used by `downloadSingleAudio`, with arguments of `AudioCache`."""
+close_cache = _holder.close
+get_cache = _holder.get
+stats = _holder.stats
@@ -285,6 +285,26 @@ class Conf(_typing.ListenableModel):
     def user_agent(self, val: str):
         self._map['user_agent'] = val
 
+    @property
+    def incremental_sync(self) -> bool:
+        # compatible to configs without it
+        return self._map.get('incrementalSync', False)
+
+    @incremental_sync.setter
+    @_set_dirty
+    def incremental_sync(self, val: bool):
+        self._map['incrementalSync'] = val
+
+    @property
+    def pull_and_query(self) -> bool:
+        # compatible to configs without it
+        return self._map.get('pullAndQuery', False)
+
+    @pull_and_query.setter
+    @_set_dirty
+    def pull_and_query(self, val: bool):
+        self._map['pullAndQuery'] = val
+
     @property
     def current_selected_groups(self) -> list[str]:
         try:
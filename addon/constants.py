@@ -23,4 +23,5 @@ F_CONGEST = 'congest' # 限流
 
 BASIC_OPTION = [F_DEFINITION, F_SENTENCE, F_PHRASE, F_IMAGE, F_BREPHONETIC, F_AMEPHONETIC]  # 顺序和名称不可修改
 EXTRA_OPTION = [F_BREPRON, F_AMEPRON, F_NOPRON]  # 顺序和名称不可修改
+QUERY_FIELDS = frozenset([F_DEFINITION, F_SENTENCE, F_PHRASE, F_IMAGE, F_BREPHONETIC, F_AMEPHONETIC, F_BREPRON, F_AMEPRON])  # 查询API可返回的字段
 MODEL_FIELDS = [F_TERM, F_DEFINITION, F_SENTENCE_FRONT, F_SENTENCE_BACK, F_PHRASE_FRONT, F_PHRASE_BACK, F_IMAGE, F_BREPHONETIC, F_AMEPHONETIC, F_BREPRON, F_AMEPRON]  # 名称不可修改
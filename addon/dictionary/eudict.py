@@ -27,6 +27,8 @@ class Eudict(AbstractDictionary):
     session.mount('https://', HTTPAdapter(max_retries=retries))
     session.headers.update(headers)
     groups: list[tuple[str, str]] = []
+    pageSize = 100
+    pageSizes = (1000, 100)
 
     _indexSoup: Optional[BeautifulSoup] = None
 
@@ -71,6 +73,22 @@ class Eudict(AbstractDictionary):
         cls.groups = groups
         return groups
 
+    @classmethod
+    def requestPage(cls, groupId: str, offset: int, limit: int) -> tuple[int, list[str]]:
+        r = cls.session.post(
+            url='https://my.eudic.net/StudyList/WordsDataSource',
+            timeout=cls.timeout,
+            data={
+                'columns[2][data]': 'word',
+                'start': offset,
+                'length': limit,
+                'categoryid': groupId,
+                '_': int(time.time()) * 1000,
+            }
+        )
+        wl = r.json()
+        return wl['recordsTotal'], list(dict.fromkeys(word['uuid'] for word in wl['data']))
+
     @classmethod
     def getTotalPage(cls, groupName: str, groupId: str) -> int:
         """
@@ -80,13 +98,8 @@ class Eudict(AbstractDictionary):
         :return:
         """
         try:
-            r = cls.session.post(
-                url='https://my.eudic.net/StudyList/WordsDataSource',
-                timeout=cls.timeout,
-                data={'categoryid': groupId}
-            )
-            records = r.json()['recordsTotal']
-            totalPages = ceil(records / 100)
+            records, _ = cls.requestPage(groupId, 0, 1)
+            totalPages = ceil(records / cls.pageSize)
             logger.info(f'该分组({groupName}-{groupId})下共有{totalPages}页')
             return totalPages
         except Exception as error:
@@ -94,24 +107,12 @@ class Eudict(AbstractDictionary):
             return 0
 
     @classmethod
-    def getWordsByPage(cls, pageNo: int, groupName: str, groupId: str) -> list[str]:
+    def getWordsByPage(cls, pageNo: int, groupName: str, groupId: str, pageSize: Optional[int] = None) -> list[str]:
         wordList = []
-        data = {
-            'columns[2][data]': 'word',
-            'start': pageNo * 100,
-            'length': 100,
-            'categoryid': groupId,
-            '_': int(time.time()) * 1000,
-        }
         try:
             logger.info(f'获取单词本({groupName}-{groupId})第:{pageNo + 1}页')
-            r = cls.session.post(
-                url='https://my.eudic.net/StudyList/WordsDataSource',
-                timeout=cls.timeout,
-                data=data
-            )
-            wl = r.json()
-            wordList = list(set(word['uuid'] for word in wl['data']))
+            pageSize = pageSize or cls.pageSize
+            _, wordList = cls.requestPage(groupId, pageNo * pageSize, pageSize)
         except Exception as error:
             logger.exception(f'网络异常{error}')
         finally:
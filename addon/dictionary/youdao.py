@@ -26,6 +26,8 @@ class Youdao(AbstractDictionary):
     session.mount('http://', HTTPAdapter(max_retries=retries))
     session.mount('https://', HTTPAdapter(max_retries=retries))
     groups: list[tuple[str, str]] = []
+    pageSize = 15  # 网页默认每页15个
+    pageSizes = (1000, 15)
 
     _indexSoup: Optional[BeautifulSoup] = None
 
@@ -68,6 +70,16 @@ class Youdao(AbstractDictionary):
 
         return groups
 
+    @classmethod
+    def requestPage(cls, groupId: str, offset: int, limit: int) -> tuple[int, list[str]]:
+        r = cls.session.get(
+            'http://dict.youdao.com/wordbook/webapi/words',
+            timeout=cls.timeout,
+            params={'bookId': groupId, 'limit': limit, 'offset': offset}
+        )
+        data = r.json()['data']
+        return data['total'], [item['word'] for item in data['itemList']]
+
     @classmethod
     def getTotalPage(cls, groupName: str, groupId: str) -> int:
         """
@@ -77,13 +89,8 @@ class Youdao(AbstractDictionary):
         :return:
         """
         try:
-            r = cls.session.get(
-                url='http://dict.youdao.com/wordbook/webapi/words',
-                timeout=cls.timeout,
-                params={'bookId': groupId, 'limit': 1, 'offset': 0}
-            )
-            totalWords = r.json()['data']['total']
-            totalPages = ceil(totalWords / 15)  # 这里按网页默认每页取15个
+            totalWords, _ = cls.requestPage(groupId, 0, 1)
+            totalPages = ceil(totalWords / cls.pageSize)
             logger.info(f'该分组({groupName}-{groupId})下共有{totalPages}页')
             return totalPages
         except Exception as error:
@@ -91,23 +98,20 @@ class Youdao(AbstractDictionary):
             return 0
 
     @classmethod
-    def getWordsByPage(cls, pageNo: int, groupName: str, groupId: str) -> list[str]:
+    def getWordsByPage(cls, pageNo: int, groupName: str, groupId: str, pageSize: Optional[int] = None) -> list[str]:
         """
         获取分组下每一页的单词
         :param pageNo: 页数
         :param groupName: 分组名
         :param groupId: 分组id
+        :param pageSize: 每页单词数，`getFirstPage` 探测的结果，None 为默认
         :return:
         """
         wordList = []
         try:
             logger.info(f'获取单词本({groupName}-{groupId})第:{pageNo}页')
-            r = cls.session.get(
-                'http://dict.youdao.com/wordbook/webapi/words',
-                timeout=cls.timeout,
-                params={'bookId': groupId, 'limit': 15, 'offset': pageNo * 15}
-            )
-            wordList = [item['word'] for item in r.json()['data']['itemList']]
+            pageSize = pageSize or cls.pageSize
+            _, wordList = cls.requestPage(groupId, pageNo * pageSize, pageSize)
         except Exception as e:
             logger.exception(f'网络异常{e}')
         finally:
@@ -0,0 +1,179 @@
+"""
+Append-only journal of a long running job (querying words, repairing notes), so the job
+can be resumed after the window is closed or Anki crashes.
+
+One JSON object per line, each line is flushed as soon as written (synced to disk on
+start and close only, the writers run on the GUI thread):
+
+- ``{"start": kind, "params": {...}}``, the first line
+- ``{"items": [...]}``, items of the job, repeated as more items are found
+- ``{"done": [[key, data], ...]}``, completed items with what is needed to restore them
+- ``{"extra": {...}}``, other state, later values override earlier ones
+
+The journal is removed once the job is finished, an existing journal is always an
+unfinished job. A last line cut by a crash is ignored, and cut off when resuming. Lines
+lost in a crash only cost redoing those items.
+"""
+import json
+import logging
+import os
+import threading
+from typing import Any, Iterable, Optional, TextIO
+
+logger = logging.getLogger('dict2Anki.jobJournal')
+
+
+class Job:
+    """an unfinished job read back from its journal"""
+
+    def __init__(self, kind: str, params: dict):
+        self.kind = kind
+        self.params = params
+        self.items: list = []
+        self.done: dict[Any, Any] = {}
+        """key -> data of completed items"""
+        self.extra: dict[str, Any] = {}
+
+    def pending(self) -> list:
+        """items not completed yet, in order"""
+        return [item for item in self.items if item not in self.done]
+
+
+class JobJournal:
+    """
+    Journal file of one kind of job, a new job replaces the last one.
+
+    Thread safe. Writing does nothing unless a job is started or resumed.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._lock = threading.Lock()
+        self._file: Optional[TextIO] = None
+
+    @property
+    def active(self) -> bool:
+        return self._file is not None
+
+    def exists(self) -> bool:
+        """an unfinished job is left"""
+        return os.path.exists(self._path)
+
+    def load(self) -> Optional[Job]:
+        """the unfinished job, None if none or unreadable"""
+        try:
+            with open(self._path, encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f'读取任务记录失败: {e}')
+            return None
+
+        job: Optional[Job] = None
+        for i, line in enumerate(lines):
+            try:
+                record = json.loads(line)
+                if job is None:
+                    job = Job(record['start'], record['params'])
+                elif 'items' in record:
+                    job.items.extend(record['items'])
+                elif 'done' in record:
+                    job.done.update((key, data) for key, data in record['done'])
+                elif 'extra' in record:
+                    job.extra.update(record['extra'])
+            except (ValueError, KeyError, TypeError) as e:
+                if i < len(lines) - 1 or job is None:
+                    logger.warning(f'任务记录损坏: {self._path}, {e}')
+                    return None
+                # 最后一行未写完
+        return job
+
+    def start(self, kind: str, params: dict):
+        """start a new job, the last one is dropped"""
+        with self._lock:
+            self._close()
+            try:
+                os.makedirs(os.path.dirname(self._path), exist_ok=True)
+                self._file = open(self._path, 'w', encoding='utf-8')
+            except OSError as e:
+                logger.warning(f'创建任务记录失败，无法恢复本次任务: {e}')
+                return
+            self._write({'start': kind, 'params': params})
+            self._sync()
+
+    def resume(self) -> Optional[Job]:
+        """load the unfinished job and go on journaling it"""
+        job = self.load()
+        if job is None:
+            return None
+        with self._lock:
+            self._close()
+            try:
+                self._truncateTornLine()
+                self._file = open(self._path, 'a', encoding='utf-8')
+            except OSError as e:
+                logger.warning(f'打开任务记录失败: {e}')
+        return job
+
+    def add_items(self, items: Iterable):
+        self._append('items', list(items))
+
+    def mark_done(self, entries: Iterable[tuple[Any, Any]]):
+        """:param entries: (key, data) of completed items"""
+        self._append('done', [[key, data] for key, data in entries])
+
+    def set_extra(self, **extra):
+        self._append('extra', extra)
+
+    def finish(self):
+        """the job is done, remove the journal"""
+        with self._lock:
+            self._close()
+            try:
+                os.remove(self._path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f'删除任务记录失败: {e}')
+
+    def close(self):
+        """stop journaling, the job can be resumed later"""
+        with self._lock:
+            self._sync()
+            self._close()
+
+    def _append(self, key: str, value):
+        if not value:
+            return
+        with self._lock:
+            if self._file:
+                self._write({key: value})
+
+    def _write(self, record: dict):
+        assert self._file
+        try:
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self._file.flush()
+        except OSError as e:
+            logger.warning(f'写入任务记录失败: {e}')
+
+    def _sync(self):
+        if self._file:
+            try:
+                os.fsync(self._file.fileno())
+            except OSError as e:
+                logger.warning(f'写入任务记录失败: {e}')
+
+    def _truncateTornLine(self):
+        """cut off the last line left unfinished by a crash, so appending starts a new line"""
+        with open(self._path, 'rb+') as f:
+            data = f.read()
+            end = data.rfind(b'\n') + 1
+            if end < len(data):
+                f.truncate(end)
+
+    def _close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
@@ -1,90 +1,256 @@
 import base64
 import logging
 import os
+import shutil
 import tempfile
 import time
-from queue import Queue
-from threading import Thread
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from threading import BoundedSemaphore, Event, Lock
+from typing import Callable, Generic, Optional, TypeVar, Union
+from urllib.parse import urlparse
 
 logger = logging.getLogger("dict2Anki.misc")
 
 
-class Worker(Thread):
-    def __init__(self, queue, result_queue):
-        super(Worker, self).__init__()
-        self._q = queue
-        self.result_queue = result_queue
-        self.daemon = True
-        self.interrupted = False
-        self.start()
+class Executor:
+    """
+    Long-lived thread pool based on `concurrent.futures`.
 
-    def run(self):
-        while True:
-            try:
-                f, args, kwargs = self._q.get()
-                if self.interrupted:
-                    return
-                result = f(*args, **kwargs)
-                self.result_queue.put((args, kwargs, result))
-            except Exception as e:
-                logger.exception(e)
-            finally:
-                self._q.task_done()
-
-
-class ThreadPool:
-    def __init__(self, max_workers):
-        self._q = Queue(max_workers)
-        self.results_q = Queue()
-        self.result = []
-        """each item of result is a tuple ( args, kwargs, ret ).
-        'args', 'kwargs' are the unnamed and named arguments you pass to submit function"""
-        self._workers: list[Worker] = []
-        # Create Worker Thread
-        for _ in range(max_workers):
-            self._workers.append(Worker(self._q, self.results_q))
-
-    def submit(self, f, *args, **kwargs):
-        self._q.put((f, args, kwargs))
-
-    def wait_complete(self):
-        self._q.join()
-        while not self.results_q.qsize() == 0:
-            self.result.append(self.results_q.get())
-
-        return self.result
-
-    def exit(self):
-        self.wait_complete()
-
-        # At this point all threads are blocked by queue.get(),
-        # so put dummy items to unblock them.
-        # Till Python 3.13 we can switch to queue.shutdown()
-        for worker in self._workers:
-            worker.interrupted = True  # run in GIL, presume thread safe?
-        for _ in range(len(self._workers)):
-            self._q.put((lambda: None, tuple(), dict()))
-
-    def __enter__(self):
-        return self
-
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.exit()
-
-
-def congestGenerator(n=60):
-    """yields n times per minute"""
-    co = n / 60
-    start = time.time()
-    cnt = 1
-    yield  #  yield first iteration immediately
-
-    while True:
-        if (time.time() - start) * co > cnt:
-            cnt += 1
-            yield
+    Tracks pending futures so they can all be cancelled at once when the addon window
+    closes. Exceptions are not swallowed, they propagate through `Future.result()`.
+    """
+
+    def __init__(self, max_workers: int, name: str = "Dict2Anki"):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._futures: set[Future] = set()
+        self._lock = Lock()
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future = self._executor.submit(fn, *args, **kwargs)
+        with self._lock:
+            self._futures.add(future)
+        # callback is invoked immediately if already done
+        future.add_done_callback(self._discard)
+        return future
+
+    def map(
+        self,
+        fn,
+        *iterables,
+        limit: Union[int, BoundedSemaphore, None] = None,
+        stop: Optional[Callable[[], bool]] = None,
+    ) -> list:
+        """
+        Concurrent version of builtin `map`, returns results in the order of arguments.
+
+        :param limit: max calls running at the same time, so a long batch doesn't occupy
+            the whole shared pool. Pass a semaphore (see `slots`) to share the limit among
+            concurrent `map` calls
+        :param stop: checked before each submit, if returns True the remaining calls are
+            cancelled and `CancelledError` is raised
+        :raise: the exception of the first failed call in argument order. Once a call
+            fails no more calls are submitted, the pending ones are cancelled
+        """
+        slots = self.slots(limit) if isinstance(limit, int) else limit
+        futures: list[Future] = []
+        failed = Event()
+
+        def _done(future: Future):
+            # mark before releasing, so the call waiting for the slot sees the failure
+            if not future.cancelled() and future.exception() is not None:
+                failed.set()
+            if slots:
+                slots.release()
+
+        try:
+            for args in zip(*iterables):
+                if slots:
+                    slots.acquire()
+                if failed.is_set():
+                    if slots:
+                        slots.release()
+                    break
+                if stop and stop():
+                    if slots:
+                        slots.release()
+                    raise CancelledError()
+                future = self.submit(fn, *args)
+                future.add_done_callback(_done)
+                futures.append(future)
+            return [future.result() for future in futures]
+        finally:
+            for future in futures:
+                future.cancel()
+
+    @staticmethod
+    def slots(limit: int) -> Optional[BoundedSemaphore]:
+        """`limit` for `map`, None if 0 (unlimited)"""
+        return BoundedSemaphore(limit) if limit else None
+
+    def cancel_all(self) -> int:
+        """cancel all futures not started yet, returns number of cancelled futures"""
+        with self._lock:
+            futures = list(self._futures)
+        return sum(future.cancel() for future in futures)
+
+    def shutdown(self, wait=False):
+        cancelled = self.cancel_all()
+        if cancelled:
+            logger.info(f"取消{cancelled}个未开始的任务")
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _discard(self, future: Future):
+        with self._lock:
+            self._futures.discard(future)
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket rate limiter.
+
+    Refills `rate` tokens per second, holds at most `burst` tokens. `acquire()` reserves
+    tokens first and then sleeps outside the lock, so concurrent callers are spaced out
+    exactly by the rate instead of waking up together.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self._lock = Lock()
+        self._rate = rate
+        self._burst = max(1, burst)
+        self._tokens = float(self._burst)
+        self._last = time.monotonic()
+        self.acquired = 0
+        self.waited = 0
+        """number of acquisitions which had to wait"""
+        self.blocked_seconds = 0.0
+
+    def configure(self, rate: float, burst: int = 1):
+        with self._lock:
+            self._refill(time.monotonic())
+            self._rate = rate
+            self._burst = max(1, burst)
+            self._tokens = min(self._tokens, self._burst)
+
+    def acquire(self, tokens: int = 1) -> float:
+        """blocks until `tokens` are available, returns seconds waited"""
+        with self._lock:
+            self.acquired += 1
+            if self._rate <= 0:
+                return 0.0
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= tokens
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0.0
+            if wait > 0:
+                self.waited += 1
+                self.blocked_seconds += wait
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def _refill(self, now: float):
+        if self._rate > 0:
+            self._tokens = min(self._burst, self._tokens + (now - self._last) * self._rate)
+        self._last = now
+
+    def stats(self) -> str:
+        return f"请求:{self.acquired} 等待:{self.waited}次 共{self.blocked_seconds:.1f}秒"
+
+
+_rate_limiters: dict[str, TokenBucket] = {}
+_rate_limiters_lock = Lock()
+
+
+def rate_limiter(url: str, per_minute: float, burst: int = 1) -> TokenBucket:
+    """
+    Shared TokenBucket of the host of `url`, allowing `per_minute` requests per minute.
+
+    All workers requesting the same host share the same budget. Rate and burst of an
+    existing limiter are updated to the latest arguments.
+    """
+    host = urlparse(url).netloc or url
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(host)
+        if limiter is None:
+            limiter = _rate_limiters[host] = TokenBucket(per_minute / 60, burst)
         else:
-            time.sleep(1)
+            limiter.configure(per_minute / 60, burst)
+    return limiter
+
+
+class HitStats:
+    """Hit and miss counts of a cache, for logging after a run. The cache updates them under its own lock."""
+
+    stats_name = "缓存"
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0
+        return f"{self.stats_name} 命中:{self.hits} 未命中:{self.misses} 命中率:{rate:.1f}%"
+
+
+_T = TypeVar("_T")
+
+
+class CacheHolder(Generic[_T]):
+    """
+    The process wide instance of a cache, opened and closed with the addon window.
+
+    Failing to open only disables caching, `get` returns None then.
+    """
+
+    def __init__(self, factory: Callable[..., _T], name: str, errors: tuple[type[Exception], ...]):
+        """
+        :param factory: opens the cache, e.g. the cache class
+        :param name: shown in logs
+        :param errors: raised by `factory` when the cache can't be opened
+        """
+        self._factory = factory
+        self._name = name
+        self._errors = errors
+        self._cache: Optional[_T] = None
+
+    def open(self, *args, **kwargs) -> Optional[_T]:
+        """open the cache with arguments of `factory`, closing the one opened before"""
+        self.close()
+        try:
+            self._cache = self._factory(*args, **kwargs)
+        except self._errors as e:
+            logger.warning(f"打开{self._name}失败，不使用缓存: {e}")
+            self._cache = None
+        return self._cache
+
+    def close(self):
+        cache, self._cache = self._cache, None
+        if cache:
+            cache.close()  # type: ignore[attr-defined]
+
+    def get(self) -> Optional[_T]:
+        return self._cache
+
+    def stats(self) -> str:
+        return self._cache.stats() if self._cache else f"{self._name}未开启"  # type: ignore[attr-defined]
+
+
+def replace_file(src: str, dst: str):
+    """move `src` to `dst` atomically, by a sibling copy of `dst` if on another device"""
+    try:
+        os.replace(src, dst)
+    except OSError:
+        tmp = f"{dst}.tmp"
+        try:
+            shutil.copyfile(src, tmp)
+            os.replace(tmp, dst)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
 
 
 def audio_fname(prefix: str, term: str):
@@ -95,6 +261,12 @@ def tmp_audio_dir():
     return os.path.join(tempfile.gettempdir(), "Dict2Anki", "audios")
 
 
+def user_files_dir():
+    """`user_files` folder of the addon, which is kept by anki when upgrading the addon"""
+    addon_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(addon_dir, "user_files")
+
+
 _RANDOM_MASK = b'0SiCw@kFBPY^4n'
 
 
@@ -1,10 +1,12 @@
 import logging
 import os
 from collections.abc import Callable
-from typing import Optional
+from typing import AbstractSet, Optional
 
 import aqt
 from anki import models, notes
+from anki.collection import AddNoteRequest, OpChanges
+from anki.utils import ids2str, split_fields
 
 from . import conf_model, misc
 from . import constants as C
@@ -20,27 +22,47 @@ def getDeckNames():
     return [deck["name"] for deck in aqt.mw.col.decks.all()]
 
 
-def getWordsByDeck(deckName) -> list[str]:
-    assert aqt.mw.col
-    noteIds = aqt.mw.col.find_notes(f'deck:"{deckName}"')
-    words = []
-    for nid in noteIds:
-        note = aqt.mw.col.get_note(nid)
-        model = note.note_type()
-        if (
-            model
-            and model.get("name", "").lower().startswith("dict2anki")
-            and note["term"]
-        ):
-            words.append(note["term"])
-    return words
-
+def getWordIndexByDeck(deckName, modelName="Dict2Anki*") -> dict[str, list[notes.NoteId]]:
+    """
+    牌组中插件笔记的 term -> note ids 索引
 
-def getNoteIds(wordList, deckName) -> list[notes.NoteId]:
+    一次搜索限定笔记模版，再一次性从数据库取出字段，避免逐个 `get_note`。
+    :param modelName: 笔记模版名称，支持 anki 搜索通配符，默认匹配所有 Dict2Anki 版本的模版
+    """
     assert aqt.mw.col
+    col = aqt.mw.col
+    noteIds = col.find_notes(f'deck:"{deckName}" note:"{modelName}"')
+    if not noteIds:
+        return {}
+
+    termOrds: dict[int, Optional[int]] = {}
+    """model id -> ord of term field"""
+    index: dict[str, list[notes.NoteId]] = {}
+    for nid, mid, flds in col.db.all(f"select id, mid, flds from notes where id in {ids2str(noteIds)}"):
+        if mid not in termOrds:
+            model = col.models.get(mid)
+            fieldMap = col.models.field_map(model) if model else {}
+            termOrds[mid] = fieldMap[C.F_TERM][0] if C.F_TERM in fieldMap else None
+        if (termOrd := termOrds[mid]) is None:
+            continue
+        if term := split_fields(flds)[termOrd]:
+            index.setdefault(term, []).append(nid)
+    return index
+
+
+def getNoteIds(
+    wordList, deckName, wordIndex: Optional[dict[str, list[notes.NoteId]]] = None
+) -> list[notes.NoteId]:
+    """
+    一次性查出所有单词的 note ids，而不是每个单词搜索一次
+
+    :param wordIndex: `getWordIndexByDeck` 的结果，为空则重新建立
+    """
+    if not wordIndex:
+        wordIndex = getWordIndexByDeck(deckName)
     noteIds = []
     for word in wordList:
-        noteIds.extend(aqt.mw.col.find_notes(f'deck:"{deckName}" term:"{word}"'))
+        noteIds.extend(wordIndex.get(word, []))
     return noteIds
 
 
@@ -72,9 +94,10 @@ def removeNotes(noteIds):
     aqt.mw.col.remove_notes(noteIds)
 
 
-def updateNotes(notes):
+def updateNotes(notes) -> OpChanges:
+    """Slow for many notes, should run in background, e.g. through `aqt.operations.CollectionOp`."""
     assert aqt.mw.col
-    aqt.mw.col.update_notes(notes)
+    return aqt.mw.col.update_notes(notes)
 
 
 def getOrCreateDeck(deckName, model):
@@ -178,26 +201,41 @@ def addNoteToDeck(deckObject, modelObject, conf: conf_model.Conf, oneQueryResult
     assert aqt.mw.col
     modelObject["did"] = deckObject["id"]
 
-    newNote = aqt.mw.col.new_note(modelObject)
-    newNote[C.F_TERM] = oneQueryResult[C.F_TERM]
-    writeNoteFields(
-        newNote,
-        oneQueryResult,
-        conf,
-        [
-            writeNoteDefinition,
-            writeNotePhrase,
-            writeNoteSentence,
-            writeNoteImage,
-            writeNotePron,
-            writeNoteAmEPhonetic,
-            writeNoteBrEPhonetic,
-        ],
-    )  # 写入所有字段
+    newNote = _newNote(modelObject, conf, oneQueryResult)
     aqt.mw.col.add_note(newNote, deckObject["id"])
     logger.info(f"添加笔记{newNote[C.F_TERM]}")
 
 
+def addNotesToDeck(
+    deckObject, modelObject, conf: conf_model.Conf, queryResults: list[QueryWordData]
+) -> OpChanges:
+    """
+    批量添加笔记。先生成全部笔记，再通过一次 `add_notes` 写入，只产生一条撤销记录。
+
+    Slow for many notes, should run in background, e.g. through `aqt.operations.CollectionOp`.
+    """
+    assert aqt.mw.col
+    col = aqt.mw.col
+    modelObject["did"] = deckObject["id"]
+
+    undo_entry = col.add_custom_undo_entry(f"{C.ADDON_NAME} 添加笔记")
+    requests = [
+        AddNoteRequest(_newNote(modelObject, conf, queryResult), deckObject["id"])
+        for queryResult in queryResults
+    ]
+    col.add_notes(requests)
+    logger.info(f"添加笔记{len(requests)}个")
+    return col.merge_undo_entries(undo_entry)
+
+
+def _newNote(modelObject, conf: conf_model.Conf, queryResult: QueryWordData) -> notes.Note:
+    assert aqt.mw.col
+    newNote = aqt.mw.col.new_note(modelObject)
+    newNote[C.F_TERM] = queryResult[C.F_TERM]
+    writeNoteFields(newNote, queryResult, conf, _ALL_WRITE_FNS)  # 写入所有字段
+    return newNote
+
+
 def writeNoteDefinition(
     note: notes.Note, queryData: Optional[QueryWordData], conf: conf_model.Conf
 ):
@@ -295,9 +333,98 @@ def writeNoteFields(
     queryData: Optional[QueryWordData],
     conf: conf_model.Conf,
     modifyFieldFns: list[writeNoteFnType],
-):
+) -> bool:
+    """returns whether any field changed, unchanged notes need not be saved"""
+    before = list(note.fields)
     for fn in modifyFieldFns:
         fn(note, queryData, conf)
+    return note.fields != before
+
+
+_ALL_WRITE_FNS = [
+    writeNoteDefinition,
+    writeNotePhrase,
+    writeNoteSentence,
+    writeNoteImage,
+    writeNotePron,
+    writeNoteAmEPhonetic,
+    writeNoteBrEPhonetic,
+]
+
+_write_fn_fields: dict[writeNoteFnType, Callable[[conf_model.Conf], set[str]]] = {
+    writeNoteDefinition: lambda conf: {C.F_DEFINITION} if conf.definition else set(),
+    writeNotePhrase: lambda conf: {C.F_PHRASE} if conf.phrase else set(),
+    writeNoteSentence: lambda conf: {C.F_SENTENCE} if conf.sentence else set(),
+    writeNoteImage: lambda conf: {C.F_IMAGE} if conf.image else set(),
+    writeNotePron: lambda conf: {C.F_AMEPRON} if conf.ame_pron else {C.F_BREPRON} if conf.bre_pron else set(),
+    writeNoteAmEPhonetic: lambda conf: {C.F_AMEPHONETIC} if conf.ame_phonetic else set(),
+    writeNoteBrEPhonetic: lambda conf: {C.F_BREPHONETIC} if conf.bre_phonetic else set(),
+}
+"""Query fields read by each write function under `conf`, disabled fields are only cleared."""
+
+
+def queryFields(
+    conf: conf_model.Conf, modifyFieldFns: Optional[list[writeNoteFnType]] = None
+) -> frozenset[str]:
+    """
+    需要查询的字段，传给 `AbstractQueryAPI.query`
+
+    :param modifyFieldFns: write functions going to be used, None for all (adding new notes)
+    """
+    fields: set[str] = set()
+    for fn in _ALL_WRITE_FNS if modifyFieldFns is None else modifyFieldFns:
+        fields |= _write_fn_fields[fn](conf)
+    return frozenset(fields)
+
+
+_query_field_note_fields: dict[str, tuple[str, ...]] = {
+    C.F_PHRASE: (f"{C.F_PHRASE}Front", f"{C.F_PHRASE}Back"),
+    C.F_SENTENCE: (f"{C.F_SENTENCE}Front", f"{C.F_SENTENCE}Back"),
+}
+"""Note fields written from a query field, the field of the same name if not listed."""
+
+
+def missingFields(
+    note: notes.Note,
+    conf: conf_model.Conf,
+    modifyFieldFns: list[writeNoteFnType],
+    mediaFiles: Optional[AbstractSet[str]] = None,
+) -> frozenset[str]:
+    """
+    Query fields to be written by `modifyFieldFns` but empty in `note`, pronunciations
+    also if the audio file is not in the media folder. Empty if nothing to repair.
+
+    :param mediaFiles: `mediaFileNames()`, checks the media folder per note if None
+    """
+    missing: set[str] = set()
+    for field in queryFields(conf, modifyFieldFns):
+        if not all(note[f] for f in _query_field_note_fields.get(field, (field,))):
+            missing.add(field)
+        elif field in (C.F_AMEPRON, C.F_BREPRON) and not hasMediaFile(
+            misc.audio_fname(field, note[C.F_TERM]), mediaFiles
+        ):
+            missing.add(field)
+    return frozenset(missing)
+
+
+def mediaFileNames() -> Optional[set[str]]:
+    """
+    Names of files in the media folder, one directory scan instead of a stat per file.
+    None if the folder can't be read, `hasMediaFile` then checks each file.
+    """
+    try:
+        with os.scandir(media_path(None)) as entries:
+            return {entry.name for entry in entries if entry.is_file()}
+    except OSError as e:
+        logger.warning(f"读取媒体库失败: {e}")
+        return None
+
+
+def hasMediaFile(fileName: str, mediaFiles: Optional[AbstractSet[str]] = None) -> bool:
+    """:param mediaFiles: `mediaFileNames()`, checks the media folder if None"""
+    if mediaFiles is None:
+        return os.path.isfile(media_path(fileName))
+    return fileName in mediaFiles
 
 
 def media_path(fileName: Optional[str]):
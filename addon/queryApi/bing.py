@@ -1,12 +1,13 @@
 import logging
 import string
-from typing import Optional
+from typing import AbstractSet, Optional
 from urllib.parse import urlencode
 
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3 import Retry
 
+from .. import constants as C
 from .._typing import AbstractQueryAPI, QueryWordData
 from ..conf_model import Conf
 
@@ -15,9 +16,10 @@ __all__ = ['API']
 
 
 class Parser:
-    def __init__(self, json_obj, term: str):
+    def __init__(self, json_obj, term: str, fields: Optional[AbstractSet[str]] = None):
         self._result = json_obj
         self.term = term
+        self._fields = C.QUERY_FIELDS if fields is None else fields
 
     @property
     def definition(self) -> list[str]:
@@ -57,16 +59,17 @@ class Parser:
 
     @property
     def result(self) -> QueryWordData:
+        f = self._fields
         return QueryWordData(
             term=self.term,
-            definition=self.definition,
+            definition=self.definition if C.F_DEFINITION in f else [],
             phrase=[],
-            image=self.image,
-            sentence=self.sentence,
-            BrEPhonetic=self.BrEPhonetic,
-            AmEPhonetic=self.AmEPhonetic,
-            BrEPron=self.BrEPron,
-            AmEPron=self.AmEPron
+            image=self.image if C.F_IMAGE in f else '',
+            sentence=self.sentence if C.F_SENTENCE in f else [],
+            BrEPhonetic=self.BrEPhonetic if C.F_BREPHONETIC in f else '',
+            AmEPhonetic=self.AmEPhonetic if C.F_AMEPHONETIC in f else '',
+            BrEPron=self.BrEPron if C.F_BREPRON in f else '',
+            AmEPron=self.AmEPron if C.F_AMEPRON in f else ''
         )
 
 
@@ -82,13 +85,13 @@ class API(AbstractQueryAPI):
     parser = Parser
 
     @classmethod
-    def query(cls, word) -> Optional[QueryWordData]:
+    def query(cls, word, fields: Optional[AbstractSet[str]] = None) -> Optional[QueryWordData]:
         validator = str.maketrans(string.punctuation, ' ' * len(string.punctuation))  # 第三方Bing API查询包含标点的单词时有可能会报错，所以用空格替换所有标点
         query_result = None
         try:
             rsp = cls.session.get(cls.url, params=urlencode({'Word': word.translate(validator)}), timeout=cls.timeout)
             logger.debug(f'code:{rsp.status_code}- word:{word} text:{rsp.text}')
-            query_result = cls.parser(rsp.json(), word).result
+            query_result = cls.parser(rsp.json(), word, fields).result
         except Exception as e:
             logger.exception(e)
         finally:
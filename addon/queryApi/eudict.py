@@ -1,22 +1,95 @@
 import logging
-from typing import Optional
+from typing import AbstractSet, Optional
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer, Tag
 
 from .. import constants as C
-from .. import dictionary
+from .. import dictionary, queryCache
 from .._typing import AbstractQueryAPI, QueryWordData
 
 logger = logging.getLogger('dict2Anki.queryApi.eudict')
 __all__ = ['API']
 
 
+try:
+    import lxml  # noqa: F401
+
+    _FEATURES = 'lxml'
+except ImportError:
+    _FEATURES = 'html.parser'
+
+_SECTION_IDS = {
+    'ExpFCChild': C.F_DEFINITION,
+    'ExpLJChild': C.F_SENTENCE,
+    'ExpSPECChild': C.F_PHRASE,
+    'tbOrgText': 'orgText',  # 参考译文，可能包含发音
+}
+_SECTION_CLASSES = {
+    'phonitic-line': 'phonitic',
+    'gv_details': 'globalVoice',  # 全球发音
+    'word-thumbnail-container': C.F_IMAGE,
+}
+
+
+def _section_key(attrs) -> Optional[str]:
+    """which section the tag belongs to, by its raw attributes"""
+    if not attrs:
+        return None
+    attrs = dict(attrs)
+    if (key := _SECTION_IDS.get(attrs.get('id', ''))) is not None:
+        return key
+    classes = attrs.get('class') or ''
+    for cls in classes.split() if isinstance(classes, str) else classes:
+        if (key := _SECTION_CLASSES.get(cls)) is not None:
+            return key
+    return None
+
+
+_PRON_SECTIONS = {'phonitic', 'globalVoice', 'orgText'}
+_PRON_FIELDS = {C.F_BREPHONETIC, C.F_AMEPHONETIC, C.F_BREPRON, C.F_AMEPRON}
+
+
+def _sections_of(fields: AbstractSet[str]) -> set[str]:
+    """keys of the sections needed by `fields`"""
+    sections = {f for f in fields if f in (C.F_DEFINITION, C.F_SENTENCE, C.F_PHRASE, C.F_IMAGE)}
+    if fields & _PRON_FIELDS:
+        sections |= _PRON_SECTIONS
+    return sections
+
+
+class _SectionStrainer(SoupStrainer):
+    """Only builds the subtrees the parser reads, the rest of the page is skipped while parsing."""
+
+    def __init__(self, sections: set[str]):
+        self._wanted = sections
+        # bs4 < 4.13 calls it with (name, attrs)
+        super().__init__(lambda name, attrs=None: self._want(attrs))
+
+    def _want(self, attrs) -> bool:
+        return _section_key(attrs) in self._wanted
+
+    def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+        # bs4 >= 4.13
+        return self._want(attrs)
+
+
 class Parser:
-    def __init__(self, html: str, term: str):
-        self._soap = BeautifulSoup(html, 'html.parser')
+    def __init__(self, html: str, term: str, parse_only=True, fields: Optional[AbstractSet[str]] = None):
+        """
+        :param parse_only: only parse the sections we need, much faster. If False, parse the whole page.
+        :param fields: fields to parse, None for all
+        """
+        self._fields = C.QUERY_FIELDS if fields is None else fields
+        strainer = _SectionStrainer(_sections_of(self._fields)) if parse_only else None
+        self._soap = BeautifulSoup(html, _FEATURES, parse_only=strainer)
         self.term = term
         self._pronunciations = None
 
+        # collect all sections in a single traversal, properties only look into their own sections
+        self._sections: dict[str, Tag] = {}
+        for el in self._soap.find_all(lambda tag: _section_key(tag.attrs) is not None):
+            self._sections.setdefault(_section_key(el.attrs), el)  # type: ignore
+
     @staticmethod
     def __fix_url_without_http(url):
         if len(url) > 1 and url[0:2] == '//':
@@ -34,7 +107,7 @@ class Parser:
     @property
     def definition(self) -> list[str]:
         ret = []
-        div = self._soap.select_one('div #ExpFCChild')
+        div = self._sections.get(C.F_DEFINITION)
         if not div:
             return ret
 
@@ -70,7 +143,7 @@ class Parser:
         }
 
         try:
-            if el_phon_line := self._soap.select_one('.phonitic-line'):
+            if el_phon_line := self._sections.get('phonitic'):
                 links = el_phon_line.select('a')
                 phons = el_phon_line.select('.Phonitic')
 
@@ -84,11 +157,11 @@ class Parser:
                     pron[C.F_AMEPRON] = self.__make_pron_url(links[1]['data-rel'])
                     pron[C.F_BREPHONETIC] = phons[0].get_text(strip=True)
                     pron[C.F_AMEPHONETIC] = phons[0].get_text(strip=True) if len(phons) == 1 else phons[1].get_text(strip=True)
-            elif link := self._soap.select_one('div .gv_details .voice-button'):
+            elif (el_gv := self._sections.get('globalVoice')) and (link := el_gv.select_one('.voice-button')):
                 # 只有"全球发音"，没有音标
                 pron[C.F_BREPRON] = self.__make_pron_url(link['data-rel'])
                 pron[C.F_AMEPRON] = self.__make_pron_url(link['data-rel'])
-            elif link := self._soap.select_one('#tbOrgText a.voice-button'):
+            elif (el_org := self._sections.get('orgText')) and (link := el_org.select_one('a.voice-button')):
                 # 在“参考译文”中，例如 https://dict.eudic.net/dicts/en/azeroth
                 pron[C.F_BREPRON] = self.__make_pron_url(link['data-rel'])
                 pron[C.F_AMEPRON] = self.__make_pron_url(link['data-rel'])
@@ -120,7 +193,8 @@ class Parser:
 
     @property
     def sentence(self) -> list[tuple[str, str]]:
-        els = self._soap.select('div #ExpLJChild .lj_item')
+        div = self._sections.get(C.F_SENTENCE)
+        els = div.select('.lj_item') if div else []
         ret = []
         for el in els:
             el_line = el.select_one('p.line')
@@ -133,7 +207,8 @@ class Parser:
 
     @property
     def image(self) -> str:
-        el = self._soap.select_one('div .word-thumbnail-container img')
+        div = self._sections.get(C.F_IMAGE)
+        el = div.select_one('img') if div else None
         ret = ''
         if el and 'title' not in el.attrs and 'src' in el.attrs:
             ret = self.__fix_url_without_http(el['src'])
@@ -141,7 +216,8 @@ class Parser:
 
     @property
     def phrase(self) -> list[tuple[str, str]]:
-        els = self._soap.select('div #ExpSPECChild #phrase')
+        div = self._sections.get(C.F_PHRASE)
+        els = div.select('#phrase') if div else []
         ret = []
         for el in els:
             el_phrase = el.find('i')
@@ -152,16 +228,18 @@ class Parser:
 
     @property
     def result(self):
+        """只解析需要的字段，其余为空值"""
+        f = self._fields
         return QueryWordData(
             term=self.term,
-            definition=self.definition,
-            phrase=self.phrase,
-            image=self.image,
-            sentence=self.sentence,
-            BrEPhonetic=self.BrEPhonetic,
-            AmEPhonetic=self.AmEPhonetic,
-            BrEPron=self.BrEPron,
-            AmEPron=self.AmEPron
+            definition=self.definition if C.F_DEFINITION in f else [],
+            phrase=self.phrase if C.F_PHRASE in f else [],
+            image=self.image if C.F_IMAGE in f else '',
+            sentence=self.sentence if C.F_SENTENCE in f else [],
+            BrEPhonetic=self.BrEPhonetic if C.F_BREPHONETIC in f else '',
+            AmEPhonetic=self.AmEPhonetic if C.F_AMEPHONETIC in f else '',
+            BrEPron=self.BrEPron if C.F_BREPRON in f else '',
+            AmEPron=self.AmEPron if C.F_AMEPRON in f else ''
         )
 
 
@@ -177,12 +255,13 @@ class API(AbstractQueryAPI):
     parser = Parser
 
     @classmethod
-    def query(cls, word: str) -> Optional[QueryWordData]:
+    @queryCache.cached
+    def query(cls, word: str, fields: Optional[AbstractSet[str]] = None) -> Optional[QueryWordData]:
         queryResult = None
         try:
             rsp = cls.session.get(cls.url.format(word), timeout=cls.timeout)
             logger.debug(f'code:{rsp.status_code}- word:{word} text:{rsp.text[:100]}')
-            queryResult = cls.parser(rsp.text, word).result
+            queryResult = cls.parser(rsp.text, word, fields=fields).result
         except Exception as e:
             logger.exception(e)
         finally:
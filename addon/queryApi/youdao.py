@@ -1,9 +1,9 @@
 import logging
-from typing import Optional
+from typing import AbstractSet, Optional
 from urllib.parse import urlencode
 
 from .. import constants as C
-from .. import dictionary
+from .. import dictionary, queryCache
 from .._typing import AbstractQueryAPI, QueryWordData
 
 logger = logging.getLogger('dict2Anki.queryApi.youdao')
@@ -11,9 +11,10 @@ __all__ = ['API']
 
 
 class Parser:
-    def __init__(self, json_obj, term: str):
+    def __init__(self, json_obj, term: str, fields: Optional[AbstractSet[str]] = None):
         self._result = json_obj
         self.term = term
+        self._fields = C.QUERY_FIELDS if fields is None else fields
         self._pronunciations = None
 
     @property
@@ -118,16 +119,18 @@ class Parser:
 
     @property
     def result(self):
+        """只解析需要的字段，其余为空值"""
+        f = self._fields
         return QueryWordData(
             term=self.term,
-            definition=self.definition,
-            phrase=self.phrase,
-            image=self.image,
-            sentence=self.sentence,
-            BrEPhonetic=self.BrEPhonetic,
-            AmEPhonetic=self.AmEPhonetic,
-            BrEPron=self.BrEPron,
-            AmEPron=self.AmEPron
+            definition=self.definition if C.F_DEFINITION in f else [],
+            phrase=self.phrase if C.F_PHRASE in f else [],
+            image=self.image if C.F_IMAGE in f else '',
+            sentence=self.sentence if C.F_SENTENCE in f else [],
+            BrEPhonetic=self.BrEPhonetic if C.F_BREPHONETIC in f else '',
+            AmEPhonetic=self.AmEPhonetic if C.F_AMEPHONETIC in f else '',
+            BrEPron=self.BrEPron if C.F_BREPRON in f else '',
+            AmEPron=self.AmEPron if C.F_AMEPRON in f else ''
         )
 
 
@@ -138,15 +141,37 @@ class API(AbstractQueryAPI):
     session = dictionary.youdao.Youdao.session
     url = 'https://dict.youdao.com/jsonapi'
     params = {"dicts": {"count": 99, "dicts": [["ec", "ee", "phrs", "pic_dict"], ["web_trans"], ["fanyi"], ["blng_sents_part"]]}}
+    dict_fields = {
+        'ee': C.F_DEFINITION,
+        'web_trans': C.F_DEFINITION,
+        'fanyi': C.F_DEFINITION,
+        'phrs': C.F_PHRASE,
+        'pic_dict': C.F_IMAGE,
+        'blng_sents_part': C.F_SENTENCE,
+    }
+    """params 中各词典对应的字段，不在其中的（ec）总是请求"""
     parser = Parser
 
     @classmethod
-    def query(cls, word) -> Optional[QueryWordData]:
+    def make_params(cls, word: str, fields: Optional[AbstractSet[str]] = None) -> dict:
+        """只请求需要的字段所在的词典"""
+        if fields is None:
+            return dict(cls.params, q=word)
+        groups = []
+        for group in cls.params['dicts']['dicts']:
+            group = [d for d in group if d not in cls.dict_fields or cls.dict_fields[d] in fields]
+            if group:
+                groups.append(group)
+        return dict(cls.params, dicts=dict(cls.params['dicts'], dicts=groups), q=word)
+
+    @classmethod
+    @queryCache.cached
+    def query(cls, word, fields: Optional[AbstractSet[str]] = None) -> Optional[QueryWordData]:
         queryResult = None
         try:
-            rsp = cls.session.get(cls.url, params=urlencode(dict(cls.params, **{'q': word})), timeout=cls.timeout)
+            rsp = cls.session.get(cls.url, params=urlencode(cls.make_params(word, fields)), timeout=cls.timeout)
             logger.debug(f'code:{rsp.status_code}- word:{word} text:{rsp.text}')
-            queryResult = cls.parser(rsp.json(), word).result
+            queryResult = cls.parser(rsp.json(), word, fields).result
         except Exception as e:
             logger.exception(e)
         finally:
@@ -0,0 +1,201 @@
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import AbstractSet, Optional
+
+from . import constants as C
+from . import misc
+from ._typing import QueryWordData
+
+logger = logging.getLogger('dict2Anki.queryCache')
+
+DEFAULT_TTL = 30 * 24 * 3600
+"""查询结果缓存有效期（秒）"""
+DEFAULT_MAX_ENTRIES = 50000
+"""超出后按最近访问时间淘汰"""
+_EVICT_EVERY = 100
+"""每写入 N 次检查一次是否需要淘汰"""
+
+
+def normalize(term: str) -> str:
+    """cache key of a term: collapse whitespaces and lower case"""
+    return ' '.join(term.split()).lower()
+
+
+class QueryCache(misc.HitStats):
+    """
+    Persistent query result cache backed by SQLite, keyed by (api name, normalized term).
+
+    An entry records which query fields it holds, it serves any query of a subset of them.
+    Results of other fields of the same term are merged into the entry, so queries of
+    different field sets (adding notes, repairing some fields) share one entry.
+
+    Thread safe. Entries expire after `ttl` seconds, least recently used entries are
+    evicted when exceeding `max_entries`.
+    """
+
+    stats_name = '查询缓存'
+
+    def __init__(self, path: str, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES):
+        super().__init__()
+        self._path = path
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._puts = 0
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn: Optional[sqlite3.Connection] = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS query_cache ('
+            'api TEXT NOT NULL, term TEXT NOT NULL, data TEXT NOT NULL, '
+            'created REAL NOT NULL, accessed REAL NOT NULL, fields TEXT, PRIMARY KEY (api, term))'
+        )
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(query_cache)')]
+        if 'fields' not in columns:
+            # 旧版本只缓存完整结果，fields 为 NULL 即全部字段
+            self._conn.execute('ALTER TABLE query_cache ADD COLUMN fields TEXT')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS query_cache_accessed ON query_cache (accessed)')
+        with self._lock:
+            self._purge_expired()
+            self._evict()
+
+    def _entry(self, api: str, term: str, now: float) -> Optional[tuple[QueryWordData, frozenset[str], float]]:
+        """unexpired (data, fields, created) of the entry"""
+        assert self._conn
+        row = self._conn.execute(
+            'SELECT data, fields, created FROM query_cache WHERE api=? AND term=?', (api, normalize(term))
+        ).fetchone()
+        if row is None or row[2] + self._ttl < now:
+            return None
+        fields = C.QUERY_FIELDS if row[1] is None else frozenset(json.loads(row[1]))
+        return json.loads(row[0]), fields, row[2]
+
+    def get(self, api: str, term: str, fields: Optional[AbstractSet[str]] = None) -> Optional[QueryWordData]:
+        """:param fields: fields needed, None for all"""
+        now = time.time()
+        with self._lock:
+            if self._conn is None:
+                return None
+            entry = self._entry(api, term, now)
+            if entry is None or not entry[1] >= (C.QUERY_FIELDS if fields is None else fields):
+                self.misses += 1
+                return None
+            self._conn.execute(
+                'UPDATE query_cache SET accessed=? WHERE api=? AND term=?', (now, api, normalize(term))
+            )
+            self.hits += 1
+        return entry[0]
+
+    def put(self, api: str, term: str, data: QueryWordData, fields: Optional[AbstractSet[str]] = None):
+        """
+        :param fields: fields queried in `data`, None for all. Other fields of an unexpired entry
+            are kept, the merged entry expires with the older data.
+        """
+        now = time.time()
+        fields = C.QUERY_FIELDS if fields is None else frozenset(fields)
+        created = now
+        with self._lock:
+            if self._conn is None:
+                return
+            if fields != C.QUERY_FIELDS and (entry := self._entry(api, term, now)) is not None:
+                old, old_fields, created = entry
+                data = {**old, **{k: v for k, v in data.items() if k not in C.QUERY_FIELDS or k in fields}}
+                fields |= old_fields
+            self._conn.execute(
+                'INSERT OR REPLACE INTO query_cache (api, term, data, created, accessed, fields) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (
+                    api,
+                    normalize(term),
+                    json.dumps(data, ensure_ascii=False),
+                    created,
+                    now,
+                    None if fields >= C.QUERY_FIELDS else json.dumps(sorted(fields)),
+                ),
+            )
+            self._puts += 1
+            if self._puts % _EVICT_EVERY == 0:
+                self._evict()
+
+    def count(self) -> int:
+        with self._lock:
+            if self._conn is None:
+                return 0
+            return self._conn.execute('SELECT COUNT(*) FROM query_cache').fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.execute('DELETE FROM query_cache')
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _purge_expired(self):
+        assert self._conn
+        self._conn.execute('DELETE FROM query_cache WHERE created < ?', (time.time() - self._ttl,))
+
+    def _evict(self):
+        assert self._conn
+        cnt = self._conn.execute('SELECT COUNT(*) FROM query_cache').fetchone()[0]
+        if cnt > self._max_entries:
+            self._conn.execute(
+                'DELETE FROM query_cache WHERE rowid IN '
+                '(SELECT rowid FROM query_cache ORDER BY accessed ASC LIMIT ?)',
+                (cnt - self._max_entries,),
+            )
+            logger.debug(f'淘汰查询缓存{cnt - self._max_entries}条')
+
+
+_holder = misc.CacheHolder(QueryCache, '查询缓存', (sqlite3.Error,))
+open_cache = _holder.open
+"""Open the global cache used by `cached`, with arguments of `QueryCache`."""
+close_cache = _holder.close
+get_cache = _holder.get
+stats = _holder.stats
+
+
+def cached(query_fn):
+    """
+    Decorator for `AbstractQueryAPI.query`, put it under `@classmethod`.
+
+    Looks up the global cache first, only successful results are stored. Does nothing if
+    the cache is not opened.
+
+    A cached result serves a query if it holds every field in `fields`, results of partial
+    queries are merged into the cached one.
+    """
+
+    @functools.wraps(query_fn)
+    def wrapper(cls, word: str, fields: Optional[AbstractSet[str]] = None) -> Optional[QueryWordData]:
+        cache = _holder.get()
+        if cache is None:
+            return query_fn(cls, word, fields)
+
+        try:
+            if (hit := cache.get(cls.name, word, fields)) is not None:
+                hit[C.F_TERM] = word
+                return hit
+        except sqlite3.Error as e:
+            logger.warning(f'读取查询缓存失败: {word}, {e}')
+
+        result = query_fn(cls, word, fields)
+        if result:
+            try:
+                cache.put(cls.name, word, result, fields)
+            except sqlite3.Error as e:
+                logger.warning(f'写入查询缓存失败: {word}, {e}')
+        return result
+
+    return wrapper
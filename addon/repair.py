@@ -3,14 +3,17 @@ from __future__ import annotations
 import json
 import logging
 import os
+import time
 import typing as T
 
 import aqt
 import aqt.utils
+from aqt.operations import CollectionOp
 
-from . import conf_model, dictionary, misc, noteManager, queryApi, workers
+from . import audioCache, conf_model, dictionary, misc, noteManager, queryApi, queryCache, workers
 from . import constants as C
 from ._typing import ListenableModel, QueryWordData
+from .jobJournal import JobJournal
 
 if T.TYPE_CHECKING:
     from .addonWindow import Windows
@@ -36,6 +39,7 @@ class CntGrp(ListenableModel):
         self._total = 0
         self._success_cnt = 0
         self._fail_cnt = 0
+        self._skip_cnt = 0
 
     @property
     def total(self):
@@ -49,22 +53,44 @@ class CntGrp(ListenableModel):
     def fail_cnt(self):
         return self._fail_cnt
 
-    def reset(self, total: int = 0, success_cnt: int = 0, fail_cnt: int = 0):
+    @property
+    def skip_cnt(self):
+        """done without doing anything, e.g. notes unchanged"""
+        return self._skip_cnt
+
+    def reset(self, total: int = 0, success_cnt: int = 0, fail_cnt: int = 0, skip_cnt: int = 0):
         """triggers `reset` event, `self` as event argument"""
         self._total = total
         self._success_cnt = success_cnt
         self._fail_cnt = fail_cnt
+        self._skip_cnt = skip_cnt
         self._notify("reset", self)
 
     def incSuccessCnt(self):
         """triggers `incSuccessCnt` event, `self` as event argument"""
-        self._success_cnt += 1
-        self._notify("incSuccessCnt", self)
+        self.addSuccessCnt(1)
 
     def incFailCnt(self):
         """triggers `incFailCnt` event, `self` as event argument"""
-        self._fail_cnt += 1
-        self._notify("incFailCnt", self)
+        self.addFailCnt(1)
+
+    def addSuccessCnt(self, n: int):
+        """add `n` at once, triggers a single `incSuccessCnt` event if `n` > 0"""
+        if n > 0:
+            self._success_cnt += n
+            self._notify("incSuccessCnt", self)
+
+    def addFailCnt(self, n: int):
+        """add `n` at once, triggers a single `incFailCnt` event if `n` > 0"""
+        if n > 0:
+            self._fail_cnt += n
+            self._notify("incFailCnt", self)
+
+    def addSkipCnt(self, n: int):
+        """add `n` at once, triggers a single `incSkipCnt` event if `n` > 0"""
+        if n > 0:
+            self._skip_cnt += n
+            self._notify("incSkipCnt", self)
 
 
 class RepairModel:
@@ -74,6 +100,103 @@ class RepairModel:
         self.noteGrp = CntGrp()
 
 
+class NoteBuffer:
+    """
+    Collects repaired notes and writes them to the collection in batches through a
+    background `CollectionOp`, instead of one `update_note` per note on the GUI thread.
+
+    A batch is written once `batch_size` notes are pending or `interval` seconds passed
+    since the last write, checked by a timer even if no more notes are added. Batches are
+    written one at a time, in order. After `close`, a batch still being written is not
+    reported.
+    """
+
+    batch_size = 500
+    interval = 2.0
+
+    def __init__(
+        self,
+        parent: aqt.QWidget,
+        on_written: T.Callable[[list], None],
+        on_failed: T.Callable[[list], None] = lambda notes: None,
+    ):
+        """
+        :param on_written: called with the notes of each written batch
+        :param on_failed: called with the notes of each batch failed to write, they are not retried
+        """
+        self._parent = parent
+        self._on_written = on_written
+        self._on_failed = on_failed
+        self._pending: list = []
+        self._writing = False
+        self._last = time.monotonic()
+        self._on_finished: T.Optional[T.Callable[[], None]] = None
+        self._closed = False
+        self._timer = aqt.QTimer(parent)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._write)
+
+    def add(self, notes: T.Iterable):
+        self._pending.extend(notes)
+        if len(self._pending) >= self.batch_size or time.monotonic() - self._last >= self.interval:
+            self._write()
+        else:
+            self._schedule()
+
+    def finish(self, on_finished: T.Callable[[], None]):
+        """write all pending notes, `on_finished` is called once everything is written"""
+        self._on_finished = on_finished
+        self._write()
+
+    def close(self):
+        """write pending notes synchronously when the window closes, the batch being written won't call back"""
+        self._closed = True
+        self._timer.stop()
+        notes, self._pending = self._pending, []
+        if notes:
+            noteManager.updateNotes(notes)
+            self._on_written(notes)
+
+    def _schedule(self):
+        """write the pending notes once `interval` passed since the last write"""
+        if self._pending and not self._writing and not self._timer.isActive():
+            wait = self.interval - (time.monotonic() - self._last)
+            self._timer.start(max(int(wait * 1000), 0))
+
+    def _write(self):
+        if self._writing or self._closed:
+            return
+        if not self._pending:
+            if self._on_finished:
+                on_finished, self._on_finished = self._on_finished, None
+                on_finished()
+            return
+
+        self._timer.stop()
+        notes, self._pending = self._pending[: self.batch_size], self._pending[self.batch_size :]
+        self._writing = True
+        self._last = time.monotonic()
+
+        def on_done(ok: bool):
+            self._writing = False
+            if self._closed:
+                # 窗口已关闭，不再更新界面和记录
+                return
+            (self._on_written if ok else self._on_failed)(notes)
+            if self._on_finished or len(self._pending) >= self.batch_size:
+                self._write()
+            else:
+                self._schedule()
+
+        def on_failure(e: Exception):
+            _logger.error(f"更新笔记失败：{len(notes)}个", exc_info=e)
+            on_done(False)
+
+        CollectionOp(self._parent, lambda col: noteManager.updateNotes(notes)).success(
+            lambda _: on_done(True)
+        ).failure(on_failure).run_in_background()
+
+
 class Repair:
 
     def __init__(self, windows: Windows):
@@ -84,16 +207,26 @@ class Repair:
         self._write_fns = []
         self._whichPron = None
         self._api_name = ""
+        self._mediaFiles: T.Optional[set[str]] = None
+        """media folder scanned at start, instead of a stat per note"""
+        self._audioFeed: T.Optional[workers.AudioFeed] = None
+        self._noteBuffer = NoteBuffer(self._w, self._on_notesWritten, self._on_notesFailed)
+        self._journal = JobJournal(os.path.join(misc.user_files_dir(), "repair_journal.jsonl"))
+        """ids of notes done, an interrupted repair can skip them"""
         self._w.repairBtn.clicked.connect(self._on_repairBtnClick)
 
     def _register_model_events(self, model: RepairModel):
         def update_label_note(grp: CntGrp):
+            unchanged = f"，无变化：{grp.skip_cnt}" if grp.skip_cnt else ""
+            failed = f"，失败：{grp.fail_cnt}" if grp.fail_cnt else ""
             self._w.repairProgressNoteLabel.setText(
-                f"更新本地笔记：{grp.success_cnt} / {grp.total} . . . "
+                f"更新本地笔记：{grp.success_cnt + grp.skip_cnt + grp.fail_cnt} / {grp.total}{unchanged}{failed} . . . "
             )
 
         model.noteGrp.listen("reset", update_label_note)
         model.noteGrp.listen("incSuccessCnt", update_label_note)
+        model.noteGrp.listen("incSkipCnt", update_label_note)
+        model.noteGrp.listen("incFailCnt", update_label_note)
 
         def update_label_query(grp: CntGrp):
             self._w.repairProgressQueryLabel.setText(
@@ -227,19 +360,64 @@ class Repair:
             )
             return self._complete(None, None)
 
-        self._model.noteGrp.reset(len(self._notes))
+        total = len(self._notes)
+        done = self._startJournal()
+        if done:
+            self._notes = [note for note in self._notes if note.id not in done]
+        self._model.noteGrp.reset(total, total - len(self._notes))
+        if not self._notes:
+            return self._complete("上次修复的笔记均已处理 . . . ", self._w.repairProgressNoteLabel)
         if self._removeOnly():
-            self._updateNotes(self._notes)
-            return self._complete(
-                "仅清空字段，跳过查询API和发音下载 . . . ",
-                self._w.repairProgressAudioLabel,
-            )
-
-        self._queryWords(self._notes)
+            return self._updateNotes(self._notes)
 
-        self._whichPron: T.Optional[str] = None
+        self._whichPron = None
         if not self._w.conf.no_pron:
             self._whichPron = C.F_AMEPRON if self._w.conf.ame_pron else C.F_BREPRON
+        if self._whichPron or self._w.repairIncompleteCB.isChecked():
+            self._mediaFiles = noteManager.mediaFileNames()
+
+        if not self._w.repairIncompleteCB.isChecked():
+            return self._queryWords(range(len(self._notes)))
+
+        rows = self._scanIncomplete()
+        if not rows:
+            return self._noteBuffer.finish(
+                lambda: self._complete("没有不完整的笔记，跳过查询 . . . ", self._w.repairProgressQueryLabel)
+            )
+        self._queryWords(rows)
+
+    def _startJournal(self) -> set:
+        """ids of notes done by the last repair if it was interrupted and the user resumes it"""
+        params = {
+            "deck": self._w.conf.deck,
+            "fields": sorted(fn.__name__ for fn in self._write_fns),
+            "incomplete": self._w.repairIncompleteCB.isChecked(),
+        }
+        job = self._journal.load()
+        if (
+            job
+            and job.params == params
+            and job.done
+            and aqt.utils.askUser(f"上次修复未完成，已处理{len(job.done)}个笔记，是否跳过这些笔记继续修复？")
+        ):
+            self._journal.resume()
+            _logger.info(f"继续上次修复，跳过{len(job.done)}个笔记")
+            return set(job.done)
+        self._journal.start("repair", params)
+        return set()
+
+    def _on_notesWritten(self, notes: list):
+        self._model.noteGrp.addSuccessCnt(len(notes))
+        self._journal.mark_done((note.id, None) for note in notes)
+
+    def _on_notesFailed(self, notes: list):
+        """not journaled, a resumed repair tries them again"""
+        self._model.noteGrp.addFailCnt(len(notes))
+
+    def _skipNotes(self, notes: list):
+        """unchanged notes, not written"""
+        self._model.noteGrp.addSkipCnt(len(notes))
+        self._journal.mark_done((note.id, None) for note in notes)
 
     def _removeOnly(self):
         ret = True
@@ -247,108 +425,153 @@ class Repair:
             ret = ret & _write_fn_valid_map[fn](self._w.conf)
         return ret
 
-    def _queryWords(self, notes):
-        row_words: list[T.Any] = [None] * len(notes)
-        for i, note in enumerate(notes):
-            row_words[i] = (i, note[C.F_TERM])
+    def _scanIncomplete(self) -> list[int]:
+        """
+        Rows of notes missing any field to repair, only these are queried. Complete notes
+        just have the fields disabled in settings cleared.
+        """
+        conf = self._w.conf
+        clearFns = [fn for fn in self._write_fns if _write_fn_valid_map[fn](conf)]
+        rows: list[int] = []
+        changed = []
+        unchanged = []
+        for row, note in enumerate(self._notes):
+            if noteManager.missingFields(note, conf, self._write_fns, self._mediaFiles):
+                rows.append(row)
+            elif noteManager.writeNoteFields(note, None, conf, clearFns):
+                changed.append(note)
+            else:
+                unchanged.append(note)
+
+        _logger.info(f"不完整的笔记{len(rows)}个，其余{len(self._notes) - len(rows)}个跳过查询")
+        self._skipNotes(unchanged)
+        self._noteBuffer.add(changed)
+        return rows
+
+    def _queryWords(self, rows: T.Iterable[int]):
+        row_words = [(row, self._notes[row][C.F_TERM]) for row in rows]
 
         self._w.resetProgressBar(len(row_words))
         self._model.queryGrp.reset(len(row_words))
         self._model.audioGrp.reset(0)
 
         worker = workers.QueryWorker(
-            row_words, self._w.get_current_api(), self._w.conf.congest
+            row_words,
+            self._w.get_current_api(),
+            self._w.conf.congest,
+            noteManager.queryFields(self._w.conf, self._write_fns),
         )
-        worker.rowSuccess.connect(self._on_queryRowSuccess)
-        worker.rowFail.connect(self._on_queryRowFail)
-        worker.tick.connect(self._queryRowTick)
+        worker.rowsDone.connect(self._on_queryRowsDone)
         worker.doneWithResult.connect(self._on_queryDone)
         self._w.workerman.start(worker)
 
-    def _on_queryRowSuccess(self, row, word, queryResult):
-        self._model.queryGrp.incSuccessCnt()
-
-        self._updateOneNote(self._notes[row], queryResult)
-        assert aqt.mw.col
-        aqt.mw.col.update_note(self._notes[row])
-        self._model.noteGrp.incSuccessCnt()
-
-        self._downloadAudio(self._notes[row], queryResult)
-
-    def _on_queryRowFail(self, row, word):
-        self._model.queryGrp.incFailCnt()
-
-    def _queryRowTick(self):
-        self._w.progressBar.setValue(self._w.progressBar.value() + 1)
+        if self._whichPron:
+            # 所有发音由一个线程边查询边下载
+            self._audioFeed = workers.AudioFeed()
+            audioWorker = workers.AudioDownloadWorker(self._audioFeed, self._w.conf.congest)
+            audioWorker.audiosDone.connect(self._on_audiosDone)
+            self._w.workerman.start(audioWorker)
+
+    def _on_queryRowsDone(self, rows: list[tuple[int, str, T.Optional[QueryWordData]]]):
+        """a batch of queried words, failed ones with None"""
+        audios = []
+        notes = []
+        unchanged = []
+        for row, _word, queryResult in rows:
+            if not queryResult:
+                continue
+            note = self._notes[row]
+            if self._updateOneNote(note, queryResult):
+                notes.append(note)
+            else:
+                unchanged.append(note)
+            if audio := self._missingAudio(note, queryResult):
+                audios.append(audio)
+
+        success = len(notes) + len(unchanged)
+        self._model.queryGrp.addSuccessCnt(success)
+        self._model.queryGrp.addFailCnt(len(rows) - success)
+        self._skipNotes(unchanged)
+        self._noteBuffer.add(notes)
+        self._w.progressBar.setValue(self._w.progressBar.value() + len(rows))
+        self._downloadAudios(audios)
 
     def _on_queryDone(self, _):
-        self._complete(None, None)
+        self._closeAudioFeed()
+        _logger.info(queryCache.stats())
+        _logger.info(audioCache.stats())
+        self._noteBuffer.finish(lambda: self._complete(None, None))
 
-    def _updateOneNote(self, note, queryResult):
-        noteManager.writeNoteFields(note, queryResult, self._w.conf, self._write_fns)
+    def _updateOneNote(self, note, queryResult) -> bool:
+        """returns whether the note changed"""
+        return noteManager.writeNoteFields(note, queryResult, self._w.conf, self._write_fns)
 
     def _updateNotes(self, notes):
         """remove only"""
 
-        for _i, note in enumerate(notes):
-            self._updateOneNote(note, None)
-
-        # update notes to collection
-        noteManager.updateNotes(notes)
-        self._model.noteGrp.reset(self._model.noteGrp.total, len(notes))
+        changed = []
+        unchanged = []
+        for note in notes:
+            (changed if self._updateOneNote(note, None) else unchanged).append(note)
+        self._skipNotes(unchanged)
+        self._noteBuffer.add(changed)
+        self._noteBuffer.finish(
+            lambda: self._complete(
+                "仅清空字段，跳过查询API和发音下载 . . . ",
+                self._w.repairProgressAudioLabel,
+            )
+        )
 
-    def _downloadAudio(self, note, queryResult: QueryWordData):
+    def _missingAudio(self, note, queryResult: QueryWordData) -> T.Optional[tuple[str, str]]:
+        """(file path, url) of the audio to download, None if not needed or already in media"""
         if not self._whichPron:
-            return
+            return None
 
+        fileName = misc.audio_fname(self._whichPron, note[C.F_TERM])
         if (
             queryResult
             and (url := queryResult[self._whichPron])
-            and not (
-                os.path.isfile(
-                    filePath := noteManager.media_path(
-                        misc.audio_fname(self._whichPron, note[C.F_TERM])
-                    )
-                )
-            )
+            and not noteManager.hasMediaFile(fileName, self._mediaFiles)
         ):
-            worker = AudioDownloadSingleWorker(filePath, url)
-            worker.tick.connect(self._on_audioDownloadTick)
-            self._w.workerman.start(worker)
+            return noteManager.media_path(fileName), url
+        return None
 
-    def _on_audioDownloadTick(self, fileName, url, success):
-        if success:
-            self._model.audioGrp.incSuccessCnt()
-        else:
-            self._model.audioGrp.incFailCnt()
+    def _downloadAudios(self, audios: list[tuple[str, str]]):
+        """hand over to the audio worker started with the query"""
+        if audios and self._audioFeed:
+            self._audioFeed.put(audios)
+
+    def _closeAudioFeed(self):
+        if self._audioFeed:
+            self._audioFeed.close()
+            self._audioFeed = None
+
+    def _on_audiosDone(self, audios: list[tuple[str, str, bool]]):
+        success = sum(1 for _, _, ok in audios if ok)
+        self._model.audioGrp.addSuccessCnt(success)
+        self._model.audioGrp.addFailCnt(len(audios) - success)
 
     def _complete(self, msg, label):
         if msg:
             self._writeLogAndLabel(msg, label)
+        grp = self._model.noteGrp
+        if grp.total:
+            _logger.info(f"更新笔记{grp.success_cnt}个，无变化{grp.skip_cnt}个，失败{grp.fail_cnt}个")
         self._UISetEnabled(True)
+        self._journal.finish()
         self._clear()
         aqt.mw.reset()
 
         aqt.utils.tooltip("修复完成")
 
+    def close(self):
+        """window closing, write notes repaired so far"""
+        self._closeAudioFeed()
+        self._noteBuffer.close()
+        self._journal.close()
+
     def _clear(self):
         self._notes.clear()
         self._write_fns.clear()
+        self._mediaFiles = None
 
-
-class AudioDownloadSingleWorker(workers.NetworkWorker):
-    tick = aqt.pyqtSignal(str, str, bool)
-    _logger = logging.getLogger("dict2Anki.workers.AudioDownloadSingleWorker")
-
-    def __init__(self, fileName, url):
-        super().__init__()
-        self._fileName = fileName
-        self._url = url
-
-    def run(self):
-        try:
-            workers.downloadSingleAudio(
-                self._fileName, self._url, self.session, self._logger, self.tick
-            )
-        finally:
-            self.done.emit(self)
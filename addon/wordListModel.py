@@ -0,0 +1,247 @@
+from enum import IntEnum
+from typing import Any, Iterable, Optional
+
+from aqt import QAbstractListModel, QIcon, QItemSelectionModel, QModelIndex, QObject, Qt
+
+from ._typing import QueryWordData
+
+
+class WordState(IntEnum):
+    WAIT = 0
+    """待查询"""
+    DONE = 1
+    """查询成功"""
+    FAILED = 2
+    """查询失败"""
+
+
+def row_ranges(rows: Iterable[int]) -> list[tuple[int, int]]:
+    """sorted, merged ranges `[(first, last)]` of `rows`"""
+    ranges: list[tuple[int, int]] = []
+    for row in sorted(set(rows)):
+        if ranges and ranges[-1][1] + 1 == row:
+            ranges[-1] = (ranges[-1][0], row)
+        else:
+            ranges.append((row, row))
+    return ranges
+
+
+def selected_rows(selection_model: QItemSelectionModel) -> list[int]:
+    """
+    Sorted selected rows, read from the selection ranges.
+
+    `QItemSelectionModel.selectedRows()` is quadratic for scattered selections.
+    """
+    rows: set[int] = set()
+    for selection_range in selection_model.selection():
+        rows.update(range(selection_range.top(), selection_range.bottom() + 1))
+    return sorted(rows)
+
+
+class WordListModel(QAbstractListModel):
+    """
+    Word list backed by a column store instead of one item object per word.
+
+    Words, states, check states and query results are kept in parallel columns, views
+    only ask for the visible rows, icons are shared by all rows of the same state.
+    Use with `QListView`, `uniformItemSizes` makes it render in constant time.
+
+    Data roles: DisplayRole -> word, DecorationRole -> state icon,
+    CheckStateRole -> check state (if `checkable`), UserRole -> query result.
+
+    A word -> row index is maintained on insert and remove, so looking up rows never
+    scans the list.
+    """
+
+    max_remove_ranges = 64
+    """Removing more separate ranges than this resets the model instead of emitting per range."""
+
+    def __init__(self, icons: dict[WordState, str], checkable=False, parent: Optional[QObject] = None):
+        """
+        :param icons: icon path of each state, states without icon show none
+        :param checkable: rows are user checkable, checked by default
+        """
+        super().__init__(parent)
+        self._icon_paths = icons
+        self._icons: dict[WordState, QIcon] = {}
+        self._checkable = checkable
+        self._words: list[str] = []
+        self._states = bytearray()
+        self._checked = bytearray()
+        self._results: list[Optional[QueryWordData]] = []
+        self._rows: dict[str, int] = {}
+        """word -> row"""
+
+    # Qt model interface
+
+    def rowCount(self, parent: Optional[QModelIndex] = None) -> int:
+        if parent is None:
+            parent = QModelIndex()
+        return 0 if parent.isValid() else len(self._words)
+
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self._words[row]
+        if role == Qt.ItemDataRole.DecorationRole:
+            return self._icon(WordState(self._states[row]))
+        if role == Qt.ItemDataRole.CheckStateRole and self._checkable:
+            return Qt.CheckState.Checked if self._checked[row] else Qt.CheckState.Unchecked
+        if role == Qt.ItemDataRole.UserRole:
+            return self._results[row]
+        return None
+
+    def setData(self, index: QModelIndex, value: Any, role=Qt.ItemDataRole.EditRole) -> bool:
+        if not index.isValid() or role != Qt.ItemDataRole.CheckStateRole or not self._checkable:
+            return False
+        self._checked[index.row()] = Qt.CheckState(value) == Qt.CheckState.Checked
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.CheckStateRole])
+        return True
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlag:
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        flags = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        if self._checkable:
+            flags |= Qt.ItemFlag.ItemIsUserCheckable
+        return flags
+
+    def _icon(self, state: WordState) -> Optional[QIcon]:
+        if state not in self._icon_paths:
+            return None
+        if state not in self._icons:
+            self._icons[state] = QIcon(self._icon_paths[state])
+        return self._icons[state]
+
+    def _emit_changed(self, first: int, last: int, roles: list[Qt.ItemDataRole]):
+        self.dataChanged.emit(self.index(first), self.index(last), roles)
+
+    # column store
+
+    def count(self) -> int:
+        return len(self._words)
+
+    def empty(self) -> bool:
+        return not self._words
+
+    def word(self, row: int) -> str:
+        return self._words[row]
+
+    def words(self, rows: Optional[Iterable[int]] = None) -> list[str]:
+        """words of `rows`, all words if None"""
+        if rows is None:
+            return list(self._words)
+        return [self._words[row] for row in rows]
+
+    def row_of(self, word: str) -> Optional[int]:
+        return self._rows.get(word)
+
+    def locate(self, row: int, word: str) -> Optional[int]:
+        """row of `word`, `row` is a hint which may be outdated since the list changed"""
+        if 0 <= row < len(self._words) and self._words[row] == word:
+            return row
+        return self._rows.get(word)
+
+    def state(self, row: int) -> WordState:
+        return WordState(self._states[row])
+
+    def result(self, row: int) -> Optional[QueryWordData]:
+        return self._results[row]
+
+    def results(self) -> list[Optional[QueryWordData]]:
+        return list(self._results)
+
+    def set_words(self, words: Iterable[str]):
+        """replace all rows, states are reset to WAIT and checked"""
+        self.beginResetModel()
+        self._words = list(words)
+        n = len(self._words)
+        self._states = bytearray(n)
+        self._checked = bytearray(b'\x01') * n
+        self._results = [None] * n
+        self._rows = {word: row for row, word in enumerate(self._words)}
+        self.endResetModel()
+
+    def append_words(self, words: Iterable[str]):
+        words = list(words)
+        if not words:
+            return
+        first = len(self._words)
+        self.beginInsertRows(QModelIndex(), first, first + len(words) - 1)
+        self._words.extend(words)
+        self._states.extend(bytearray(len(words)))
+        self._checked.extend(b'\x01' * len(words))
+        self._results.extend([None] * len(words))
+        self._rows.update((word, row) for row, word in enumerate(words, first))
+        self.endInsertRows()
+
+    def remove_rows(self, rows: Iterable[int]):
+        """
+        Remove `rows` in contiguous ranges, linear in the size of the list.
+
+        Few ranges are removed one by one (from the last) so views keep their selection
+        and scroll position; many scattered ranges compact all columns at once within a
+        model reset.
+        """
+        ranges = row_ranges(rows)
+        if not ranges:
+            return
+
+        if len(ranges) > self.max_remove_ranges:
+            self.beginResetModel()
+            keep = bytearray(b'\x01') * len(self._words)
+            for first, last in ranges:
+                keep[first:last + 1] = bytes(last - first + 1)
+            self._words = [w for w, k in zip(self._words, keep) if k]
+            self._states = bytearray(s for s, k in zip(self._states, keep) if k)
+            self._checked = bytearray(c for c, k in zip(self._checked, keep) if k)
+            self._results = [r for r, k in zip(self._results, keep) if k]
+            self._rows = {word: row for row, word in enumerate(self._words)}
+            self.endResetModel()
+            return
+
+        for first, last in reversed(ranges):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            for word in self._words[first:last + 1]:
+                self._rows.pop(word, None)
+            del self._words[first:last + 1]
+            del self._states[first:last + 1]
+            del self._checked[first:last + 1]
+            del self._results[first:last + 1]
+            self.endRemoveRows()
+        # rows after the first removed one are shifted
+        for row in range(ranges[0][0], len(self._words)):
+            self._rows[self._words[row]] = row
+
+    def clear(self):
+        self.set_words([])
+
+    def set_result(self, row: int, result: Optional[QueryWordData]):
+        """store query result of `row`, a falsy result marks the row FAILED"""
+        self._results[row] = result or None
+        self._states[row] = WordState.DONE if result else WordState.FAILED
+        self._emit_changed(row, row, [Qt.ItemDataRole.DecorationRole, Qt.ItemDataRole.UserRole])
+
+    def set_results(self, row_results: Iterable[tuple[int, Optional[QueryWordData]]]):
+        """`set_result` in bulk, views are notified once with the range of changed rows"""
+        first, last = len(self._words), -1
+        for row, result in row_results:
+            self._results[row] = result or None
+            self._states[row] = WordState.DONE if result else WordState.FAILED
+            first, last = min(first, row), max(last, row)
+        if last >= 0:
+            self._emit_changed(first, last, [Qt.ItemDataRole.DecorationRole, Qt.ItemDataRole.UserRole])
+
+    def is_checked(self, row: int) -> bool:
+        return bool(self._checked[row])
+
+    def checked_rows(self) -> list[int]:
+        return [row for row, checked in enumerate(self._checked) if checked]
+
+    def set_all_checked(self, checked: bool):
+        if not self._words:
+            return
+        self._checked = bytearray(b'\x01' if checked else b'\x00') * len(self._words)
+        self._emit_changed(0, len(self._words) - 1, [Qt.ItemDataRole.CheckStateRole])
@@ -0,0 +1,195 @@
+"""
+Snapshots of remote wordbook groups, for incremental pulls.
+
+A snapshot is the ordered word list of a group as of the last pull. Pulling again only
+fetches the first and the last page, plus a few more pages if new words were added at
+either end, and splices them onto the snapshot. Pages fetched are checked against the
+spliced list, anything inconsistent (e.g. words deleted in the middle) falls back to
+fetching every page.
+
+Changes between the fetched pages that keep the page count, e.g. one word deleted and
+another added in the middle, can't be seen this way. Snapshots older than `MAX_AGE` are
+therefore ignored, so every group is pulled in full at least that often.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Iterable, Optional, TypedDict
+
+logger = logging.getLogger('dict2Anki.wordbookSnapshot')
+
+MAX_PROBE_PAGES = 4
+"""从首页（末页）往后（往前）最多再取几页来找和快照的衔接处，超出则全量获取"""
+
+MAX_AGE = 7 * 24 * 3600
+"""快照超过这么多秒未全量更新则视为过期，全量获取"""
+
+
+class Snapshot(TypedDict):
+    pages: int
+    count: int
+    fingerprint: str
+    words: list[str]
+    updated: float
+
+
+def fingerprint(words: Iterable[str]) -> str:
+    return hashlib.sha1('\n'.join(words).encode('utf-8')).hexdigest()
+
+
+def splice(head: list[str], old: list[str]) -> Optional[list[str]]:
+    """
+    `head` (leading words fetched now) continued by `old`, None if they don't join.
+
+    They join at the first word of `head` whose following words are also the following
+    words in `old`. Words of `old` before that point were deleted, words of `head` before
+    that point were added.
+    """
+    rows = {word: row for row, word in reversed(list(enumerate(old)))}
+    for i, word in enumerate(head):
+        j = rows.get(word)
+        if j is not None and old[j:j + len(head) - i] == head[i:]:
+            return head[:i] + old[j:]
+    return None
+
+
+def plausible(words: list[str], totalPage: int, pageSize: int) -> bool:
+    """`words` fills exactly `totalPage` pages, false if some page failed to fetch"""
+    return (totalPage - 1) * pageSize < len(words) <= totalPage * pageSize
+
+
+def _consistent(words: list[str], pages: dict[int, list[str]], totalPage: int, pageSize: int) -> bool:
+    """`words` has `totalPage` pages and contains every fetched page at its place"""
+    if not plausible(words, totalPage, pageSize):
+        return False
+    return all(words[p * pageSize:(p + 1) * pageSize] == page for p, page in pages.items())
+
+
+def pullGroup(
+    totalPage: int,
+    pageSize: int,
+    old: Optional[list[str]],
+    fetchPages: Callable[[list[int]], list[list[str]]],
+    firstPage: Optional[list[str]] = None,
+) -> list[str]:
+    """
+    Word list of a group, fetching as few pages as possible when `old` is known.
+
+    :param old: word list of the last pull, None to fetch every page
+    :param fetchPages: fetches words of the given page numbers
+    :param firstPage: words of page 0 if already fetched
+    """
+    if totalPage <= 0:
+        return []
+    pages: dict[int, list[str]] = {}
+    if firstPage is not None:
+        pages[0] = firstPage
+
+    def fetch(pageNos: Iterable[int]):
+        pageNos = [p for p in pageNos if 0 <= p < totalPage and p not in pages]
+        if pageNos:
+            pages.update(zip(pageNos, fetchPages(pageNos)))
+
+    if old:
+        fetch([0, totalPage - 1])
+        # 新单词在前
+        probe = min(MAX_PROBE_PAGES, totalPage)
+        for n in range(1, probe + 1):
+            head = [w for p in range(n) for w in pages[p]]
+            words = splice(head, old)
+            if words is not None:
+                if _consistent(words, pages, totalPage, pageSize):
+                    return words
+                break
+            fetch([n])
+        # 新单词在后
+        for n in range(1, probe + 1):
+            tail = [w for p in range(totalPage - n, totalPage) for w in pages[p]]
+            words = splice(tail[::-1], old[::-1])
+            if words is not None:
+                words.reverse()
+                if _consistent(words, pages, totalPage, pageSize):
+                    return words
+                break
+            fetch([totalPage - n - 1])
+        logger.info(f'与快照不一致，获取全部{totalPage}页')
+
+    fetch(range(totalPage))
+    return [w for p in range(totalPage) for w in pages[p]]
+
+
+class SnapshotStore:
+    """
+    Snapshots of all groups in a JSON file, keyed by dictionary name and group id.
+
+    Thread safe. Changes are kept in memory until `save`.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._lock = threading.Lock()
+        self._snapshots: dict[str, Snapshot] = {}
+        try:
+            with open(path, encoding='utf-8') as f:
+                self._snapshots = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f'读取单词本快照失败，将全量获取: {e}')
+
+    @staticmethod
+    def _key(dictName: str, groupId: str) -> str:
+        return f'{dictName}/{groupId}'
+
+    def get(self, dictName: str, groupId: str) -> Optional[Snapshot]:
+        """snapshot of a group, None if missing, corrupted or older than `MAX_AGE`"""
+        with self._lock:
+            snapshot = self._snapshots.get(self._key(dictName, groupId))
+        if not snapshot:
+            return None
+        try:
+            if fingerprint(snapshot['words']) != snapshot['fingerprint']:
+                raise ValueError
+            if time.time() - snapshot['updated'] > MAX_AGE:
+                logger.info(f'单词本快照已过期: {dictName}/{groupId}')
+                return None
+            return snapshot
+        except (KeyError, TypeError, ValueError):
+            pass
+        logger.warning(f'单词本快照损坏: {dictName}/{groupId}')
+        return None
+
+    def put(self, dictName: str, groupId: str, words: list[str], pages: int, updated: Optional[float] = None):
+        """
+        :param updated: when the group was last pulled in full, now if None. Pass the
+            `updated` of the old snapshot after an incremental pull, so it still expires.
+        """
+        snapshot = Snapshot(
+            pages=pages,
+            count=len(words),
+            fingerprint=fingerprint(words),
+            words=list(words),
+            updated=time.time() if updated is None else updated,
+        )
+        with self._lock:
+            self._snapshots[self._key(dictName, groupId)] = snapshot
+
+    def remove(self, dictName: str, groupId: str):
+        with self._lock:
+            self._snapshots.pop(self._key(dictName, groupId), None)
+
+    def save(self):
+        """write to a temporary file and then replace, never leaves a half written file"""
+        with self._lock:
+            data = json.dumps(self._snapshots, ensure_ascii=False)
+        tmp = f'{self._path}.tmp'
+        try:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp, self._path)
+        except OSError as e:
+            logger.warning(f'保存单词本快照失败: {e}')
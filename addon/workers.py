@@ -1,9 +1,14 @@
 import json
 import logging
 import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
 import typing
 from abc import abstractmethod
-from itertools import chain
+from concurrent.futures import CancelledError, Future, wait
 
 import requests
 from aqt import QObject, pyqtBoundSignal, pyqtSignal
@@ -11,8 +16,8 @@ from requests.adapters import HTTPAdapter
 from urllib3 import Retry
 
 from . import constants as C
-from . import misc
-from ._typing import AbstractDictionary, AbstractQueryAPI, QueryWordData
+from . import audioCache, misc, wordbookSnapshot
+from ._typing import AbstractDictionary, AbstractQueryAPI, QueryWordData, WordPages
 from .conf_model import Conf
 
 
@@ -24,6 +29,8 @@ class AbstractWorker(QObject):
         super().__init__(parent)
         self.interrupted = False
         """Set by WorkerManager when destroyed."""
+        self.executor: typing.Optional[misc.Executor] = None
+        """Shared pool for network tasks, set by WorkerManager.start()."""
 
     @abstractmethod
     def run(self):
@@ -31,6 +38,103 @@ class AbstractWorker(QObject):
         pass
 
 
+class SignalBatcher:
+    """
+    Coalesces per item updates from worker threads into one list signal, so the GUI
+    thread handles a batch instead of a queued event per item.
+
+    `add` is thread safe, pending items are emitted at most every `interval` seconds,
+    and at the latest `interval` seconds after they are added even if nothing else is
+    added (a worker waiting on slow requests still shows its progress). `flush` emits the
+    rest and must be called before the worker is done.
+    """
+
+    interval = 0.05
+
+    def __init__(self, signal: pyqtBoundSignal, interval: typing.Optional[float] = None):
+        self._signal = signal
+        self._interval = self.interval if interval is None else interval
+        self._lock = threading.Lock()
+        self._items: list = []
+        self._last = time.monotonic()
+        self._timer: typing.Optional[threading.Timer] = None
+        """not a QTimer, items are added by pool threads without an event loop"""
+
+    def add(self, item):
+        with self._lock:
+            self._items.append(item)
+            wait = self._interval - (time.monotonic() - self._last)
+            if wait <= 0:
+                self._emit()
+            elif self._timer is None:
+                self._timer = threading.Timer(wait, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._items:
+                self._emit()
+
+    def _emit(self):
+        # emit inside the lock to keep batches in order, emitting a queued signal is cheap
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, self._items = self._items, []
+        self._last = time.monotonic()
+        self._signal.emit(items)
+
+
+_T = typing.TypeVar("_T")
+
+
+class Feed(typing.Generic[_T]):
+    """
+    Items handed over from a running producer to a worker, e.g. new words found while
+    pulling, queried while the pull goes on.
+
+    `put` is thread safe. Iterating blocks until items arrive and ends once `close` is
+    called, the producer must always `close` it (even if interrupted). A consumer that may
+    be interrupted before the producer runs iterates with `until` instead.
+    """
+
+    _END = object()
+    poll_interval = 0.5
+    """seconds between checks of `until`'s stop condition while waiting"""
+
+    def __init__(self):
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+
+    def put(self, items: typing.Iterable[_T]):
+        for item in items:
+            self._queue.put(item)
+
+    def close(self):
+        self._queue.put(self._END)
+
+    def __iter__(self) -> typing.Iterator[_T]:
+        while (item := self._queue.get()) is not self._END:
+            yield item
+
+    def until(self, stop: typing.Callable[[], bool]) -> typing.Iterator[_T]:
+        """like iterating, but also ends once `stop()` returns True, even if never closed"""
+        while not stop():
+            try:
+                item = self._queue.get(timeout=self.poll_interval)
+            except queue.Empty:
+                continue
+            if item is self._END:
+                return
+            yield item
+
+
+WordFeed = Feed[tuple[int, str]]
+"""(row, word) of words to query"""
+AudioFeed = Feed[tuple[str, str]]
+"""(file name, url) of audios to download"""
+
+
 class NetworkWorker(AbstractWorker):
     retries = Retry(total=5, backoff_factor=3, status_forcelist=[500, 502, 503, 504])
     session = requests.Session()
@@ -44,26 +148,36 @@ class NetworkWorker(AbstractWorker):
 
 class WorkerManager:
     _logger = logging.getLogger("dict2Anki.workers.WorkerManager")
+    max_network_workers = 8
 
     def __init__(self):
-        self._pool = misc.ThreadPool(max_workers=os.cpu_count())
+        self._pool = misc.Executor(max_workers=os.cpu_count() or 4, name="Dict2Anki-worker")
+        """runs `AbstractWorker.run()`"""
+        self.executor = misc.Executor(max_workers=self.max_network_workers, name="Dict2Anki-network")
+        """shared by all workers for network tasks, living as long as the addon window"""
         self._workers: list[AbstractWorker] = []
 
     def start(self, worker: AbstractWorker):
         worker.done.connect(self._on_worker_done)
+        worker.executor = self.executor
         self._workers.append(worker)
-        # python automatically wraps the bounded method, so `submit(worker.run)` is also ok
-        self._pool.submit(lambda: (lambda worker: worker.run())(worker))
+        self._pool.submit(worker.run).add_done_callback(self._on_run_finished)
 
     def destroy(self):
+        """interrupt all workers and cancel pending network tasks, doesn't wait"""
         for worker in self._workers:
             worker.interrupted = True
             worker.disconnect()
-        self._pool.exit()
+        self.executor.shutdown()
+        self._pool.shutdown()
 
     def _on_worker_done(self, worker):
         self._workers.remove(worker)
 
+    def _on_run_finished(self, future: Future):
+        if not future.cancelled() and (e := future.exception()):
+            self._logger.error("worker 异常退出", exc_info=e)
+
 
 class VersionCheckWorker(AbstractWorker):
     haveNewVersion = pyqtSignal(str, str)
@@ -112,73 +226,251 @@ class RemoteWordFetchingWorker(AbstractWorker):
     tick = pyqtSignal()
     setProgress = pyqtSignal(int)
     doneThisGroup = pyqtSignal(list)
+    newWordsFound = pyqtSignal(list)
+    """new words of each page, in the order of rows fed to `feed`"""
     _logger = logging.getLogger("dict2Anki.workers.RemoteWordFetchingWorker")
+    concurrency = 6
+    """max page requests at the same time, of all groups"""
 
     def __init__(
-        self, selectedDict: type[AbstractDictionary], groups: list[tuple[str, str]]
+        self,
+        selectedDict: type[AbstractDictionary],
+        groups: list[tuple[str, str]],
+        snapshots: typing.Optional[wordbookSnapshot.SnapshotStore] = None,
+        localWords: typing.Optional[typing.AbstractSet[str]] = None,
+        feed: typing.Optional[WordFeed] = None,
     ):
+        """
+        :param snapshots: snapshots of last pulls, only changed pages are fetched if given,
+            None to fetch every page
+        :param localWords: if given, each page is compared with it as soon as fetched, new
+            words are emitted by `newWordsFound` and put into `feed` with rows from 0
+        :param feed: closed when the worker is done
+        """
         super().__init__()
         self.selectedDict = selectedDict
         self.groups = groups
+        self.snapshots = snapshots
+        self.localWords = localWords
+        self.feed = feed
+        self._seen: set[str] = set()
+        """new words found, across groups"""
 
     def run(self):
-
-        def _pull(*args):
-            wordPerPage = self.selectedDict.getWordsByPage(*args)
-            self.tick.emit()
-            return wordPerPage
-
         try:
-            for groupName, groupId in self.groups:
-
-                totalPage = self.selectedDict.getTotalPage(groupName, groupId)
-                self.setProgress.emit(totalPage)
-                with misc.ThreadPool(max_workers=3) as executor:
-                    for i in range(totalPage):
-                        if self.interrupted:
-                            return
-                        executor.submit(_pull, i, groupName, groupId)
-                remoteWordList = list(chain(*[ft[2] for ft in executor.result]))
-                self.doneThisGroup.emit(remoteWordList)
+            assert self.executor
+            # 所有分组的页共用同一个并发上限，和其他 worker 共用网络线程池
+            slots = self.executor.slots(self.concurrency)
+            wordPagesList = [
+                self.selectedDict.iterWords(groupName, groupId, self.executor, self.concurrency, limit=slots)
+                for groupName, groupId in self.groups
+            ]
+            # 各分组的第一页同时获取（总页数和每页单词数随之得到），之后逐个分组获取，
+            # 一个分组预取的页已能用满并发上限
+            totalPages = self.executor.map(
+                lambda wordPages: wordPages.open(), wordPagesList, limit=slots, stop=lambda: self.interrupted
+            )
+            self.setProgress.emit(sum(totalPages))
+            for wordPages in wordPagesList:
+                if self.interrupted:
+                    raise CancelledError()
+                self.doneThisGroup.emit(self._pullGroup(wordPages, slots))
+        except CancelledError:
+            self._logger.info("已取消")
         finally:
+            if self.feed is not None:
+                self.feed.close()
+            if self.snapshots is not None:
+                self.snapshots.save()
             self.done.emit(self)
 
+    def _diff(self, words: list[str]):
+        """find new words of a page, groups are pulled one by one in the worker thread"""
+        if self.localWords is None:
+            return
+        newWords = [w for w in dict.fromkeys(words) if w not in self.localWords and w not in self._seen]
+        if not newWords:
+            return
+        first = len(self._seen)
+        self._seen.update(newWords)
+        # emit before feeding, so the rows are added to the view before any of them is queried
+        self.newWordsFound.emit(newWords)
+        if self.feed is not None:
+            self.feed.put(enumerate(newWords, first))
+
+    def _pullGroup(self, wordPages: WordPages, slots) -> list[str]:
+        """
+        Words of an opened group. Pages are fetched by the shared executor, each taking
+        one of `slots`.
+        """
+        assert self.executor
+        executor = self.executor
+        groupName, groupId = wordPages.groupName, wordPages.groupId
+        totalPage = wordPages.open()
+
+        oldWords = None
+        # 上次全量获取的时间，本次全量获取则为 None
+        updated = None
+        if self.snapshots and (snapshot := self.snapshots.get(self.selectedDict.name, groupId)):
+            oldWords = snapshot["words"]
+
+        if oldWords is None:
+            remoteWordList = []
+            for words in wordPages:
+                if self.interrupted:
+                    raise CancelledError()
+                remoteWordList.extend(words)
+                self._diff(words)
+                self.tick.emit()
+            fetched = totalPage
+        else:
+            fetched = 1 if totalPage else 0
+            if totalPage:
+                self.tick.emit()
+
+            def _pull(pageNo: int):
+                wordPerPage = wordPages.getPage(pageNo)
+                self.tick.emit()
+                return wordPerPage
+
+            def fetchPages(pageNos: list[int]) -> list[list[str]]:
+                nonlocal fetched
+                fetched += len(pageNos)
+                return executor.map(_pull, pageNos, limit=slots, stop=lambda: self.interrupted)
+
+            remoteWordList = wordbookSnapshot.pullGroup(
+                totalPage, wordPages.pageSize, oldWords, fetchPages, wordPages.firstPage
+            )
+            if fetched < totalPage:
+                updated = snapshot["updated"]
+            for _ in range(totalPage - fetched):
+                self.tick.emit()
+            self._diff(remoteWordList)
+        self._logger.info(f"分组({groupName}-{groupId})共{totalPage}页，实际获取{fetched}页")
+
+        if (
+            self.snapshots is not None
+            and remoteWordList
+            and wordbookSnapshot.plausible(remoteWordList, totalPage, wordPages.pageSize)
+        ):
+            self.snapshots.put(self.selectedDict.name, groupId, remoteWordList, totalPage, updated)
+        return remoteWordList
+
 
 def query_word(
     row: int,
     word: str,
     api: type[AbstractQueryAPI],
     logger: logging.Logger,
-    sig_success: pyqtBoundSignal,
-    sig_fail: pyqtBoundSignal,
-    sig_done: pyqtBoundSignal,
+    batcher: SignalBatcher,
+    fields: typing.Optional[typing.AbstractSet[str]] = None,
 ):
     """
     Query a single word through `api`
 
-    :param sig_success: emit(row, word, queryResult)
-    :param sig_fail: emit(row, word)
-    :param sig_done: emit()
+    An exception of `api` (e.g. a broken cache entry) fails only this word, as if the
+    query returned None.
+
+    :param batcher: collects (row, word, queryResult|None)
+    :param fields: fields to query, None for all
     """
-    queryResult = api.query(word)
+    try:
+        queryResult = api.query(word, fields=fields)
+    except Exception as e:
+        logger.exception(f"查询异常: {row}, {word}, {e}")
+        queryResult = None
     if queryResult:
         logger.info(f"查询成功: {row}, {word} -- {queryResult}")
-        sig_success.emit(row, word, queryResult)
     else:
         logger.warning(f"查询失败: {row}, {word}")
-        sig_fail.emit(row, word)
-    sig_done.emit()
+    batcher.add((row, word, queryResult))
     return queryResult
 
 
-def download_file(session: requests.Session, fileName, url):
-    r = session.get(url, stream=True)
-    if not r.ok:
-        raise PermissionError(f"http status code: {r.status_code}")
-    with open(fileName, "wb") as f:
-        for chunk in r.iter_content(chunk_size=1024):
-            if chunk:
-                f.write(chunk)
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+"""下载时每次读取的字节数"""
+DOWNLOAD_RESUMES = 3
+"""连接中断后断点续传的次数"""
+_NOT_AUDIO_TYPES = ("text/", "application/json", "application/xml", "application/xhtml")
+_logger = logging.getLogger("dict2Anki.workers")
+
+
+def _content_range(r: requests.Response) -> tuple[int, typing.Optional[int]]:
+    """(first byte, total size) of a 206 response, total is None if unknown"""
+    unit, _, spec = r.headers.get("Content-Range", "").partition(" ")
+    byte_range, _, total = spec.partition("/")
+    if unit != "bytes" or "-" not in byte_range:
+        raise ValueError(f"invalid Content-Range: {r.headers.get('Content-Range')}")
+    return int(byte_range.split("-")[0]), None if total in ("", "*") else int(total)
+
+
+def download_file(
+    session: requests.Session, fileName, url, chunk_size=DOWNLOAD_CHUNK_SIZE, resumes=DOWNLOAD_RESUMES
+):
+    """
+    Download `url` into a temporary file, renamed to `fileName` once complete, so
+    `fileName` is never left truncated or replaced by an error page.
+
+    An interrupted transfer is continued with a Range request up to `resumes` times,
+    starting over if the server ignores the range or the file changed meanwhile.
+
+    :raise PermissionError: http error status
+    :raise ValueError: a text body (e.g. html error page), or shorter than Content-Length
+    """
+    partial_dir = os.path.join(misc.tmp_audio_dir(), "partial")
+    os.makedirs(partial_dir, exist_ok=True)
+    fd, part = tempfile.mkstemp(suffix=".part", dir=partial_dir)
+    os.close(fd)
+    offset = 0
+    total: typing.Optional[int] = None
+    resumable = False
+    validator: typing.Optional[str] = None
+    """ETag or Last-Modified, the range is only served if the file is unchanged"""
+    try:
+        for attempt in range(resumes + 1):
+            headers = {}
+            if offset:
+                headers["Range"] = f"bytes={offset}-"
+                if validator:
+                    headers["If-Range"] = validator
+            try:
+                with session.get(url, stream=True, headers=headers) as r:
+                    if not r.ok:
+                        raise PermissionError(f"http status code: {r.status_code}")
+                    content_type = r.headers.get("Content-Type", "").lower()
+                    if content_type.startswith(_NOT_AUDIO_TYPES):
+                        raise ValueError(f"not an audio file, Content-Type: {content_type}")
+                    # 压缩传输时 Content-Length 和 Range 都按压缩后的字节计算，无法校验和续传
+                    encoded = bool(r.headers.get("Content-Encoding"))
+                    if offset and r.status_code == 206:
+                        start, total = _content_range(r)
+                        if start != offset:
+                            raise ValueError(f"unexpected Content-Range: {r.headers['Content-Range']}")
+                        mode = "ab"
+                    else:
+                        offset, mode = 0, "wb"
+                        length = r.headers.get("Content-Length")
+                        total = int(length) if length and not encoded else None
+                    resumable = not encoded
+                    validator = r.headers.get("ETag") or r.headers.get("Last-Modified")
+                    with open(part, mode) as f:
+                        for chunk in r.iter_content(chunk_size=chunk_size):
+                            f.write(chunk)
+                            offset += len(chunk)
+            except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+                if attempt == resumes:
+                    raise
+                if not resumable:
+                    offset = 0
+                _logger.info(f"下载中断，从{offset}字节处继续：{url}, {e}")
+                continue
+            if total is None or offset >= total:
+                break
+        if offset == 0 or (total is not None and offset != total):
+            raise ValueError(f"incomplete download: {offset} / {total} bytes")
+        misc.replace_file(part, fileName)
+    finally:
+        rmv_file(part)
 
 
 def rmv_file(fileName):
@@ -191,153 +483,245 @@ def downloadSingleAudio(
     url: str,
     session: requests.Session,
     logger: logging.Logger,
-    tick: pyqtBoundSignal,
+    batcher: SignalBatcher,
+    limiter: typing.Optional[misc.TokenBucket] = None,
 ):
+    """
+    Copy from the audio cache if cached, otherwise download and put into the cache.
+
+    :param batcher: collects (fileName, url, success)
+    """
     success = False
+    cache = audioCache.get_cache()
     try:
+        if cache and cache.fetch(url, fileName):
+            success = True
+            logger.info(f"发音缓存命中：{fileName}, {url}")
+            return success
+        if limiter:
+            limiter.acquire()
         download_file(session, fileName, url)
         success = True
         logger.info(f"发音下载完成：{fileName}, {url}")
+        if cache:
+            try:
+                cache.put(url, fileName)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"写入发音缓存失败：{fileName}, {e}")
     except Exception as e:
         logger.warning(f"下载{fileName}, {url}，异常: {e}")
-        rmv_file(fileName)
         success = False
     finally:
-        tick.emit(fileName, url, success)
+        batcher.add((fileName, url, success))
     return success
 
 
 class QueryAllWorker(NetworkWorker):
-    """Query words and download audios"""
+    """
+    Query words and download audios.
 
-    rowSuccess = pyqtSignal(int, str, dict)
-    rowFail = pyqtSignal(int, str)
-    query_word_tick = pyqtSignal()
-    audio_tick = pyqtSignal(str, str, bool)
-    """emit(file_name, url, success)"""
+    Pipelined: at most `query_workers` lookups run on the shared executor, each
+    successful lookup hands its audio over to the download stage (at most
+    `audio_workers`) right away, so queries don't wait for downloads. Both stages are
+    throttled by the shared per-host rate limiter.
+
+    `row_words` may be a `WordFeed` still being filled by another worker, rows are
+    queried as they come.
+    """
+
+    rowsDone = pyqtSignal(list)
+    """batches of list[tuple[row, word, QueryWordData|None]]"""
+    audiosDone = pyqtSignal(list)
+    """batches of list[tuple[file_name, url, success]]"""
     doneWithResult = pyqtSignal(list)
     _logger = logging.getLogger("dict2Anki.workers.QueryAllWorker")
+    query_workers = 3
+    audio_workers = 3
 
     def __init__(
         self,
-        row_words: list[tuple[int, str]],
+        row_words: typing.Iterable[tuple[int, str]],
         which_pron: typing.Optional[str],
         api: type[AbstractQueryAPI],
         congest=60,
+        fields: typing.Optional[typing.AbstractSet[str]] = None,
     ):
         super().__init__()
         self._row_words = row_words
         self._which_pron = which_pron
         self._api = api
         self._congest = congest
+        self._fields = fields
         self._results: list[tuple[int, str, typing.Optional[QueryWordData]]] = []
         """list[tuple[row, word, QueryWordData|None]]"""
 
     def run(self):
+        rows = SignalBatcher(self.rowsDone)
+        audios = SignalBatcher(self.audiosDone)
         try:
             tmp_audio_dir = misc.tmp_audio_dir()
             os.makedirs(tmp_audio_dir, exist_ok=True)
 
-            congestGen = misc.congestGenerator(self._congest)
-            for row, word in self._row_words:
+            limiter = misc.rate_limiter(self._api.url, self._congest)
+            results: dict[int, tuple[int, str, typing.Optional[QueryWordData]]] = {}
+
+            def _download(result: QueryWordData):
                 if self.interrupted:
-                    break
-                next(congestGen)
+                    return
+                url = result[self._which_pron]  # type: ignore
+                downloadSingleAudio(
+                    os.path.join(tmp_audio_dir, misc.audio_fname(self._which_pron, result[C.F_TERM])),  # type: ignore
+                    url,
+                    self.session,
+                    self._logger,
+                    audios,
+                    misc.rate_limiter(url, self._congest),
+                )
+
+            def _query(i: int, row: int, word: str):
+                if self.interrupted:
+                    return
+                limiter.acquire()
                 result = query_word(
                     row,
                     word,
                     self._api,
                     self._logger,
-                    self.rowSuccess,
-                    self.rowFail,
-                    self.query_word_tick,
+                    rows,
+                    self._fields,
                 )
                 if result and self._which_pron and result.get(self._which_pron):
-                    tmp_audio_path = os.path.join(
-                        tmp_audio_dir,
-                        misc.audio_fname(self._which_pron, result[C.F_TERM]),
-                    )
-                    downloadSingleAudio(
-                        tmp_audio_path,
-                        result[self._which_pron],
-                        self.session,
-                        self._logger,
-                        self.audio_tick,
-                    )
-
-                self._results.append((row, word, result))
-
+                    audio_slots.acquire()
+                    future = executor.submit(_download, result)
+                    future.add_done_callback(lambda _: audio_slots.release())
+                    audio_futures.append(future)
+                results[i] = (row, word, result)
+
+            # Bound in-flight tasks of each stage, so queued queries don't occupy the
+            # shared pool and starve the downloads.
+            executor = self.executor
+            assert executor
+            query_slots = threading.BoundedSemaphore(self.query_workers)
+            audio_slots = threading.BoundedSemaphore(self.audio_workers)
+            query_futures: list[Future] = []
+            audio_futures: list[Future] = []
+
+            row_words = self._row_words
+            if isinstance(row_words, Feed):
+                # 获取单词的 worker 可能未运行就被取消，不会关闭 feed
+                row_words = row_words.until(lambda: self.interrupted)
+            for i, (row, word) in enumerate(row_words):
+                query_slots.acquire()
+                if self.interrupted:
+                    break
+                future = executor.submit(_query, i, row, word)
+                future.add_done_callback(lambda _: query_slots.release())
+                query_futures.append(future)
+
+            # all audios are submitted once all queries are done
+            wait(query_futures)
+            wait(audio_futures)
+            rows.flush()
+            audios.flush()
+
+            self._results = [results[i] for i in sorted(results)]
+            self._logger.info(f"限流 {limiter.stats()}")
             self.doneWithResult.emit(self._results)
         finally:
+            rows.flush()
+            audios.flush()
             self.done.emit(self)
 
 
 class QueryWorker(AbstractWorker):
-    tick = pyqtSignal()
-    rowSuccess = pyqtSignal(int, str, dict)
-    rowFail = pyqtSignal(int, str)
+    rowsDone = pyqtSignal(list)
+    """batches of list[tuple[row, word, QueryWordData|None]]"""
     doneWithResult = pyqtSignal(list)
     _logger = logging.getLogger("dict2Anki.workers.QueryWorker")
 
     def __init__(
-        self, row_words: list[tuple[int, str]], api: type[AbstractQueryAPI], congest=60
+        self,
+        row_words: list[tuple[int, str]],
+        api: type[AbstractQueryAPI],
+        congest=60,
+        fields: typing.Optional[typing.AbstractSet[str]] = None,
     ):
         super().__init__()
         self._row_words = row_words
         self._api = api
         self._congest = congest
+        self._fields = fields
 
     def run(self):
 
+        limiter = misc.rate_limiter(self._api.url, self._congest)
+        rows = SignalBatcher(self.rowsDone)
+
         def _query(row, word):
-            return query_word(
-                row,
-                word,
-                self._api,
-                self._logger,
-                self.rowSuccess,
-                self.rowFail,
-                self.tick,
-            )
+            limiter.acquire()
+            return query_word(row, word, self._api, self._logger, rows, self._fields)
 
         try:
-            with misc.ThreadPool(max_workers=3) as executor:
-                congestGen = misc.congestGenerator(self._congest)
-                for row, word in self._row_words:
-                    if self.interrupted:
-                        return
-                    next(congestGen)
-                    executor.submit(_query, row, word)
-
-            results = [(r[0][0], r[0][1], r[2]) for r in executor.result]
+            assert self.executor
+            queryResults = self.executor.map(
+                _query,
+                [row for row, _ in self._row_words],
+                [word for _, word in self._row_words],
+                limit=3,
+                stop=lambda: self.interrupted,
+            )
+
+            self._logger.info(f"限流 {limiter.stats()}")
+            rows.flush()
+            results = [(row, word, r) for (row, word), r in zip(self._row_words, queryResults)]
             self.doneWithResult.emit(results)
             return results
+        except CancelledError:
+            self._logger.info("已取消")
+        except Exception as e:
+            # 结果的接收方靠 doneWithResult 结束这一轮，失败也要发出，全部视为查询失败
+            self._logger.exception(f"查询出错: {e}")
+            rows.flush()
+            self.doneWithResult.emit([(row, word, None) for row, word in self._row_words])
         finally:
+            rows.flush()
             self.done.emit(self)
 
 
 class AudioDownloadWorker(NetworkWorker):
-    tick = pyqtSignal(str, str, bool)
+    audiosDone = pyqtSignal(list)
+    """batches of list[tuple[file_name, url, success]]"""
     _logger = logging.getLogger("dict2Anki.workers.AudioDownloadWorker")
 
-    def __init__(self, audios: list[tuple[str, str]]):
+    def __init__(self, audios: typing.Iterable[tuple[str, str]], congest=60):
+        """:param audios: (file name, url), may be an `AudioFeed` filled while downloading"""
         super().__init__()
         self._audios = audios
+        self._congest = congest
 
     def run(self):
+        audios = SignalBatcher(self.audiosDone)
+
+        def _download(fileName, url):
+            return downloadSingleAudio(
+                fileName,
+                url,
+                self.session,
+                self._logger,
+                audios,
+                misc.rate_limiter(url, self._congest),
+            )
 
         try:
-            with misc.ThreadPool(max_workers=3) as executor:
-                for fileName, url in self._audios:
-                    if self.interrupted:
-                        return
-                    executor.submit(
-                        downloadSingleAudio,
-                        fileName,
-                        url,
-                        self.session,
-                        self._logger,
-                        self.tick,
-                    )
+            assert self.executor
+            self.executor.map(
+                lambda audio: _download(*audio),
+                self._audios,
+                limit=3,
+                stop=lambda: self.interrupted,
+            )
+        except CancelledError:
+            self._logger.info("已取消")
         finally:
+            audios.flush()
             self.done.emit(self)
@@ -2,12 +2,26 @@ from .addons import AddonManager
 from .collection import Collection
 from .decks import Deck
 from .models import Model
+from .taskman import TaskManager
 
 
 class mw:
     addonManager = AddonManager()
     col = Collection(Deck(), Model())
+    taskman = TaskManager()
 
     @staticmethod
     def reset():
         pass
+
+    @staticmethod
+    def _increase_background_ops():
+        pass
+
+    @staticmethod
+    def _decrease_background_ops():
+        pass
+
+    @staticmethod
+    def update_undo_actions():
+        pass
@@ -1,3 +1,5 @@
+from anki.collection import OpChanges
+
 from . import decks, models, notes
 
 
@@ -24,8 +26,20 @@ class Collection:
     def add_note(self, *args, **kwargs):
         pass
 
-    def update_notes(self, *args, **kwargs):
+    def add_notes(self, *args, **kwargs):
+        pass
+
+    def add_custom_undo_entry(self, *args, **kwargs):
+        return 1
+
+    def merge_undo_entries(self, *args, **kwargs):
         pass
 
+    def op_made_changes(self, *args, **kwargs):
+        return False
+
+    def update_notes(self, *args, **kwargs):
+        return OpChanges()
+
     def update_note(self, *args, **kwargs):
         pass
\ No newline at end of file
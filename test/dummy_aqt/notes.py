@@ -6,6 +6,7 @@ NoteId = int
 class Note:
     def __init__(self, nid):
         self.nid = nid
+        self.id = nid
 
     def note_type(self):
         return {'name': C.MODEL_NAME}
@@ -0,0 +1,14 @@
+from concurrent.futures import Future
+
+
+class TaskManager:
+    """Runs tasks synchronously"""
+
+    def with_progress(self, task, on_done=None, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(task())
+        except Exception as e:
+            future.set_exception(e)
+        if on_done:
+            on_done(future)
@@ -23,8 +23,12 @@ def addNoteToDeck(deckObject, modelObject, conf: conf_model.Conf, oneQueryResult
     pass
 
 
-def getWordsByDeck(*args, **kwargs):
-    return []
+def addNotesToDeck(deckObject, modelObject, conf: conf_model.Conf, queryResults: list[QueryWordData]):
+    pass
+
+
+def getWordIndexByDeck(*args, **kwargs):
+    return {}
 
 
 def getNoteIds(*args, **kwargs):
@@ -40,7 +44,7 @@ def media_path(fileName: str) -> str:
 
 
 def writeNoteFields(*args, **kwargs):
-    pass
+    return True
 
 
 def getNotesByDeckName(*args, **kwargs) -> list[notes.Note]:
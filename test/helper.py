@@ -67,6 +67,8 @@ _CONFIG_V2 = f"""{{
   "AmEPron": true,
   "noPron": false,
   "congest": 120,
+  "incrementalSync": false,
+  "pullAndQuery": false,
   "user_agent": "{USER_AGENT}"
 }}
 """
@@ -17,7 +17,8 @@ def mock_noteManager(monkeypatch):
         dummy_noteManager.getOrCreateModelCardTemplate,
     )
     monkeypatch.setattr(noteManager, 'addNoteToDeck', dummy_noteManager.addNoteToDeck)
-    monkeypatch.setattr(noteManager, 'getWordsByDeck', dummy_noteManager.getWordsByDeck)
+    monkeypatch.setattr(noteManager, 'addNotesToDeck', dummy_noteManager.addNotesToDeck)
+    monkeypatch.setattr(noteManager, 'getWordIndexByDeck', dummy_noteManager.getWordIndexByDeck)
     monkeypatch.setattr(noteManager, 'getNoteIds', dummy_noteManager.getNoteIds)
     monkeypatch.setattr(noteManager, 'removeNotes', dummy_noteManager.removeNotes)
     monkeypatch.setattr(noteManager, 'media_path', dummy_noteManager.media_path)
@@ -79,25 +80,34 @@ def mock_query_api(monkeypatch):
         lambda *args, **kwargs: requests.Response(),
     )
 
-    def mock_congest_generator(*args, **kwargs):
-        while True:
-            yield
+    monkeypatch.setattr(misc.TokenBucket, 'acquire', lambda *args, **kwargs: 0.0)
 
-    monkeypatch.setattr(misc, 'congestGenerator', mock_congest_generator)
+
+def mock_user_files_dir(monkeypatch, tmp_path):
+    user_files = str(tmp_path)
+    monkeypatch.setattr(misc, 'user_files_dir', lambda: user_files)
 
 
 class WindowMock:
-    def __init__(self, monkeypatch):
+    def __init__(self, monkeypatch, tmp_path):
         mock_aqt_mw(monkeypatch)
+        mock_user_files_dir(monkeypatch, tmp_path)
         mock_noteManager(monkeypatch)
         mock_aqt_utils(monkeypatch)
         mock_requests(monkeypatch)
         mock_query_api(monkeypatch)
+        self.windows: list[addonWindow.Windows] = []
 
     def __call__(self):
-        return addonWindow.Windows()
+        w = addonWindow.Windows()
+        self.windows.append(w)
+        return w
 
 
 @pytest.fixture
-def w_mock(monkeypatch):
-    return WindowMock(monkeypatch)
+def w_mock(monkeypatch, tmp_path):
+    mock = WindowMock(monkeypatch, tmp_path)
+    yield mock
+    # 关闭窗口，否则其日志 Handler 留在 logger 上，窗口被回收后其他测试打日志时出错
+    for w in mock.windows:
+        w.close()
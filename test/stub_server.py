@@ -0,0 +1,243 @@
+"""
+Local HTTP stub replaying recorded Youdao/Eudict responses, for offline tests and benchmarks.
+
+Requests of a patched session are redirected to the stub whatever the original host is,
+routes only look at the path:
+
+- youdao wordbook: GET /wordbook/webapi/words
+- eudict wordbook: POST /StudyList/WordsDataSource
+- youdao query: GET /jsonapi, replays fixtures/youdao/jsonapi.json
+- eudict query: GET /dicts/en/<word>, replays fixtures/eudict/flower.html
+- audios: GET /dictvoice, /api/v2/speech/speakweb
+
+Latency, error rate (503), throttling (429 beyond `max_rps` requests per second), the
+max wordbook page size and broken audio responses are configurable. Audios support Range
+requests.
+"""
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, unquote, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import Retry
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+# a few bytes looking like an mp3 file
+MP3_BYTES = b'ID3\x03\x00\x00\x00\x00\x00\x00' + b'\xff\xfb\x90\x00' * 256
+
+
+def _read_fixture(*path) -> str:
+    with open(os.path.join(FIXTURE_DIR, *path), encoding='utf-8') as f:
+        return f.read()
+
+
+class StubServer:
+    def __init__(
+        self,
+        words: Iterable[str] = (),
+        groups: Optional[dict[str, Iterable[str]]] = None,
+        latency: float = 0,
+        error_rate: float = 0,
+        max_rps: float = 0,
+        seed: int = 0,
+        max_page_size: int = 0,
+        audio_cut: int = 0,
+        audio_type: str = 'audio/mpeg',
+    ):
+        """
+        :param words: words of every wordbook group
+        :param groups: words of each wordbook group id, overrides `words`
+        :param latency: seconds to sleep before each response
+        :param error_rate: probability of responding 503
+        :param max_rps: respond 429 beyond `max_rps` requests per second, 0 is unlimited
+        :param max_page_size: wordbook pages are cut to this size whatever is requested, 0 is unlimited
+        :param audio_cut: audio responses close the connection after this many bytes, 0 never
+        :param audio_type: Content-Type of audio responses
+        """
+        self.words = list(words)
+        self.groups = {groupId: list(groupWords) for groupId, groupWords in (groups or {}).items()}
+        self.max_page_size = max_page_size
+        self.audio_cut = audio_cut
+        self.audio_type = audio_type
+        self.latency = latency
+        self.error_rate = error_rate
+        self.max_rps = max_rps
+        self.stats: Counter[str] = Counter()
+        """request count of each route, plus `error`, `throttled` and `range`"""
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window = (0, 0)
+        """(second, request count in that second) for throttling"""
+        self._youdao_json = _read_fixture('youdao', 'jsonapi.json')
+        self._eudict_html = _read_fixture('eudict', 'flower.html').encode('utf-8')
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def adapter(self, retries: Optional[Retry] = None):
+        """HTTPAdapter sending everything to the stub. Retries don't back off by default, to keep benchmarks short."""
+        if retries is None:
+            retries = Retry(total=5, backoff_factor=0, status_forcelist=[500, 502, 503, 504])
+        return StubAdapter(self.base_url, max_retries=retries)
+
+    def patch_sessions(self, monkeypatch, sessions: Iterable[requests.Session]):
+        """mount the stub adapter on `sessions`, restored by `monkeypatch`"""
+        for session in sessions:
+            monkeypatch.setattr(session, 'adapters', type(session.adapters)())
+            session.mount('http://', self.adapter())
+            session.mount('https://', self.adapter())
+
+    def _fault(self) -> int:
+        """status code of an injected fault, 0 if none"""
+        with self._lock:
+            if self.max_rps:
+                now = int(time.monotonic())
+                second, cnt = self._window
+                cnt = cnt + 1 if second == now else 1
+                self._window = (now, cnt)
+                if cnt > self.max_rps:
+                    self.stats['throttled'] += 1
+                    return 429
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.stats['error'] += 1
+                return 503
+        return 0
+
+    def _group_words(self, groupId: str) -> list[str]:
+        return self.groups.get(groupId, self.words)
+
+    def _page_size(self, requested: int) -> int:
+        return min(requested, self.max_page_size) if self.max_page_size else requested
+
+    def _route(self, method: str, path: str, params: dict[str, list[str]]) -> tuple[int, str, bytes]:
+        """returns (status, content type, body)"""
+        if path == '/wordbook/webapi/words':
+            words = self._group_words(params.get('bookId', [''])[0])
+            offset, limit = int(params['offset'][0]), self._page_size(int(params['limit'][0]))
+            items = [{'word': w} for w in words[offset:offset + limit]]
+            body = {'code': 0, 'data': {'total': len(words), 'itemList': items}}
+            return 200, 'application/json', json.dumps(body).encode('utf-8')
+
+        if path == '/StudyList/WordsDataSource' and method == 'POST':
+            words = self._group_words(params.get('categoryid', [''])[0])
+            start = int(params.get('start', ['0'])[0])
+            length = self._page_size(int(params.get('length', ['100'])[0]))
+            data = [{'uuid': w} for w in words[start:start + length]]
+            body = {'recordsTotal': len(words), 'data': data}
+            return 200, 'application/json', json.dumps(body).encode('utf-8')
+
+        if path == '/jsonapi':
+            term = params.get('q', [''])[0]
+            body = self._youdao_json.replace('__TERM__', term)
+            return 200, 'application/json', body.encode('utf-8')
+
+        if path.startswith('/dicts/en/'):
+            return 200, 'text/html; charset=utf-8', self._eudict_html
+
+        if path in ('/dictvoice', '/api/v2/speech/speakweb'):
+            return 200, self.audio_type, MP3_BYTES
+
+        return 404, 'text/plain', b'not found'
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _handle(self, method: str):
+                url = urlsplit(self.path)
+                params = parse_qs(url.query)
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    params.update(parse_qs(self.rfile.read(length).decode('utf-8')))
+                path = unquote(url.path)
+
+                with server._lock:
+                    server.stats[path if not path.startswith('/dicts/en/') else '/dicts/en/'] += 1
+                if server.latency:
+                    time.sleep(server.latency)
+
+                if status := server._fault():
+                    content_type, body = 'text/plain', b'stub fault'
+                else:
+                    status, content_type, body = server._route(method, path, params)
+
+                is_audio = status == 200 and path in ('/dictvoice', '/api/v2/speech/speakweb')
+                total = len(body)
+                if is_audio and (byte_range := self.headers.get('Range', '')).startswith('bytes='):
+                    with server._lock:
+                        server.stats['range'] += 1
+                    first = int(byte_range[len('bytes='):].split('-')[0])
+                    status, body = 206, body[first:]
+                else:
+                    first = 0
+
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                if is_audio:
+                    self.send_header('Accept-Ranges', 'bytes')
+                    self.send_header('ETag', '"stub"')
+                if status == 206:
+                    self.send_header('Content-Range', f'bytes {first}-{total - 1}/{total}')
+                self.end_headers()
+                if is_audio and server.audio_cut:
+                    self.wfile.write(body[:server.audio_cut])
+                    self.wfile.flush()
+                    self.close_connection = True
+                    return
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self._handle('GET')
+
+            def do_POST(self):
+                self._handle('POST')
+
+        return Handler
+
+
+class StubAdapter(HTTPAdapter):
+    """Rewrites scheme and host of every request to the stub server."""
+
+    def __init__(self, base_url: str, **kwargs):
+        self._base = urlsplit(base_url)
+        super().__init__(**kwargs)
+
+    def send(self, request, *args, **kwargs):
+        url = urlsplit(request.url)
+        request.url = urlunsplit((self._base.scheme, self._base.netloc, url.path, url.query, ''))
+        request.headers.pop('Host', None)
+        return super().send(request, *args, **kwargs)
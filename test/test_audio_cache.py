@@ -0,0 +1,199 @@
+import errno
+import logging
+import os
+import time
+
+import pytest
+import requests
+
+from ..addon import audioCache, workers
+
+
+@pytest.fixture
+def new_cache(tmp_path):
+    """factory opening the cache in the same folder, all closed after the test"""
+    caches: list[audioCache.AudioCache] = []
+
+    def open_cache(**kwargs) -> audioCache.AudioCache:
+        caches.append(audioCache.AudioCache(str(tmp_path / 'audio_cache'), **kwargs))
+        return caches[-1]
+
+    yield open_cache
+    for cache in caches:
+        cache.close()
+
+
+def audio_file(tmp_path, name: str, content: bytes) -> str:
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_put_fetch(tmp_path, new_cache):
+    cache = new_cache()
+    target = str(tmp_path / 'target.mp3')
+    assert not cache.fetch('http://a.mp3', target)
+
+    cache.put('http://a.mp3', audio_file(tmp_path, 'a.mp3', b'aaa'))
+    assert cache.fetch('http://a.mp3', target)
+    with open(target, 'rb') as f:
+        assert f.read() == b'aaa'
+    assert cache.hits == 1
+    assert cache.misses == 1
+    cache.close()
+
+
+def test_persistent(tmp_path, new_cache):
+    cache = new_cache()
+    cache.put('http://a.mp3', audio_file(tmp_path, 'a.mp3', b'aaa'))
+    cache.close()
+
+    cache = new_cache()
+    assert cache.fetch('http://a.mp3', str(tmp_path / 'target.mp3'))
+    cache.close()
+
+
+def test_dedup_by_content(tmp_path, new_cache):
+    cache = new_cache()
+    cache.put('http://a.mp3', audio_file(tmp_path, 'a.mp3', b'same'))
+    cache.put('http://b.mp3', audio_file(tmp_path, 'b.mp3', b'same'))
+
+    assert cache.count() == 2
+    assert cache.size() == 4
+    cache.close()
+
+
+def test_lru_eviction(tmp_path, new_cache, monkeypatch):
+    monkeypatch.setattr(audioCache, '_EVICT_EVERY', 1)
+    cache = new_cache(max_bytes=8)
+
+    now = time.time()
+    for i, url in enumerate(['a', 'b']):
+        monkeypatch.setattr(time, 'time', lambda i=i: now + i)
+        cache.put(url, audio_file(tmp_path, f'{url}.mp3', url.encode() * 4))
+    # touch 'a', so 'b' is the least recently used
+    monkeypatch.setattr(time, 'time', lambda: now + 2)
+    assert cache.fetch('a', str(tmp_path / 'target.mp3'))
+    monkeypatch.setattr(time, 'time', lambda: now + 3)
+    cache.put('c', audio_file(tmp_path, 'c.mp3', b'cccc'))
+
+    assert cache.count() == 2
+    assert cache.size() == 8
+    assert not cache.fetch('b', str(tmp_path / 'target.mp3'))
+    assert len(list((tmp_path / 'audio_cache' / 'blobs').glob('*/*.mp3'))) == 2
+    cache.close()
+
+
+def test_missing_blob(tmp_path, new_cache):
+    cache = new_cache()
+    cache.put('http://a.mp3', audio_file(tmp_path, 'a.mp3', b'aaa'))
+    for blob in (tmp_path / 'audio_cache' / 'blobs').glob('*/*.mp3'):
+        blob.unlink()
+
+    assert not cache.fetch('http://a.mp3', str(tmp_path / 'target.mp3'))
+    assert cache.count() == 0
+    cache.close()
+
+
+def test_download_single_audio(tmp_path, monkeypatch):
+    downloaded = []
+
+    def download_file(session, fileName, url):
+        downloaded.append(url)
+        with open(fileName, 'wb') as f:
+            f.write(b'mp3')
+
+    monkeypatch.setattr(workers, 'download_file', download_file)
+    audioCache.open_cache(str(tmp_path / 'audio_cache'))
+    try:
+        results = []
+        batcher = workers.SignalBatcher(None)
+        monkeypatch.setattr(batcher, 'add', results.append)
+        for deck in ['deck1', 'deck2']:
+            os.makedirs(tmp_path / deck)
+            assert workers.downloadSingleAudio(
+                str(tmp_path / deck / 'a.mp3'), 'http://a.mp3', requests.Session(), logging.getLogger(), batcher
+            )
+
+        assert downloaded == ['http://a.mp3']
+        assert (tmp_path / 'deck2' / 'a.mp3').read_bytes() == b'mp3'
+        assert [ok for _, _, ok in results] == [True, True]
+    finally:
+        audioCache.close_cache()
+
+
+def test_copies_outside_lock(tmp_path, new_cache, monkeypatch):
+    cache = new_cache()
+    copyfile = audioCache.shutil.copyfile
+    copies = []
+
+    def copy(src, dst):
+        copies.append((cache._lock.locked(), os.path.dirname(dst)))
+        return copyfile(src, dst)
+
+    monkeypatch.setattr(audioCache.shutil, 'copyfile', copy)
+    cache.put('http://a.mp3', audio_file(tmp_path, 'a.mp3', b'aaa'))
+    assert cache.fetch('http://a.mp3', str(tmp_path / 'target.mp3'))
+    # 临时文件在缓存目录下，不在媒体文件夹
+    tmpDir = str(tmp_path / 'audio_cache' / 'tmp')
+    assert copies == [(False, tmpDir), (False, tmpDir)]
+    assert os.listdir(tmpDir) == []
+    assert (tmp_path / 'target.mp3').read_bytes() == b'aaa'
+    cache.close()
+
+
+def test_clears_tmp_on_open(tmp_path, new_cache):
+    cache = new_cache()
+    cache.close()
+    (tmp_path / 'audio_cache' / 'tmp' / '1.tmp').write_bytes(b'a')
+
+    cache = new_cache()
+    assert os.listdir(tmp_path / 'audio_cache' / 'tmp') == []
+    cache.close()
+
+
+def test_fetch_copy_failed(tmp_path, new_cache, monkeypatch):
+    cache = new_cache()
+    cache.put('http://a.mp3', audio_file(tmp_path, 'a.mp3', b'aaa'))
+
+    def copy(src, dst):
+        with open(dst, 'wb') as f:
+            f.write(b'a')
+        raise PermissionError(dst)
+
+    monkeypatch.setattr(audioCache.shutil, 'copyfile', copy)
+    assert not cache.fetch('http://a.mp3', str(tmp_path / 'target.mp3'))
+    monkeypatch.undo()
+    # 目标目录不存在
+    assert not cache.fetch('http://a.mp3', str(tmp_path / 'missing' / 'target.mp3'))
+
+    assert cache.misses == 2
+    assert [p.name for p in tmp_path.iterdir() if p.is_file()] == ['a.mp3']
+    assert os.listdir(tmp_path / 'audio_cache' / 'tmp') == []
+    # 缓存的文件还在，索引保留
+    assert cache.fetch('http://a.mp3', str(tmp_path / 'target.mp3'))
+    cache.close()
+
+
+def test_fetch_to_other_device(tmp_path, new_cache, monkeypatch):
+    cache = new_cache()
+    cache.put('http://a.mp3', audio_file(tmp_path, 'a.mp3', b'aaa'))
+
+    tmpDir = str(tmp_path / 'audio_cache' / 'tmp')
+    osReplace = os.replace
+    replaces = []
+
+    def replace(src, dst):
+        replaces.append((os.path.dirname(src), os.path.dirname(dst)))
+        if os.path.dirname(src) == tmpDir:
+            raise OSError(errno.EXDEV, 'Invalid cross-device link')
+        return osReplace(src, dst)
+
+    monkeypatch.setattr(os, 'replace', replace)
+    assert cache.fetch('http://a.mp3', str(tmp_path / 'target.mp3'))
+    assert (tmp_path / 'target.mp3').read_bytes() == b'aaa'
+    # 经由媒体文件夹里的临时文件替换，不直接写入目标文件
+    assert replaces == [(tmpDir, str(tmp_path)), (str(tmp_path), str(tmp_path))]
+    assert os.listdir(tmpDir) == []
+    assert not (tmp_path / 'target.mp3.tmp').exists()
+    cache.close()
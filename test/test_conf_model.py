@@ -271,6 +271,35 @@ def test_user_agent_dirty():
     same_val_should_not_dirty(Conf.user_agent, helper.USER_AGENT)
 
 
+def test_incremental_sync():
+    conf = new_conf()
+    conf.incremental_sync = not conf.incremental_sync
+
+    assert conf.is_dirty() is True
+
+
+def test_incremental_sync_default():
+    config = helper.fresh_config_dict()
+    config.pop('incrementalSync', None)
+
+    assert Conf(config).incremental_sync is False
+
+
+def test_incremental_sync_dirty():
+    same_val_should_not_dirty(Conf.incremental_sync, False)
+
+
+def test_pull_and_query_default():
+    config = helper.fresh_config_dict()
+    config.pop('pullAndQuery', None)
+
+    assert Conf(config).pull_and_query is False
+
+
+def test_pull_and_query_dirty():
+    same_val_should_not_dirty(Conf.pull_and_query, True)
+
+
 def test_current_selected_groups():
     expected = ['hello', 'world', '!']
     conf = new_conf()
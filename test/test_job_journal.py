@@ -0,0 +1,130 @@
+import os
+
+import pytest
+
+from ..addon.jobJournal import JobJournal
+
+
+@pytest.fixture
+def new_journal(tmp_path):
+    """factory opening the journal at the same path, all closed after the test"""
+    journals: list[JobJournal] = []
+
+    def open_journal() -> JobJournal:
+        journals.append(JobJournal(str(tmp_path / 'journal' / 'job.jsonl')))
+        return journals[-1]
+
+    yield open_journal
+    for journal in journals:
+        journal.close()
+
+
+def test_no_job(new_journal):
+    journal = new_journal()
+    assert not journal.exists()
+    assert journal.load() is None
+    # nothing is written before a job starts
+    journal.add_items(['a'])
+    assert not journal.exists()
+
+
+def test_roundtrip(new_journal):
+    journal = new_journal()
+    journal.start('query', {'deck': 'd'})
+    journal.add_items(['a', 'b'])
+    journal.add_items(['c'])
+    journal.mark_done([('a', {'term': 'a'}), ('c', None)])
+    journal.set_extra(delete=['x'])
+    journal.set_extra(delete=['y'])
+    journal.close()
+
+    job = new_journal().load()
+    assert job.kind == 'query'
+    assert job.params == {'deck': 'd'}
+    assert job.items == ['a', 'b', 'c']
+    assert job.done == {'a': {'term': 'a'}, 'c': None}
+    assert job.pending() == ['b']
+    assert job.extra == {'delete': ['y']}
+
+
+def test_torn_last_line(tmp_path, new_journal):
+    journal = new_journal()
+    journal.start('repair', {})
+    journal.mark_done([(1, None)])
+    journal.close()
+    with open(tmp_path / 'journal' / 'job.jsonl', 'a', encoding='utf-8') as f:
+        f.write('{"done": [[2, nu')
+
+    job = journal.load()
+    assert job.done == {1: None}
+
+
+def test_resume_after_torn_last_line(tmp_path, new_journal):
+    journal = new_journal()
+    journal.start('repair', {})
+    journal.mark_done([(1, None)])
+    journal.close()
+    with open(tmp_path / 'journal' / 'job.jsonl', 'a', encoding='utf-8') as f:
+        f.write('{"done": [[2, nu')
+
+    journal = new_journal()
+    assert journal.resume().done == {1: None}
+    journal.mark_done([(3, None)])
+    journal.close()
+    assert journal.load().done == {1: None, 3: None}
+
+
+def test_sync_on_start_and_close_only(new_journal, monkeypatch):
+    synced = []
+    monkeypatch.setattr(os, 'fsync', synced.append)
+    journal = new_journal()
+    journal.start('query', {})
+    assert len(synced) == 1
+    journal.add_items(['a', 'b'])
+    journal.mark_done([('a', None)])
+    assert len(synced) == 1
+    # 每条记录都已 flush
+    assert new_journal().load().done == {'a': None}
+    journal.close()
+    assert len(synced) == 2
+
+
+def test_corrupted(tmp_path):
+    path = tmp_path / 'job.jsonl'
+    path.write_text('garbage\n{"items": ["a"]}\n', encoding='utf-8')
+    assert JobJournal(str(path)).load() is None
+
+
+def test_resume_appends(new_journal):
+    journal = new_journal()
+    journal.start('repair', {})
+    journal.mark_done([(1, None)])
+    journal.close()
+
+    journal = new_journal()
+    job = journal.resume()
+    assert job.done == {1: None}
+    journal.mark_done([(2, None)])
+    journal.close()
+    assert journal.load().done == {1: None, 2: None}
+
+
+def test_start_replaces_last_job(new_journal):
+    journal = new_journal()
+    journal.start('repair', {'deck': 'a'})
+    journal.mark_done([(1, None)])
+    journal.start('repair', {'deck': 'b'})
+    journal.close()
+
+    job = journal.load()
+    assert job.params == {'deck': 'b'}
+    assert job.done == {}
+
+
+def test_finish_removes(new_journal):
+    journal = new_journal()
+    journal.start('query', {})
+    journal.finish()
+    assert not journal.exists()
+    # finishing twice is fine
+    journal.finish()
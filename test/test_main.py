@@ -1,14 +1,18 @@
 import copy
+import os
 
 import aqt
 import aqt.utils
 import pytest
 import requests
-from PyQt6.QtCore import Qt
+from anki.collection import OpChanges
 
 from ..addon import constants as C
-from ..addon import dictionary
+from ..addon import dictionary, misc
 from ..addon.addonWindow import Windows, noteManager
+from ..addon.jobJournal import JobJournal
+from ..addon.noteManager import getNoteIds as original_getNoteIds
+from . import mock_helper
 from .mock_helper import w_mock
 
 
@@ -72,9 +76,10 @@ def test_get_deck_list(qtbot, monkeypatch, w_mock):
     (['a', 'b'], ['c', 'b'], 5),
 ])
 def test_fetch_word_and_compare(monkeypatch, w_mock, qtbot, local_words, remote_words, test_index):
-    monkeypatch.setattr(noteManager, "getWordsByDeck", lambda x: copy.deepcopy(local_words))
-    monkeypatch.setattr(dictionary.eudict.Eudict, "getTotalPage", lambda x, y: 1)
-    monkeypatch.setattr(dictionary.eudict.Eudict, "getWordsByPage", lambda x,y,z: copy.deepcopy(remote_words))
+    monkeypatch.setattr(noteManager, "getWordIndexByDeck", lambda x: {w: [i] for i, w in enumerate(local_words)})
+    monkeypatch.setattr(
+        dictionary.eudict.Eudict, "requestPage", lambda x, y, z: (len(remote_words), copy.deepcopy(remote_words[y:y + z]))
+    )
 
     w: Windows = w_mock()
     qtbot.addWidget(w)
@@ -90,30 +95,190 @@ def test_fetch_word_and_compare(monkeypatch, w_mock, qtbot, local_words, remote_
 
     qtbot.waitUntil(check_tooltip)
 
-    item_in_list_widget = [w.newWordListWidget.item(row) for row in range(w.newWordListWidget.count())]
-    item_in_del_widget = [w.needDeleteWordListWidget.item(row) for row in
-                        range(w.needDeleteWordListWidget.count())]
-    words_in_list_widget = [i.text() for i in item_in_list_widget]  # type: ignore
-    words_in_del_widget = [i.text() for i in item_in_del_widget]  # type: ignore
+    words_in_list_widget = w.newWordModel.words()
+    words_in_del_widget = w.needDeleteWordsView.words()
 
-    assert all([item.data(Qt.ItemDataRole.UserRole) is None for item in item_in_list_widget])  # type: ignore
+    assert all([result is None for result in w.newWordModel.results()])
     if test_index == 0:
-        assert item_in_list_widget == []
-        assert item_in_del_widget == []
+        assert words_in_list_widget == []
+        assert words_in_del_widget == []
         assert aqt.utils.tooltip.called_with == (('无需同步',), {})
     elif test_index == 1:
         assert sorted(words_in_list_widget) == sorted(remote_words)
-        assert item_in_del_widget == []
+        assert words_in_del_widget == []
     elif test_index == 2:
-        assert item_in_list_widget == []
-        assert item_in_del_widget == []
+        assert words_in_list_widget == []
+        assert words_in_del_widget == []
         assert aqt.utils.tooltip.called_with == (('无需同步',), {})
     elif test_index == 3:
         assert words_in_list_widget == ['b']
-        assert item_in_del_widget == []
+        assert words_in_del_widget == []
     elif test_index == 4:
         assert sorted(words_in_list_widget) == sorted(remote_words)
         assert sorted(words_in_del_widget) == sorted(local_words)
     elif test_index == 5:
         assert words_in_list_widget == ['c']
         assert words_in_del_widget == ['a']
+
+
+def test_pull_and_query(monkeypatch, w_mock, qtbot):
+    local_words, remote_words = ['a', 'b'], ['c', 'b', 'd']
+    monkeypatch.setattr(noteManager, "getWordIndexByDeck", lambda x: {w: [i] for i, w in enumerate(local_words)})
+    monkeypatch.setattr(
+        dictionary.eudict.Eudict, "requestPage", lambda x, y, z: (len(remote_words), copy.deepcopy(remote_words[y:y + z]))
+    )
+
+    w: Windows = w_mock()
+    qtbot.addWidget(w)
+
+    w.conf.selected_dict = dictionary.dictionaries.index(dictionary.eudict.Eudict)
+    w.conf.selected_api = 0
+    w.conf.pull_and_query = True
+    monkeypatch.setattr(w.conf, "current_selected_groups", ["group_1"])
+    w.get_current_dict().groups = [(w.conf.current_selected_groups[0], "1")]
+    w.getRemoteWordList(w.conf.current_selected_groups)
+
+    def check_tooltip():
+        assert aqt.utils.tooltip.called
+
+    qtbot.waitUntil(check_tooltip)
+
+    assert w.newWordModel.words() == ['c', 'd']
+    assert all(w.newWordModel.results())
+    assert w.needDeleteWordsView.words() == ['a']
+    assert w.pipeline is None
+    assert w.syncBtn.isEnabled()
+    # an unsynced run is left for resuming
+    job = w.queryJournal.load()
+    assert job.items == ['c', 'd']
+    assert sorted(job.done) == ['c', 'd']
+    assert job.extra == {'delete': ['a']}
+
+
+def test_pull_and_query_nothing_new(monkeypatch, w_mock, qtbot):
+    words = ['a', 'b']
+    monkeypatch.setattr(noteManager, "getWordIndexByDeck", lambda x: {w: [i] for i, w in enumerate(words)})
+    monkeypatch.setattr(
+        dictionary.eudict.Eudict, "requestPage", lambda x, y, z: (len(words), copy.deepcopy(words[y:y + z]))
+    )
+
+    w: Windows = w_mock()
+    qtbot.addWidget(w)
+
+    w.conf.selected_dict = dictionary.dictionaries.index(dictionary.eudict.Eudict)
+    w.conf.selected_api = 0
+    w.conf.pull_and_query = True
+    monkeypatch.setattr(w.conf, "current_selected_groups", ["group_1"])
+    w.get_current_dict().groups = [(w.conf.current_selected_groups[0], "1")]
+    w.getRemoteWordList(w.conf.current_selected_groups)
+
+    def check_tooltip():
+        assert aqt.utils.tooltip.called
+
+    qtbot.waitUntil(check_tooltip)
+
+    assert w.pipeline is None
+    assert w.newWordModel.empty() and w.needDeleteWordsView.empty()
+    # 无需同步，不留下可恢复的记录
+    assert not w.queryJournal.exists()
+    assert w.queryJournal.load() is None
+
+
+def test_resume_query(monkeypatch, w_mock, qtbot):
+    journal = JobJournal(os.path.join(misc.user_files_dir(), 'query_journal.jsonl'))
+    journal.start('query', {'dict': 'Eudict', 'api': 'youdao', 'deck': ''})
+    journal.add_items(['a', 'b', 'c'])
+    journal.mark_done([('a', dict(mock_helper.query_data_mock, term='a'))])
+    journal.set_extra(delete=['x'])
+    journal.close()
+
+    w: Windows = w_mock()
+    qtbot.addWidget(w)
+    monkeypatch.setattr(w.conf, 'no_pron', True)
+    assert not w.resumeQueryBtn.isHidden()
+    w.resumeQueryBtn.click()
+
+    assert w.resumeQueryBtn.isHidden()
+    assert w.newWordModel.words() == ['a', 'b', 'c']
+    assert w.newWordModel.result(0)['term'] == 'a'
+    assert w.newWordModel.result(1) is None
+    assert w.needDeleteWordsView.words() == ['x']
+    assert w.queryBtn.isEnabled()
+    assert w.syncBtn.isEnabled()
+
+    # 未选中单词时只查询未查询成功的
+    queried = []
+    monkeypatch.setattr(w, 'startQuery', lambda row_words: queried.append(list(row_words)))
+    w.queryBtn.click()
+    assert queried == [[(1, 'b'), (2, 'c')]]
+    # 都已成功则全部重新查询
+    w.newWordModel.set_results((row, dict(mock_helper.query_data_mock, term=word)) for row, word in [(1, 'b'), (2, 'c')])
+    w.queryBtn.setEnabled(True)
+    w.queryBtn.click()
+    assert queried[-1] == [(0, 'a'), (1, 'b'), (2, 'c')]
+
+
+def test_resume_query_deck_missing(monkeypatch, w_mock, qtbot):
+    journal = JobJournal(os.path.join(misc.user_files_dir(), 'query_journal.jsonl'))
+    journal.start('query', {'dict': 'Eudict', 'api': 'youdao', 'deck': 'deleted'})
+    journal.add_items(['a', 'b'])
+    journal.close()
+
+    w: Windows = w_mock()
+    qtbot.addWidget(w)
+    w.resumeQueryBtn.click()
+
+    assert aqt.utils.showCritical.called
+    assert w.newWordModel.empty()
+    assert w.deckComboBox.currentText() != 'deleted'
+    # 记录保留，牌组恢复后仍可继续
+    assert not w.resumeQueryBtn.isHidden()
+    assert w.queryJournal.load().items == ['a', 'b']
+
+
+def test_sync_add_notes_in_batch(monkeypatch, w_mock, qtbot):
+    added = []
+    monkeypatch.setattr(
+        noteManager, 'addNotesToDeck',
+        lambda deck, model, conf, results: added.append([r['term'] for r in results]) or OpChanges()
+    )
+
+    w: Windows = w_mock()
+    qtbot.addWidget(w)
+
+    w.newWordModel.set_words(['a', 'b', 'c'])
+    w.newWordModel.set_result(0, dict(mock_helper.query_data_mock, term='a'))
+    w.newWordModel.set_result(2, dict(mock_helper.query_data_mock, term='c'))
+
+    w.syncBtn.setEnabled(True)
+    w.syncBtn.click()
+
+    def check_tooltip():
+        assert aqt.utils.tooltip.called
+
+    qtbot.waitUntil(check_tooltip)
+    assert added == [['a', 'c']]
+    assert w.newWordModel.empty()
+    assert aqt.utils.tooltip.called_with == (('添加2个笔记\n删除0个笔记',), {})
+
+
+def test_sync_delete_notes_by_index(monkeypatch, w_mock, qtbot):
+    removed = []
+    monkeypatch.setattr(noteManager, 'getNoteIds', original_getNoteIds)
+    monkeypatch.setattr(noteManager, 'removeNotes', removed.extend)
+
+    w: Windows = w_mock()
+    qtbot.addWidget(w)
+    w.localWordIndex = {'a': [1], 'b': [2, 3], 'c': [4]}
+    w.needDeleteWordsView.add_words(['a', 'b'])
+
+    w.syncBtn.setEnabled(True)
+    w.syncBtn.click()
+
+    def check_tooltip():
+        assert aqt.utils.tooltip.called
+
+    qtbot.waitUntil(check_tooltip)
+    assert sorted(removed) == [1, 2, 3]
+    assert w.localWordIndex == {'c': [4]}
+    assert w.needDeleteWordsView.empty()
@@ -4,46 +4,56 @@ import pytest
 
 
 @pytest.mark.parametrize("texts", [[], ["a", "b", "c"]])
-def test_add_remove_items(qtbot, w_mock, texts):
+def test_add_remove_words(qtbot, w_mock, texts):
     w: addonWindow.Windows = w_mock()
     qtbot.addWidget(w)
 
-    w.needDeleteWordsView.add_items(texts)
-    items = w.needDeleteWordsView.items()
-    assert len(items) == len(texts)
+    w.needDeleteWordsView.add_words(texts)
+    words = w.needDeleteWordsView.words()
+    assert len(words) == len(texts)
 
-    w.needDeleteWordsView.remove_items(items)
+    w.needDeleteWordsView.remove_rows(range(len(words)))
     assert w.needDeleteWordsView.empty()
 
 
+def test_remove_some_rows(qtbot, w_mock):
+    w: addonWindow.Windows = w_mock()
+    qtbot.addWidget(w)
+
+    w.needDeleteWordsView.set_words(["a", "b", "c", "d"])
+    w.needDeleteWordsView.remove_rows([3, 0])
+    assert w.needDeleteWordsView.words() == ["b", "c"]
+
+
 def test_check_uncheck(qtbot, w_mock):
     texts = ["a", "b", "c"]
     w: addonWindow.Windows = w_mock()
     qtbot.addWidget(w)
-    w.needDeleteWordsView.add_items(texts)
+    w.needDeleteWordsView.add_words(texts)
     w.needDeleteWordsView.check_if_not_empty()
 
     w.needDeleteCheckBox.setChecked(False)
-    assert w.needDeleteWordsView.checked_items() == []
+    assert w.needDeleteWordsView.checked_rows() == []
 
     w.needDeleteCheckBox.setChecked(True)
-    assert len(w.needDeleteWordsView.checked_items()) == len(texts)
+    assert len(w.needDeleteWordsView.checked_rows()) == len(texts)
 
 
 @pytest.mark.parametrize("texts", [[], ["a", "b", "c"]])
-def test_item_texts(qtbot, w_mock, texts):
+def test_words(qtbot, w_mock, texts):
     w: addonWindow.Windows = w_mock()
     qtbot.addWidget(w)
-    w.needDeleteWordsView.add_items(texts)
+    w.needDeleteWordsView.add_words(texts)
 
-    assert w.needDeleteWordsView.item_texts(w.needDeleteWordsView.items()) == texts
+    assert w.needDeleteWordsView.words() == texts
+    assert w.needDeleteWordsView.words(w.needDeleteWordsView.checked_rows()) == texts
 
 
-def text_clear(qtbot, w_mock, texts):
+def test_clear(qtbot, w_mock):
     texts = ["a", "b", "c"]
     w: addonWindow.Windows = w_mock()
     qtbot.addWidget(w)
-    w.needDeleteWordsView.add_items(texts)
+    w.needDeleteWordsView.add_words(texts)
 
     assert not w.needDeleteWordsView.empty()
 
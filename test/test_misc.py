@@ -1,3 +1,9 @@
+import threading
+import time
+
+import pytest
+
+from ..addon import misc
 from ..addon.misc import dec_cookies, enc_cookies
 
 
@@ -25,3 +31,150 @@ def test_enc_desc_cookies_empty():
 
     s_dec = dec_cookies('')
     assert s_dec == ''
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, secs):
+        self.now += secs
+
+
+@pytest.fixture
+def fake_clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(time, 'sleep', clock.sleep)
+    return clock
+
+
+def test_token_bucket_rate(fake_clock):
+    bucket = misc.TokenBucket(rate=2, burst=1)
+    start = fake_clock.now
+    for _ in range(5):
+        bucket.acquire()
+
+    # first one is immediate, then one every 0.5 seconds
+    assert fake_clock.now - start == pytest.approx(2.0)
+    assert bucket.acquired == 5
+    assert bucket.waited == 4
+    assert bucket.blocked_seconds == pytest.approx(2.0)
+
+
+def test_token_bucket_burst(fake_clock):
+    bucket = misc.TokenBucket(rate=1, burst=3)
+    start = fake_clock.now
+    for _ in range(3):
+        assert bucket.acquire() == 0
+    assert fake_clock.now == start
+
+    bucket.acquire()
+    assert fake_clock.now - start == pytest.approx(1.0)
+
+
+def test_token_bucket_unlimited(fake_clock):
+    bucket = misc.TokenBucket(rate=0)
+    for _ in range(10):
+        assert bucket.acquire() == 0
+
+
+def test_rate_limiter_shared_by_host():
+    a = misc.rate_limiter('https://dict.youdao.com/jsonapi', 120)
+    b = misc.rate_limiter('http://dict.youdao.com/dictvoice?audio=test', 60)
+    c = misc.rate_limiter('https://dict.eudic.net/dicts/en/{}', 60)
+
+    assert a is b
+    assert a is not c
+
+
+def test_executor_map_ordered():
+    executor = misc.Executor(max_workers=4)
+
+    def f(i):
+        time.sleep((10 - i) * 0.001)
+        return i * 2
+
+    assert executor.map(f, range(10), limit=3) == [i * 2 for i in range(10)]
+    executor.shutdown()
+
+
+def test_executor_map_propagate_exception():
+    executor = misc.Executor(max_workers=2)
+
+    def f(i):
+        if i == 3:
+            raise ValueError(i)
+        return i
+
+    with pytest.raises(ValueError):
+        executor.map(f, range(10))
+    executor.shutdown()
+
+
+def test_executor_map_stop_submitting_on_exception():
+    executor = misc.Executor(max_workers=2)
+    called = []
+
+    def f(i):
+        called.append(i)
+        if i == 3:
+            raise ValueError(i)
+        return i
+
+    with pytest.raises(ValueError):
+        executor.map(f, range(100), limit=1)
+    assert called == [0, 1, 2, 3]
+    executor.shutdown()
+
+
+def test_executor_map_stop():
+    executor = misc.Executor(max_workers=2)
+    called = []
+
+    with pytest.raises(misc.CancelledError):
+        executor.map(called.append, range(10), limit=1, stop=lambda: len(called) >= 3)
+    assert len(called) < 10
+    executor.shutdown()
+
+
+def test_executor_map_shared_limit():
+    executor = misc.Executor(max_workers=8)
+    slots = executor.slots(2)
+    lock = threading.Lock()
+    running, peak = 0, 0
+
+    def f(i):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.005)
+        with lock:
+            running -= 1
+        return i
+
+    callers = [threading.Thread(target=executor.map, args=(f, range(10)), kwargs={'limit': slots}) for _ in range(3)]
+    for t in callers:
+        t.start()
+    for t in callers:
+        t.join()
+    assert peak <= 2
+    executor.shutdown()
+
+
+def test_executor_cancel_all():
+    executor = misc.Executor(max_workers=1)
+    event = threading.Event()
+    running = executor.submit(event.wait)
+    pending = [executor.submit(lambda: None) for _ in range(5)]
+
+    assert executor.cancel_all() == 5
+    assert all(f.cancelled() for f in pending)
+
+    event.set()
+    running.result()
+    executor.shutdown()
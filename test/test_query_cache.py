@@ -0,0 +1,182 @@
+import json
+import sqlite3
+import time
+
+import pytest
+
+from ..addon import constants as C
+from ..addon import noteManager, queryCache
+from ..addon._typing import AbstractQueryAPI
+from ..addon.conf_model import Conf
+from . import helper, mock_helper
+
+
+@pytest.fixture
+def new_cache(tmp_path):
+    """factory opening the cache at the same path, all closed after the test"""
+    caches: list[queryCache.QueryCache] = []
+
+    def open_cache(**kwargs) -> queryCache.QueryCache:
+        caches.append(queryCache.QueryCache(str(tmp_path / 'cache.db'), **kwargs))
+        return caches[-1]
+
+    yield open_cache
+    for cache in caches:
+        cache.close()
+
+
+def test_put_get(new_cache):
+    cache = new_cache()
+    assert cache.get('api', 'test') is None
+
+    cache.put('api', 'test', mock_helper.query_data_mock)
+    assert cache.get('api', ' Test ')['definition'] == mock_helper.query_data_mock['definition']
+    assert cache.get('other api', 'test') is None
+    assert cache.hits == 1
+    assert cache.misses == 2
+    cache.close()
+
+
+def test_persistent(new_cache):
+    cache = new_cache()
+    cache.put('api', 'test', mock_helper.query_data_mock)
+    cache.close()
+    assert cache.get('api', 'test') is None
+
+    cache = new_cache()
+    assert cache.get('api', 'test') is not None
+    cache.close()
+
+
+def test_ttl(new_cache, monkeypatch):
+    cache = new_cache(ttl=10)
+    cache.put('api', 'test', mock_helper.query_data_mock)
+
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 11)
+    assert cache.get('api', 'test') is None
+    cache.close()
+
+
+def test_lru_eviction(new_cache, monkeypatch):
+    monkeypatch.setattr(queryCache, '_EVICT_EVERY', 1)
+    cache = new_cache(max_entries=2)
+
+    now = time.time()
+    for i, term in enumerate(['a', 'b']):
+        monkeypatch.setattr(time, 'time', lambda i=i: now + i)
+        cache.put('api', term, mock_helper.query_data_mock)
+    # touch 'a', so 'b' is the least recently used
+    monkeypatch.setattr(time, 'time', lambda: now + 2)
+    cache.get('api', 'a')
+    monkeypatch.setattr(time, 'time', lambda: now + 3)
+    cache.put('api', 'c', mock_helper.query_data_mock)
+
+    assert cache.count() == 2
+    assert cache.get('api', 'b') is None
+    assert cache.get('api', 'a') is not None
+    cache.close()
+
+
+def test_cached_decorator(tmp_path):
+    class API(AbstractQueryAPI):
+        name = 'dummy'
+        called = 0
+
+        @classmethod
+        @queryCache.cached
+        def query(cls, word, fields=None):
+            cls.called += 1
+            return dict(mock_helper.query_data_mock, term=word) if word != 'fail' else None
+
+    # not opened, pass through
+    API.query('test')
+    assert API.called == 1
+
+    queryCache.open_cache(str(tmp_path / 'cache.db'))
+    try:
+        API.query('test')
+        assert API.query('Test')['term'] == 'Test'
+        assert API.called == 2
+
+        API.query('fail')
+        API.query('fail')
+        assert API.called == 4
+
+        # a cached partial result serves its own fields, not more
+        API.query('partial', frozenset([C.F_DEFINITION]))
+        API.query('partial', frozenset([C.F_DEFINITION]))
+        assert API.called == 5
+        API.query('partial')
+        API.query('partial', frozenset([C.F_PHRASE]))
+        assert API.called == 6
+    finally:
+        queryCache.close_cache()
+
+
+def test_merge_partial(new_cache):
+    cache = new_cache()
+    definition = dict(mock_helper.query_data_mock, phrase=[])
+    cache.put('api', 'test', definition, frozenset([C.F_DEFINITION]))
+    assert cache.get('api', 'test', frozenset([C.F_DEFINITION, C.F_PHRASE])) is None
+
+    phrase = dict(mock_helper.query_data_mock, definition=[])
+    cache.put('api', 'test', phrase, frozenset([C.F_PHRASE]))
+    hit = cache.get('api', 'test', frozenset([C.F_DEFINITION, C.F_PHRASE]))
+    assert hit[C.F_DEFINITION] == mock_helper.query_data_mock[C.F_DEFINITION]
+    assert hit[C.F_PHRASE] == mock_helper.query_data_mock[C.F_PHRASE]
+    assert cache.get('api', 'test') is None
+    cache.close()
+
+
+def test_merge_keeps_older_expiry(new_cache, monkeypatch):
+    cache = new_cache(ttl=10)
+    now = time.time()
+    cache.put('api', 'test', mock_helper.query_data_mock, frozenset([C.F_DEFINITION]))
+    monkeypatch.setattr(time, 'time', lambda: now + 5)
+    cache.put('api', 'test', mock_helper.query_data_mock, frozenset([C.F_PHRASE]))
+
+    monkeypatch.setattr(time, 'time', lambda: now + 11)
+    assert cache.get('api', 'test', frozenset([C.F_PHRASE])) is None
+    cache.close()
+
+
+def test_old_schema(tmp_path, new_cache):
+    """entries of the old schema are full results"""
+    conn = sqlite3.connect(str(tmp_path / 'cache.db'))
+    conn.execute(
+        'CREATE TABLE query_cache (api TEXT NOT NULL, term TEXT NOT NULL, data TEXT NOT NULL, '
+        'created REAL NOT NULL, accessed REAL NOT NULL, PRIMARY KEY (api, term))'
+    )
+    conn.execute(
+        'INSERT INTO query_cache VALUES (?, ?, ?, ?, ?)',
+        ('api', 'test', json.dumps(mock_helper.query_data_mock), time.time(), time.time()),
+    )
+    conn.commit()
+    conn.close()
+
+    cache = new_cache()
+    assert cache.get('api', 'test') is not None
+    cache.close()
+
+
+def test_cached_with_query_fields_of_conf(tmp_path):
+    class API(AbstractQueryAPI):
+        name = 'dummy'
+        called = 0
+
+        @classmethod
+        @queryCache.cached
+        def query(cls, word, fields=None):
+            cls.called += 1
+            return dict(mock_helper.query_data_mock, term=word)
+
+    fields = noteManager.queryFields(Conf(helper.fresh_config_dict()))
+    queryCache.open_cache(str(tmp_path / 'cache.db'))
+    try:
+        API.query('test', fields)
+        assert API.query('test', fields)['term'] == 'test'
+        assert API.called == 1
+        assert queryCache.get_cache().hits == 1
+    finally:
+        queryCache.close_cache()
@@ -1,6 +1,7 @@
 import os
 import logging
-from ..addon.queryApi.eudict import API
+from ..addon.queryApi import youdao
+from ..addon.queryApi.eudict import API, Parser
 from ..addon import constants as C
 import pytest
 logger = logging.getLogger(__name__)
@@ -89,3 +90,66 @@ def test_eudict_divisional():
 def test_eudict_image_url_without_https():
     res = api.query('gelatin')
     assert res['image'].startswith('https://') # type: ignore
+
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'eudict')
+
+
+REPLAY_FIXTURES = sorted(name[:-len('.html')] for name in os.listdir(FIXTURE_DIR))
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, f'{name}.html'), encoding='utf-8') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('term, expect_missing', [
+    ('flower', set()),
+    ('divisional', {C.F_IMAGE, C.F_PHRASE}),
+    ('implication', {C.F_IMAGE, C.F_SENTENCE, C.F_BREPHONETIC, C.F_AMEPHONETIC}),
+    ('azeroth', {C.F_IMAGE, C.F_DEFINITION, C.F_PHRASE, C.F_SENTENCE, C.F_BREPHONETIC, C.F_AMEPHONETIC}),
+    ('asafesdf', set(keys) - {C.F_TERM}),
+])
+def test_eudict_parser_fixture(term, expect_missing):
+    html = load_fixture(term)
+    res = Parser(html, term).result
+    assert get_missing_fileds_set(res) == expect_missing
+    # 只解析需要的部分，结果和完整解析一致
+    assert res == Parser(html, term, parse_only=False).result
+
+
+def test_eudict_parser_fields():
+    res = Parser(load_fixture('flower'), 'flower').result
+    assert res[C.F_DEFINITION] == ['n. 花；花卉；精华', 'v. 开花；成熟；繁荣']
+    assert res[C.F_SENTENCE][0] == ('She picked a flower from the garden.', '她从花园里摘了一朵花。')
+    assert res[C.F_SENTENCE][2] == ('In the flower of youth.', '')
+    assert res[C.F_PHRASE] == [('in flower', '正开着花'), ('flower bed', '花坛')]
+    assert res[C.F_IMAGE] == 'https://static.frdic.com/image/flower.jpg'
+    assert res[C.F_BREPHONETIC] == '/ˈflaʊə(r)/'
+    assert res[C.F_AMEPHONETIC] == '/ˈflaʊər/'
+    assert 'en_uk_male' in res[C.F_BREPRON] and 'en_us_female' in res[C.F_AMEPRON]
+
+    res = Parser(load_fixture('implication'), 'implication').result
+    assert res[C.F_DEFINITION] == ['含义；暗示；牵连']
+
+
+def test_eudict_parser_selected_fields():
+    html = load_fixture('flower')
+    fields = {C.F_DEFINITION, C.F_AMEPRON}
+    res = Parser(html, 'flower', fields=fields).result
+    full = Parser(html, 'flower').result
+    for key in keys:
+        if key == C.F_TERM or key in fields:
+            assert res[key] == full[key]
+        else:
+            assert not res[key]
+
+
+def test_youdao_params_of_fields():
+    def dicts(fields):
+        return youdao.API.make_params('test', fields)['dicts']['dicts']
+
+    assert dicts(None) == youdao.API.params['dicts']['dicts']
+    assert dicts({C.F_AMEPRON}) == [['ec']]
+    assert dicts({C.F_PHRASE, C.F_SENTENCE}) == [['ec', 'phrs'], ['blng_sents_part']]
+    assert dicts(C.QUERY_FIELDS) == youdao.API.params['dicts']['dicts']
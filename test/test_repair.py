@@ -2,13 +2,19 @@ import os
 
 import aqt.utils
 import pytest
+from anki.collection import OpChanges
+from aqt import QWidget
 
+from ..addon import constants as C
 from ..addon import noteManager, queryApi, repair, workers
 from ..addon.addonWindow import Windows
+from ..addon.noteManager import writeNoteFields as original_writeNoteFields
 from . import mock_helper
 from .dummy_aqt import notes
 from .mock_helper import w_mock
 
+original_audio_worker_init = workers.AudioDownloadWorker.__init__
+
 
 def test_model_init_zero():
     g = repair.CntGrp()
@@ -211,3 +217,312 @@ def test_query(monkeypatch, w_mock, qtbot, num, query_fail_num, audio_download_f
 
     assert model.audioGrp.success_cnt == num - query_fail_num - audio_download_fail
     assert model.audioGrp.fail_cnt == audio_download_fail
+
+
+def test_query_fields_of_repair(monkeypatch, w_mock):
+    w: Windows = w_mock()
+    r = w.repair
+
+    monkeypatch.setattr(w.conf, 'definition', True)
+    monkeypatch.setattr(w.conf, 'sentence', False)
+    monkeypatch.setattr(w.conf, 'ame_pron', True)
+    monkeypatch.setattr(w.conf, 'bre_pron', False)
+
+    w.repairDefCB.setChecked(True)
+    w.repairSentenceCB.setChecked(True)
+    w.repairPronCB.setChecked(True)
+
+    # 例句未开启只会被清空，不需要查询
+    assert noteManager.queryFields(w.conf, r._get_write_fns()) == {C.F_DEFINITION, C.F_AMEPRON}
+
+
+def test_model_add_cnt_notify_once():
+    g = repair.CntGrp()
+    events = []
+    g.listen('incSuccessCnt', lambda grp: events.append(grp.success_cnt))
+    g.listen('incFailCnt', lambda grp: events.append(-grp.fail_cnt))
+
+    g.addSuccessCnt(5)
+    g.addFailCnt(3)
+    g.addSuccessCnt(0)
+    assert events == [5, -3]
+
+
+def test_note_buffer_batches(monkeypatch, qtbot):
+    mock_helper.mock_aqt_mw(monkeypatch)
+    batches = []
+    monkeypatch.setattr(noteManager, 'updateNotes', lambda notes: batches.append(len(notes)) or OpChanges())
+    monkeypatch.setattr(repair.NoteBuffer, 'batch_size', 3)
+    monkeypatch.setattr(repair.NoteBuffer, 'interval', 3600)
+    parent = QWidget()
+    qtbot.addWidget(parent)
+    written = []
+    finished = []
+    buffer = repair.NoteBuffer(parent, lambda notes: written.append(len(notes)))
+
+    buffer.add([notes.Note(i) for i in range(2)])
+    assert batches == []
+    # batches filled while writing are written right after
+    buffer.add([notes.Note(i) for i in range(5)])
+    assert batches == [3, 3]
+    buffer.finish(lambda: finished.append(True))
+
+    assert batches == [3, 3, 1]
+    assert written == batches
+    assert finished == [True]
+
+
+def test_note_buffer_close(monkeypatch, qtbot):
+    mock_helper.mock_aqt_mw(monkeypatch)
+    batches = []
+    monkeypatch.setattr(noteManager, 'updateNotes', lambda notes: batches.append(len(notes)) or OpChanges())
+    parent = QWidget()
+    qtbot.addWidget(parent)
+    buffer = repair.NoteBuffer(parent, lambda n: None)
+
+    buffer.add([notes.Note(1), notes.Note(2)])
+    buffer.close()
+    assert batches == [2]
+
+
+def test_note_buffer_interval_without_add(monkeypatch, qtbot):
+    """pending notes are written once the interval passed even if no more notes are added"""
+    mock_helper.mock_aqt_mw(monkeypatch)
+    batches = []
+    monkeypatch.setattr(noteManager, 'updateNotes', lambda notes: batches.append(len(notes)) or OpChanges())
+    monkeypatch.setattr(repair.NoteBuffer, 'interval', 0.05)
+    parent = QWidget()
+    qtbot.addWidget(parent)
+    written = []
+    buffer = repair.NoteBuffer(parent, lambda notes: written.append(len(notes)))
+
+    buffer.add([notes.Note(1), notes.Note(2)])
+    assert batches == []
+    qtbot.waitUntil(lambda: written == [2], timeout=1000)
+    buffer.add([notes.Note(3)])
+    qtbot.waitUntil(lambda: written == [2, 1], timeout=1000)
+
+
+def test_note_buffer_failed(monkeypatch, qtbot):
+    mock_helper.mock_aqt_mw(monkeypatch)
+    monkeypatch.setattr(repair.NoteBuffer, 'batch_size', 2)
+
+    def updateNotes(notes):
+        if notes[0].id == 0:
+            raise RuntimeError('locked')
+        return OpChanges()
+
+    monkeypatch.setattr(noteManager, 'updateNotes', updateNotes)
+    parent = QWidget()
+    qtbot.addWidget(parent)
+    written, failed, finished = [], [], []
+    buffer = repair.NoteBuffer(
+        parent, lambda notes: written.extend(n.id for n in notes), lambda notes: failed.extend(n.id for n in notes)
+    )
+
+    buffer.add([notes.Note(i) for i in range(3)])
+    buffer.finish(lambda: finished.append(True))
+    qtbot.waitUntil(lambda: finished == [True], timeout=1000)
+    assert failed == [0, 1]
+    assert written == [2]
+
+
+def test_note_buffer_close_while_writing(monkeypatch, qtbot):
+    """the batch written in background finishes after the window closed"""
+    mock_helper.mock_aqt_mw(monkeypatch)
+    monkeypatch.setattr(repair.NoteBuffer, 'batch_size', 2)
+    ops = []
+
+    class PendingOp:
+        """CollectionOp not run until the test finishes it"""
+
+        def __init__(self, parent, op):
+            self.op = op
+            ops.append(self)
+
+        def success(self, fn):
+            self.on_success = fn
+            return self
+
+        def failure(self, fn):
+            self.on_failure = fn
+            return self
+
+        def run_in_background(self):
+            pass
+
+    monkeypatch.setattr(repair, 'CollectionOp', PendingOp)
+    batches = []
+    monkeypatch.setattr(noteManager, 'updateNotes', lambda notes: batches.append(len(notes)) or OpChanges())
+    parent = QWidget()
+    qtbot.addWidget(parent)
+    written = []
+    buffer = repair.NoteBuffer(parent, lambda notes: written.append(len(notes)))
+
+    buffer.add([notes.Note(i) for i in range(3)])
+    assert len(ops) == 1
+    buffer.close()
+    assert batches == [1]
+    assert written == [1]
+
+    ops[0].on_success(ops[0].op(None))
+    buffer.add([notes.Note(i) for i in range(2)])
+    assert batches == [1, 2]
+    assert written == [1]
+    assert len(ops) == 1
+
+
+class FieldsNote(notes.Note):
+    """note with real fields, as `anki.notes.Note`"""
+
+    def __init__(self, nid, **fields):
+        super().__init__(nid)
+        self._names = list(C.MODEL_FIELDS)
+        self.fields = [fields.get(name, '') for name in self._names]
+
+    def __getitem__(self, item):
+        return self.fields[self._names.index(item)]
+
+    def __setitem__(self, key, value):
+        self.fields[self._names.index(key)] = value
+
+
+def test_write_note_fields_changed(monkeypatch, w_mock):
+    w: Windows = w_mock()
+    monkeypatch.setattr(w.conf, 'definition', True)
+    monkeypatch.setattr(noteManager, 'writeNoteFields', original_writeNoteFields)
+    definition = '<br>'.join(mock_helper.query_data_mock[C.F_DEFINITION])
+    fns = [noteManager.writeNoteDefinition]
+
+    assert noteManager.writeNoteFields(FieldsNote(1), mock_helper.query_data_mock, w.conf, fns)
+    note = FieldsNote(2, **{C.F_DEFINITION: definition})
+    assert not noteManager.writeNoteFields(note, mock_helper.query_data_mock, w.conf, fns)
+
+
+def test_skip_unchanged(monkeypatch, w_mock, qtbot):
+    num = 10
+    monkeypatch.setattr(noteManager, 'getNotesByDeckName', lambda *args, **kwargs: [notes.Note(i) for i in range(num)])
+    # odd notes are already up to date
+    monkeypatch.setattr(noteManager, 'writeNoteFields', lambda note, *args: note.nid % 2 == 0)
+    written = []
+    monkeypatch.setattr(noteManager, 'updateNotes', lambda notes: written.extend(n.nid for n in notes) or OpChanges())
+
+    w: Windows = w_mock()
+    r = w.repair
+    model = r._model
+    qtbot.addWidget(w)
+    monkeypatch.setattr(r, '_checkLoginState', lambda *args, **kwargs: True)
+    w.repairDefCB.setChecked(True)
+    w.repairBtn.click()
+
+    def check_tooltip():
+        assert aqt.utils.tooltip.called
+
+    qtbot.waitUntil(check_tooltip)
+    assert sorted(written) == [0, 2, 4, 6, 8]
+    assert model.noteGrp.success_cnt == 5
+    assert model.noteGrp.skip_cnt == 5
+    assert w.repairProgressNoteLabel.text() == '更新本地笔记：10 / 10，无变化：5 . . . '
+
+
+def test_repair_incomplete_only(monkeypatch, w_mock, qtbot):
+    definition = '<br>'.join(mock_helper.query_data_mock[C.F_DEFINITION])
+    # every third note misses its definition
+    deck = [FieldsNote(i, **{C.F_TERM: f'w{i}', C.F_DEFINITION: '' if i % 3 == 0 else definition}) for i in range(9)]
+    monkeypatch.setattr(noteManager, 'getNotesByDeckName', lambda *args, **kwargs: deck)
+    monkeypatch.setattr(noteManager, 'writeNoteFields', original_writeNoteFields)
+    queried = []
+    monkeypatch.setattr(
+        queryApi.youdao.API, 'query', lambda word, *args, **kwargs: queried.append(word) or mock_helper.query_data_mock
+    )
+    written = []
+    monkeypatch.setattr(noteManager, 'updateNotes', lambda notes: written.extend(n.nid for n in notes) or OpChanges())
+
+    w: Windows = w_mock()
+    r = w.repair
+    model = r._model
+    qtbot.addWidget(w)
+    monkeypatch.setattr(r, '_checkLoginState', lambda *args, **kwargs: True)
+    monkeypatch.setattr(w.conf, 'definition', True)
+    w.repairDefCB.setChecked(True)
+    w.repairIncompleteCB.setChecked(True)
+    w.repairBtn.click()
+
+    def check_tooltip():
+        assert aqt.utils.tooltip.called
+
+    qtbot.waitUntil(check_tooltip)
+    assert sorted(queried) == ['w0', 'w3', 'w6']
+    assert sorted(written) == [0, 3, 6]
+    assert all(note[C.F_DEFINITION] == definition for note in deck)
+    assert model.queryGrp.total == 3
+    assert model.noteGrp.skip_cnt == 6
+
+
+def test_repair_audio_single_worker(monkeypatch, w_mock, qtbot):
+    deck = [FieldsNote(i, **{C.F_TERM: f'w{i}'}) for i in range(6)]
+    monkeypatch.setattr(noteManager, 'getNotesByDeckName', lambda *args, **kwargs: deck)
+    # audios of even words are in media already, never stat per note
+    media = {f'{C.F_AMEPRON}_w{i}.mp3' for i in range(0, 6, 2)}
+    monkeypatch.setattr(noteManager, 'mediaFileNames', lambda: media)
+    monkeypatch.setattr(os.path, 'isfile', lambda *args: pytest.fail('isfile called'))
+    monkeypatch.setattr(
+        queryApi.youdao.API,
+        'query',
+        lambda word, *args, **kwargs: dict(mock_helper.query_data_mock, term=word, AmEPron=f'http://{word}.mp3'),
+    )
+    downloaded = []
+    monkeypatch.setattr(workers, 'download_file', lambda session, fileName, url: downloaded.append(url))
+    audio_workers = []
+    monkeypatch.setattr(
+        workers.AudioDownloadWorker, '__init__',
+        lambda self, *args: audio_workers.append(self) or original_audio_worker_init(self, *args),
+    )
+
+    w: Windows = w_mock()
+    r = w.repair
+    qtbot.addWidget(w)
+    monkeypatch.setattr(r, '_checkLoginState', lambda *args, **kwargs: True)
+    monkeypatch.setattr(w.conf, 'ame_pron', True)
+    monkeypatch.setattr(w.conf, 'no_pron', False)
+    w.repairPronCB.setChecked(True)
+    w.repairBtn.click()
+
+    def check_audios():
+        assert r._model.audioGrp.success_cnt == 3
+
+    qtbot.waitUntil(check_audios)
+    assert len(audio_workers) == 1
+    assert sorted(downloaded) == ['http://w1.mp3', 'http://w3.mp3', 'http://w5.mp3']
+
+
+def test_repair_resume(monkeypatch, w_mock, qtbot):
+    num = 6
+    monkeypatch.setattr(noteManager, 'getNotesByDeckName', lambda *args, **kwargs: [notes.Note(i) for i in range(num)])
+    queried = []
+    monkeypatch.setattr(
+        queryApi.youdao.API, 'query', lambda word, *args, **kwargs: queried.append(word) or mock_helper.query_data_mock
+    )
+    written = []
+    monkeypatch.setattr(noteManager, 'updateNotes', lambda notes: written.extend(n.nid for n in notes) or OpChanges())
+
+    w: Windows = w_mock()
+    r = w.repair
+    qtbot.addWidget(w)
+    monkeypatch.setattr(r, '_checkLoginState', lambda *args, **kwargs: True)
+    w.repairDefCB.setChecked(True)
+    # the last repair of the same deck and fields was interrupted after notes 0 and 1
+    params = {'deck': w.conf.deck, 'fields': [noteManager.writeNoteDefinition.__name__], 'incomplete': False}
+    r._journal.start('repair', params)
+    r._journal.mark_done([(0, None), (1, None)])
+    r._journal.close()
+    w.repairBtn.click()
+
+    def check_tooltip():
+        assert aqt.utils.tooltip.called
+
+    qtbot.waitUntil(check_tooltip)
+    assert len(queried) == num - 2
+    assert sorted(written) == [2, 3, 4, 5]
+    assert r._model.noteGrp.success_cnt == num
+    assert not r._journal.exists()
@@ -0,0 +1,168 @@
+import logging
+import os
+import time
+
+import pytest
+from aqt import QItemSelection, QItemSelectionModel, QListView, QModelIndex, Qt
+
+from ..addon.wordListModel import WordListModel, WordState, row_ranges, selected_rows
+from . import mock_helper
+
+logger = logging.getLogger(__name__)
+
+ICONS = {WordState.WAIT: ':/icons/wait.png', WordState.DONE: ':/icons/done.png'}
+
+
+def test_set_words(qtbot):
+    model = WordListModel(ICONS)
+    with qtbot.waitSignal(model.modelReset):
+        model.set_words(['a', 'b', 'c'])
+
+    assert model.rowCount() == 3
+    assert model.data(model.index(1)) == 'b'
+    assert model.data(model.index(1), Qt.ItemDataRole.UserRole) is None
+    assert model.state(1) == WordState.WAIT
+    # not checkable
+    assert model.data(model.index(1), Qt.ItemDataRole.CheckStateRole) is None
+
+
+def test_icons_shared(qtbot):
+    model = WordListModel(ICONS)
+    model.set_words(['a', 'b'])
+    icon = model.data(model.index(0), Qt.ItemDataRole.DecorationRole)
+    assert icon is model.data(model.index(1), Qt.ItemDataRole.DecorationRole)
+
+    model.set_result(0, None)
+    # no icon of FAILED
+    assert model.data(model.index(0), Qt.ItemDataRole.DecorationRole) is None
+
+
+def test_set_result(qtbot):
+    model = WordListModel(ICONS)
+    model.set_words(['a', 'b', 'c'])
+    result = dict(mock_helper.query_data_mock, term='b')
+
+    with qtbot.waitSignal(model.dataChanged) as blocker:
+        model.set_result(1, result)
+    assert blocker.args[0].row() == blocker.args[1].row() == 1
+
+    model.set_result(2, None)
+    assert model.state(1) == WordState.DONE
+    assert model.state(2) == WordState.FAILED
+    assert model.results() == [None, result, None]
+    assert model.data(model.index(1), Qt.ItemDataRole.UserRole) == result
+
+
+def test_append_remove(qtbot):
+    model = WordListModel(ICONS)
+    model.append_words(['a', 'b'])
+    model.append_words(['c', 'd'])
+    model.set_result(3, dict(mock_helper.query_data_mock, term='d'))
+
+    model.remove_rows([0, 2])
+    assert model.words() == ['b', 'd']
+    assert model.state(1) == WordState.DONE
+    assert model.result(1)['term'] == 'd'
+
+
+def test_checkable(qtbot):
+    model = WordListModel(ICONS, checkable=True)
+    model.set_words(['a', 'b', 'c'])
+    assert model.checked_rows() == [0, 1, 2]
+    assert model.flags(model.index(0)) & Qt.ItemFlag.ItemIsUserCheckable
+
+    assert model.setData(model.index(1), Qt.CheckState.Unchecked.value, Qt.ItemDataRole.CheckStateRole)
+    assert model.checked_rows() == [0, 2]
+    assert model.data(model.index(1), Qt.ItemDataRole.CheckStateRole) == Qt.CheckState.Unchecked
+
+    model.set_all_checked(False)
+    assert model.checked_rows() == []
+    assert model.rowCount(model.index(0)) == 0
+    assert model.rowCount(QModelIndex()) == 3
+
+
+def test_row_ranges():
+    assert row_ranges([]) == []
+    assert row_ranges([5, 1, 2, 3, 9, 10, 2]) == [(1, 3), (5, 5), (9, 10)]
+
+
+@pytest.mark.parametrize('max_remove_ranges', [64, 1])
+def test_remove_ranges_keep_index(qtbot, monkeypatch, max_remove_ranges):
+    monkeypatch.setattr(WordListModel, 'max_remove_ranges', max_remove_ranges)
+    model = WordListModel(ICONS)
+    model.set_words(['a', 'b', 'c', 'd', 'e', 'f'])
+    model.set_result(4, dict(mock_helper.query_data_mock, term='e'))
+
+    model.remove_rows([0, 1, 3])
+    assert model.words() == ['c', 'e', 'f']
+    assert [model.row_of(w) for w in 'abcdef'] == [None, None, 0, None, 1, 2]
+    assert model.state(1) == WordState.DONE
+
+    model.append_words(['g'])
+    assert model.row_of('g') == 3
+    # outdated row hint
+    assert model.locate(4, 'e') == 1
+    assert model.locate(1, 'e') == 1
+    assert model.locate(0, 'x') is None
+
+
+def test_selected_rows(qtbot):
+    model = WordListModel(ICONS)
+    model.set_words('abcdefg')
+    view = QListView()
+    view.setSelectionMode(QListView.SelectionMode.MultiSelection)
+    view.setModel(model)
+    qtbot.addWidget(view)
+
+    for row in (5, 1, 2):
+        view.selectionModel().select(model.index(row), QItemSelectionModel.SelectionFlag.Select)
+    assert selected_rows(view.selectionModel()) == [1, 2, 5]
+
+
+def _time(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+@pytest.mark.skipif(not os.environ.get('DICT2ANKI_BENCH'), reason='set DICT2ANKI_BENCH to run benchmarks')
+def test_bench_list_operations_linear(qtbot):
+    def run(n) -> dict[str, float]:
+        model = WordListModel(ICONS, checkable=True)
+        view = QListView()
+        view.setUniformItemSizes(True)
+        view.setSelectionMode(QListView.SelectionMode.MultiSelection)
+        view.setModel(model)
+        qtbot.addWidget(view)
+        words = [f'word{i}' for i in range(n)]
+        ret = {'populate': _time(lambda: model.set_words(words))}
+
+        # select every other row, then collect selected rows as on_queryBtn_clicked does
+        selection = QItemSelection()
+        for row in range(0, n, 2):
+            selection.select(model.index(row), model.index(row))
+        view.selectionModel().select(selection, QItemSelectionModel.SelectionFlag.Select)
+        ret['selected_rows'] = _time(lambda: selected_rows(view.selectionModel()))
+        ret['lookup'] = _time(lambda: [model.row_of(w) for w in words])
+        ret['remove_scattered'] = _time(lambda: model.remove_rows(range(0, n, 2)))
+        ret['remove_range'] = _time(lambda: model.remove_rows(range(n // 4)))
+        return ret
+
+    small, large = run(25000), run(50000)
+    for op in small:
+        logger.warning(f'{op}: 25k {small[op] * 1000:.1f}ms, 50k {large[op] * 1000:.1f}ms')
+        # linear: doubling the size roughly doubles the time, quadratic would be 4x
+        assert large[op] < small[op] * 3 + 0.01
+
+
+def test_set_results_one_range(qtbot):
+    model = WordListModel(ICONS)
+    model.set_words('abcdef')
+    result = dict(mock_helper.query_data_mock, term='b')
+
+    with qtbot.waitSignal(model.dataChanged) as blocker:
+        model.set_results([(4, None), (1, result), (2, result)])
+    assert (blocker.args[0].row(), blocker.args[1].row()) == (1, 4)
+    assert [model.state(row) for row in range(6)] == [
+        WordState.WAIT, WordState.DONE, WordState.DONE, WordState.WAIT, WordState.FAILED, WordState.WAIT
+    ]
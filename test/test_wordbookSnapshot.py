@@ -0,0 +1,154 @@
+import json
+import time
+
+import pytest
+
+from ..addon import wordbookSnapshot
+from ..addon.wordbookSnapshot import SnapshotStore, pullGroup, splice
+
+PAGE_SIZE = 10
+
+
+def words_of(n: int, prefix='w') -> list[str]:
+    return [f'{prefix}{i}' for i in range(n)]
+
+
+class Remote:
+    """wordbook paged by `PAGE_SIZE`, records fetched pages"""
+
+    def __init__(self, words: list[str]):
+        self.words = words
+        self.fetched: list[int] = []
+
+    @property
+    def total_page(self) -> int:
+        return -(-len(self.words) // PAGE_SIZE)
+
+    def fetch_pages(self, page_nos: list[int]) -> list[list[str]]:
+        self.fetched.extend(page_nos)
+        return [self.words[p * PAGE_SIZE:(p + 1) * PAGE_SIZE] for p in page_nos]
+
+    def pull(self, old):
+        return pullGroup(self.total_page, PAGE_SIZE, old, self.fetch_pages)
+
+
+@pytest.mark.parametrize('head,old,expected', [
+    (['a', 'b'], ['a', 'b', 'c'], ['a', 'b', 'c']),
+    (['x', 'a'], ['a', 'b', 'c'], ['x', 'a', 'b', 'c']),
+    (['b', 'c'], ['a', 'b', 'c'], ['b', 'c']),
+    (['x', 'y'], ['a', 'b', 'c'], None),
+    (['a', 'c'], ['a', 'b', 'c'], ['a', 'c']),
+    ([], ['a'], None),
+])
+def test_splice(head, old, expected):
+    assert splice(head, old) == expected
+
+
+def test_pull_without_snapshot():
+    remote = Remote(words_of(95))
+
+    assert remote.pull(None) == remote.words
+    assert sorted(remote.fetched) == list(range(10))
+
+
+def test_pull_unchanged():
+    old = words_of(95)
+    remote = Remote(list(old))
+
+    assert remote.pull(old) == old
+    assert sorted(remote.fetched) == [0, 9]
+
+
+@pytest.mark.parametrize('added', [3, 25])
+def test_pull_added_at_head(added):
+    old = words_of(95)
+    remote = Remote(words_of(added, 'new') + old)
+
+    assert remote.pull(old) == remote.words
+    assert len(remote.fetched) < remote.total_page
+
+
+def test_pull_added_at_tail():
+    old = words_of(95)
+    remote = Remote(old + words_of(12, 'new'))
+
+    assert remote.pull(old) == remote.words
+    assert len(remote.fetched) < remote.total_page
+
+
+def test_pull_deleted_at_head():
+    old = words_of(95)
+    remote = Remote(old[7:])
+
+    assert remote.pull(old) == remote.words
+    assert sorted(remote.fetched) == [0, 8]
+
+
+def test_pull_deleted_in_middle_fetches_all():
+    old = words_of(95)
+    remote = Remote(old[:40] + old[52:])
+
+    assert remote.pull(old) == remote.words
+    assert sorted(remote.fetched) == list(range(remote.total_page))
+
+
+def test_pull_too_many_added_fetches_all():
+    old = words_of(30)
+    remote = Remote(words_of(PAGE_SIZE * (wordbookSnapshot.MAX_PROBE_PAGES + 1), 'new') + old)
+
+    assert remote.pull(old) == remote.words
+
+
+def test_pull_empty():
+    remote = Remote([])
+
+    assert remote.pull(words_of(10)) == []
+    assert remote.fetched == []
+
+
+def test_plausible():
+    assert wordbookSnapshot.plausible(words_of(95), 10, PAGE_SIZE)
+    # a page failed to fetch
+    assert not wordbookSnapshot.plausible(words_of(85), 10, PAGE_SIZE)
+
+
+def test_store(tmp_path):
+    path = str(tmp_path / 'user_files' / 'snapshot.json')
+    store = SnapshotStore(path)
+    assert store.get('dict', '1') is None
+
+    store.put('dict', '1', ['a', 'b'], 1)
+    store.save()
+
+    snapshot = SnapshotStore(path).get('dict', '1')
+    assert snapshot and snapshot['words'] == ['a', 'b']
+    assert snapshot['count'] == 2
+    assert SnapshotStore(path).get('dict', '2') is None
+    assert SnapshotStore(path).get('other', '1') is None
+
+
+def test_store_corrupted(tmp_path):
+    path = tmp_path / 'snapshot.json'
+    path.write_text('{not json', encoding='utf-8')
+    assert SnapshotStore(str(path)).get('dict', '1') is None
+
+    store = SnapshotStore(str(path))
+    store.put('dict', '1', ['a', 'b'], 1)
+    store.save()
+    data = json.loads(path.read_text(encoding='utf-8'))
+    data['dict/1']['words'].append('c')
+    path.write_text(json.dumps(data), encoding='utf-8')
+
+    # fingerprint mismatch
+    assert SnapshotStore(str(path)).get('dict', '1') is None
+
+
+def test_store_expired(tmp_path):
+    path = str(tmp_path / 'snapshot.json')
+    store = SnapshotStore(path)
+    store.put('dict', '1', ['a', 'b'], 1, updated=time.time() - wordbookSnapshot.MAX_AGE - 1)
+    store.put('dict', '2', ['a', 'b'], 1, updated=time.time() - wordbookSnapshot.MAX_AGE + 60)
+    store.save()
+
+    assert SnapshotStore(path).get('dict', '1') is None
+    assert SnapshotStore(path).get('dict', '2') is not None
@@ -1,8 +1,11 @@
+import threading
 import time
 
 import aqt
 
-from ..addon import workers
+from ..addon import constants as C
+from ..addon import misc, queryApi, workers
+from . import mock_helper
 
 
 class DummyWorker(workers.AbstractWorker):
@@ -45,3 +48,150 @@ def test_workerman_destroy_disconnect():
     assert 0 == aqt.QObject.receivers(worker, worker.sig_1) + aqt.QObject.receivers(
         worker, worker.sig_2
     )
+
+
+def test_query_all_worker_pipeline(qtbot, monkeypatch):
+    mock_helper.mock_query_api(monkeypatch)
+    words = [(i, f'word{i}') for i in range(20)]
+    fail_words = {'word3', 'word7'}
+
+    def query(word, fields=None):
+        return None if word in fail_words else dict(mock_helper.query_data_mock, term=word)
+
+    monkeypatch.setattr(queryApi.youdao.API, 'query', query)
+
+    worker = workers.QueryAllWorker(words, C.F_AMEPRON, queryApi.youdao.API)
+    audios = []
+    results = []
+    worker.audiosDone.connect(lambda batch: audios.extend(fileName for fileName, _, _ in batch))
+    worker.doneWithResult.connect(results.extend)
+
+    man = workers.WorkerManager()
+    with qtbot.waitSignal(worker.done, timeout=5000):
+        man.start(worker)
+
+    def check_audio():
+        assert len(audios) == len(words) - len(fail_words)
+
+    qtbot.waitUntil(check_audio)
+    assert [(row, word) for row, word, _ in results] == words
+    assert [word for _, word, result in results if not result] == sorted(fail_words)
+    man.destroy()
+
+
+def test_query_worker_query_raises(qtbot, monkeypatch):
+    mock_helper.mock_query_api(monkeypatch)
+    words = [(i, f'word{i}') for i in range(10)]
+
+    def query(word, fields=None):
+        if word == 'word3':
+            raise ValueError('broken cache entry')
+        return dict(mock_helper.query_data_mock, term=word)
+
+    monkeypatch.setattr(queryApi.youdao.API, 'query', query)
+
+    worker = workers.QueryWorker(words, queryApi.youdao.API)
+    results = []
+    worker.doneWithResult.connect(results.extend)
+
+    man = workers.WorkerManager()
+    with qtbot.waitSignal(worker.done, timeout=5000):
+        man.start(worker)
+
+    # 一个单词出错不影响其他单词
+    assert [(row, word) for row, word, _ in results] == words
+    assert [word for _, word, result in results if not result] == ['word3']
+    man.destroy()
+
+
+class BatchWorker(workers.AbstractWorker):
+    batch = aqt.pyqtSignal(list)
+
+    def run(self):
+        pass
+
+
+def test_signal_batcher(qtbot):
+    worker = BatchWorker()
+    batches = []
+    worker.batch.connect(batches.append)
+
+    batcher = workers.SignalBatcher(worker.batch, interval=3600)
+    for i in range(10):
+        batcher.add(i)
+    assert batches == []
+    batcher.flush()
+    batcher.flush()
+    assert batches == [list(range(10))]
+
+    batcher = workers.SignalBatcher(worker.batch, interval=0)
+    batcher.add(10)
+    assert batches[-1] == [10]
+
+
+def test_signal_batcher_emits_after_interval(qtbot):
+    """the last items are emitted without waiting for the next `add` or `flush`"""
+    worker = BatchWorker()
+    batches = []
+    worker.batch.connect(batches.append)
+
+    batcher = workers.SignalBatcher(worker.batch, interval=0.05)
+    batcher.add(0)
+    batcher.add(1)
+    assert batches == []
+    qtbot.waitUntil(lambda: batches == [[0, 1]], timeout=1000)
+    batcher.add(2)
+    qtbot.waitUntil(lambda: batches == [[0, 1], [2]], timeout=1000)
+    batcher.flush()
+    assert batches == [[0, 1], [2]]
+
+
+def test_word_feed():
+    feed = workers.WordFeed()
+    received = []
+    consumer = threading.Thread(target=lambda: received.extend(feed))
+    consumer.start()
+
+    feed.put([(0, 'a'), (1, 'b')])
+    feed.put([(2, 'c')])
+    feed.close()
+    consumer.join(timeout=5)
+
+    assert not consumer.is_alive()
+    assert received == [(0, 'a'), (1, 'b'), (2, 'c')]
+
+
+def test_word_feed_until_stopped(monkeypatch):
+    monkeypatch.setattr(workers.WordFeed, 'poll_interval', 0.01)
+    feed = workers.WordFeed()
+    stopped = threading.Event()
+    received = []
+    consumer = threading.Thread(target=lambda: received.extend(feed.until(stopped.is_set)))
+    consumer.start()
+
+    feed.put([(0, 'a')])
+    # 生产者从未关闭 feed
+    stopped.set()
+    consumer.join(timeout=5)
+
+    assert not consumer.is_alive()
+    assert received in ([], [(0, 'a')])
+
+
+def test_audio_download_worker_feed(monkeypatch, qtbot):
+    monkeypatch.setattr(misc.TokenBucket, 'acquire', lambda *args, **kwargs: 0.0)
+    monkeypatch.setattr(workers, 'download_file', lambda *args, **kwargs: None)
+    feed = workers.AudioFeed()
+    worker = workers.AudioDownloadWorker(feed)
+    done = []
+    worker.audiosDone.connect(lambda batch: done.extend(fileName for fileName, _, _ in batch))
+    man = workers.WorkerManager()
+
+    with qtbot.waitSignal(worker.done, timeout=5000):
+        man.start(worker)
+        feed.put([('a.mp3', 'http://a'), ('b.mp3', 'http://b')])
+        feed.put([('c.mp3', 'http://c')])
+        feed.close()
+    man.destroy()
+
+    assert sorted(done) == ['a.mp3', 'b.mp3', 'c.mp3']